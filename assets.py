@@ -0,0 +1,187 @@
+import os
+import re
+import json
+import hashlib
+import functools
+from PIL import Image
+
+from settings import Settings
+
+#################################
+##### Asset manifest module #####
+#################################
+
+# Manifest of map/radar pairs is kept next to the images in images/maps/manifest.json:
+#   - file names, image dimensions and content hashes of every pair.
+# Scale of the map is not stored, calculations.Shot derives it from the map height.
+# It is loaded once at startup. Files are checked by modification time only, the times are local to the machine
+# and kept out of the game folder in Settings.cache_dir/manifest_mtimes.json (map file -> mtimes and hashes).
+# Hashes are read again only for files that were touched, image headers only for files that have changed.
+
+MAPS_DIRECTORY = os.path.join('images', 'maps')
+MANIFEST_PATH = os.path.join(MAPS_DIRECTORY, 'manifest.json')
+MANIFEST_VERSION = 1
+MTIMES_PATH = os.path.join(Settings.cache_dir, 'manifest_mtimes.json')
+
+
+def file_hash(path):
+    """Return SHA-1 hash of the file content"""
+    with open(path, 'rb') as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+class MapAsset:
+    """A class for one map/radar pair of the manifest"""
+
+    def __init__(self, number, map_file, radar_file, width, height, map_hash, radar_hash):
+        self.number = number
+        self.map_file = map_file
+        self.radar_file = radar_file
+        self.map_path = os.path.join(MAPS_DIRECTORY, map_file)
+        self.radar_path = os.path.join(MAPS_DIRECTORY, radar_file)
+        self.width = width
+        self.height = height
+        self.map_hash = map_hash
+        self.radar_hash = radar_hash
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    def to_dict(self):
+        return {'number': self.number, 'map_file': self.map_file, 'radar_file': self.radar_file,
+                'width': self.width, 'height': self.height,
+                'map_hash': self.map_hash, 'radar_hash': self.radar_hash}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['number'], data['map_file'], data['radar_file'], data['width'], data['height'],
+                   data['map_hash'], data['radar_hash'])
+
+
+class AssetManifest:
+    """A class for the manifest of map/radar pairs"""
+
+    def __init__(self, path=MANIFEST_PATH, mtimes_path=MTIMES_PATH):
+        """Load the manifest, bring it up to date with the files and save if anything has changed"""
+
+        self.path = path
+        self.mtimes_path = mtimes_path
+        self.maps = []  # MapAsset list ordered by map number
+        self.maps_by_path = {}  # map path -> MapAsset
+
+        stored = {}
+        if os.path.exists(path):
+            with open(path, 'r') as file:
+                data = json.load(file)
+            if data.get('version') == MANIFEST_VERSION:
+                stored = {entry['map_file']: MapAsset.from_dict(entry) for entry in data['maps']}
+        self.mtimes = self.load_mtimes()
+
+        self.changed = False
+        self.mtimes_changed = False
+        for map_file, radar_file, number in self.scan_pairs():
+            self.add(self.check_asset(stored.get(map_file), number, map_file, radar_file))
+        if len(self.maps) != len(stored):
+            self.changed = True
+
+        if self.changed:
+            self.save()
+        if self.mtimes_changed:
+            self.save_mtimes()
+
+    def load_mtimes(self):
+        """Return local modification times of the files, empty if there are none yet or they are unreadable"""
+        try:
+            with open(self.mtimes_path, 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def scan_pairs(self):
+        """Return (map file, radar file, number) of map images having a radar image"""
+
+        directory = os.path.dirname(self.path)
+        pairs = []
+        for name in os.listdir(directory):
+            match = re.fullmatch(r'map(\d+)\.jpg', name)
+            if match and os.path.exists(os.path.join(directory, f"radar{match.group(1)}.jpg")):
+                pairs.append((name, f"radar{match.group(1)}.jpg", int(match.group(1))))
+        pairs.sort(key=lambda pair: pair[2])
+        return pairs
+
+    def check_asset(self, asset, number, map_file, radar_file):
+        """Return manifest entry of the pair, files with changed modification time are read again"""
+
+        directory = os.path.dirname(self.path)
+        map_path = os.path.join(directory, map_file)
+        radar_path = os.path.join(directory, radar_file)
+        mtimes = {'map_mtime': os.stat(map_path).st_mtime, 'radar_mtime': os.stat(radar_path).st_mtime}
+
+        if asset is not None and asset.radar_file == radar_file and self.mtimes.get(map_file) == dict(mtimes, map_hash=asset.map_hash, radar_hash=asset.radar_hash):
+            return asset
+
+        # Files were touched (e.g. after checkout or on a fresh clone), read them only if the content is different
+        map_hash = file_hash(map_path)
+        radar_hash = file_hash(radar_path)
+        self.mtimes[map_file] = dict(mtimes, map_hash=map_hash, radar_hash=radar_hash)
+        self.mtimes_changed = True
+        if asset is not None and asset.radar_file == radar_file and asset.map_hash == map_hash and asset.radar_hash == radar_hash:
+            return asset
+
+        self.changed = True
+        with Image.open(map_path) as img:
+            width, height = img.size
+        return MapAsset(number, map_file, radar_file, width, height, map_hash, radar_hash)
+
+    def add(self, asset):
+        self.maps.append(asset)
+        self.maps_by_path[asset.map_path] = asset
+
+    def save(self):
+        """Write the manifest, it is not an error if the game folder is read-only"""
+
+        try:
+            with open(self.path, 'w') as file:
+                json.dump({'version': MANIFEST_VERSION, 'maps': [asset.to_dict() for asset in self.maps]}, file, indent=4)
+        except OSError:
+            pass
+
+    def save_mtimes(self):
+        """Write local modification times of the files to the cache"""
+
+        try:
+            os.makedirs(os.path.dirname(self.mtimes_path), exist_ok=True)
+            with open(self.mtimes_path, 'w') as file:
+                json.dump(self.mtimes, file, indent=4)
+        except OSError:
+            pass
+
+    def get(self, map_path):
+        """Return manifest entry of the map"""
+        return self.maps_by_path[map_path]
+
+
+@functools.lru_cache(maxsize=1)
+def get_manifest():
+    """Return the manifest, loaded once per process"""
+    return AssetManifest()
+
+
+def get_scaled_image(image_path, size):
+    """Return the image resized to size, kept in the disk cache for the next launches (uncompressed, fast to read)"""
+
+    name = os.path.splitext(os.path.basename(image_path))[0]
+    cache_path = os.path.join(Settings.cache_dir, 'screens', f"{name}_{size[0]}x{size[1]}_{os.stat(image_path).st_mtime_ns}.bmp")
+    if os.path.exists(cache_path):
+        return Image.open(cache_path)
+
+    with Image.open(image_path) as img:
+        image = img.convert('RGB').resize(size, Image.LANCZOS)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        image.save(cache_path + '.tmp', format='BMP')
+        os.replace(cache_path + '.tmp', cache_path)
+    except OSError:
+        pass
+    return image
@@ -0,0 +1,323 @@
+import numpy as np
+
+from settings import Settings
+from calculations import Shot
+from spatial import SpatialGrid
+from rng import RandomStreams
+from metrics import metrics
+
+#########################################
+##### Headless battle engine module #####
+#########################################
+
+# The battle engine resolves turns of one battle (round) on plain units, without tkinter, mixer or windows.
+# The console (game_loop.Play) binds to it through adapters: it passes shot parameters from the entries to
+# the units, calls Battle.resolve_turn() and shows the returned events as messages, sounds, blast pits and echoes.
+
+
+class BattleEvent:
+    """A class for one event of the turn, shown to the player in the order of appearance"""
+
+    def __init__(self, kind, unit=None, coords=None, value=0, message=None):
+        self.kind = kind  # e.g. 'fired', 'dud', 'blast', 'impact', 'damage', 'destroyed', 'empty', 'silenced'
+        self.unit = unit  # unit the event is related to or None
+        self.coords = coords  # a tuple (x, y) of the blast or None
+        self.value = value  # damage, ammo loss, blast number or side index of the impact
+        self.message = message  # situation report message or None
+
+    def __repr__(self):
+        return f"BattleEvent({self.kind!r}, value={self.value!r}, coords={self.coords!r})"
+
+
+class TurnReport:
+    """A class to collect results of one turn"""
+
+    def __init__(self, turn_index):
+        self.turn_index = turn_index
+        self.events = []
+        self.blasts_list_player = []  # blast coordinates of player's shells
+        self.blasts_list_computer = []  # blast coordinates of computer's shells
+        self.battle_over = False  # True if one of the sides has no active units left
+
+    def add(self, kind, unit=None, coords=None, value=0, message=None):
+        """Add event to the report"""
+        self.events.append(BattleEvent(kind, unit, coords, value, message))
+
+
+class Battle:
+    """A class to resolve turns of one battle without user interface"""
+
+    def __init__(self, units, weather_conditions, map_direction, player_role=None, field_height=None, unit_grid=None, rng=None):
+        """Set the battle state"""
+
+        self.units = units
+        self.all_units_list = units['Defender'] + units['Intruder']
+        # Spatial index of the round, built by setup in the order of all units list
+        if unit_grid is None or unit_grid.units != self.all_units_list:
+            unit_grid = SpatialGrid(self.all_units_list)
+        self.unit_grid = unit_grid
+        self.weather_conditions = weather_conditions
+        self.map_direction = map_direction
+        self.player_role = player_role if player_role is not None else Settings.player_role
+        self.shot = Shot(field_height)
+        # Random streams of the battle: breakdowns, duds, computer targeting and accuracy
+        self.rng = rng if rng is not None else RandomStreams()
+
+        # Find units of the player and computer
+        if self.player_role == "Defender":
+            self.player_units = self.units["Defender"]
+            self.computer_units = self.units["Intruder"]
+        else:
+            self.player_units = self.units["Intruder"]
+            self.computer_units = self.units["Defender"]
+
+        # Static arrays of all units for blast damage resolution
+        self.unit_coords = np.array([unit.coords for unit in self.all_units_list], dtype=np.float64).reshape(-1, 2)
+        self.is_artillery = np.array([unit.unit_type == 'artillery' for unit in self.all_units_list], dtype=bool)
+        # Index of the related unit (artillery <-> ammo) for each unit
+        unit_indexes = {unit: index for index, unit in enumerate(self.all_units_list)}
+        self.partners = [unit_indexes.get(unit.related_unit, -1) for unit in self.all_units_list]
+        self.ammo_unit_indexes = [index for index, unit in enumerate(self.all_units_list) if unit.unit_type == 'ammo']
+
+        self.turn_index = 0  # Calculate turns (attacks)
+        self.target_units = []  # Computer targets
+        self.active_player_units = []
+
+    @metrics.timed('turn')
+    def resolve_turn(self):
+        """Player fires shots from artillery guns and receives the same in return from computer, after shots checks for active units"""
+
+        self.turn_index += 1
+        report = TurnReport(self.turn_index)
+
+        # Get active player units
+        self.active_player_units = self.get_active_units(self.player_units, report)
+        assert len(self.active_player_units) % 2 == 0
+
+        with metrics.span('turn.player_salvo'):
+            self.fire_player_salvo(report)
+        with metrics.span('turn.computer_salvo'):
+            self.fire_computer_salvo(report)
+
+        # Blast pits on the map and blasts echo arcs on radar
+        for index, blasts_list in enumerate((report.blasts_list_player, report.blasts_list_computer)):
+            for coords in blasts_list:
+                report.add('impact', coords=coords, value=index)
+
+        with metrics.span('turn.damage'):
+            self.resolve_damage(report, report.blasts_list_player + report.blasts_list_computer)
+
+        # Check for active units, if not - end battle
+        with metrics.span('turn.end_check'):
+            active_player_units = self.get_active_units(self.player_units, report)
+            active_computer_units = self.get_active_units(self.computer_units, report)
+            if not (active_player_units and active_computer_units):
+                report.battle_over = True
+
+        metrics.count('turns')
+        metrics.count('blasts', len(report.blasts_list_player) + len(report.blasts_list_computer))
+        return report
+
+    def outcome(self):
+        """Return result of the battle for the player: 'won', 'lost', 'tied' or None if the battle is ongoing"""
+
+        player_active = any(unit.is_active for unit in self.player_units)
+        computer_active = any(unit.is_active for unit in self.computer_units)
+        if not player_active and not computer_active:
+            return 'tied'
+        if player_active and not computer_active:
+            return 'won'
+        if not player_active and computer_active:
+            return 'lost'
+        return None
+
+    def deactivate(self, unit):
+        """Make unit inactive and remove it from active units of the spatial index"""
+        unit.is_active = False
+        self.unit_grid.deactivate(unit)
+
+    @metrics.timed('turn.get_active_units')
+    def get_active_units(self, units, report):
+        """Return a list of active units."""
+
+        active_units = []
+        for unit in units:
+            # 1 in 30 chance that the unit is broken if it's an Intruder unit
+            if unit.player_role == "Intruder" and unit.unit_type == "artillery" and self.rng.breakdown.randint(1, 30) == 7:
+                self.deactivate(unit)
+                if self.player_role == "Defender":
+                    report.add('broken', unit, message=f"Unit {unit.name} Nr.{unit.unit_number} is silent.")
+                else:
+                    report.add('broken', unit, message=f"Unit {unit.name} Nr.{unit.unit_number} is broken.")
+                # Set related ammo unit to False
+                if unit.related_unit is not None:
+                    self.deactivate(unit.related_unit)
+            if unit.is_active:
+                active_units.append(unit)
+        return active_units
+
+    def fire_player_salvo(self, report):
+        """Calculate trajectories of player's shots"""
+
+        wind_speed = self.weather_conditions["Wind Speed,(m/s)"]
+        wind_gust = self.weather_conditions["Wind Gust,(m/s)"]
+        wind_direction = self.weather_conditions["Wind Direction,(°)"]
+
+        # Calculate blast positions of all guns in one call
+        artillery_units = [unit for unit in self.active_player_units if unit.unit_type == "artillery"]
+        blast_positions = self.shot.calculate_shot_end_positions(
+            [unit.coords[0] for unit in artillery_units], [unit.coords[1] for unit in artillery_units],
+            [unit.charge for unit in artillery_units], [unit.elevation for unit in artillery_units], [unit.azimuth for unit in artillery_units],
+            self.map_direction, wind_speed, wind_gust, wind_direction)
+
+        for unit, blast_position in zip(artillery_units, blast_positions.tolist()):
+            blast_position_player = tuple(blast_position)
+            # Intruders shots are less accurate
+            if self.player_role == "Intruder":
+                blast_position_player = (blast_position_player[0] + self.rng.accuracy.randint(-100, 100), blast_position_player[1] + self.rng.accuracy.randint(-100, 100))
+            # Inform player about the shot
+            report.add('fired', unit, message=f"Unit {unit.name} Nr. {unit.unit_number} fired!")
+            # Add blast coordinates to the list
+            if self.player_role == "Intruder" and self.rng.duds.randint(1, 30) == 7:
+                # 1 in 30 chance that the shell will not explode if it's an Intruder shell
+                report.add('dud', unit, coords=blast_position_player, message="The shell did not explode.")
+            else:
+                report.blasts_list_player.append(blast_position_player)
+            # Subtract ammo shot made
+            related_unit = unit.related_unit
+            # Assert that active related unit was found
+            assert related_unit is not None and related_unit.is_active, f"No active related unit found for unit {unit.unit_number}"
+            related_unit.ammo -= 1
+
+    @metrics.timed('turn.computer_make_decision')
+    def computer_make_decision(self, report):
+        """Have the AI make a decision on which units to target."""
+
+        # Get active computer units
+        active_computer_units = self.get_active_units(self.computer_units, report)
+
+        # Intruder does not have drone, therefore does not see ammo units
+        if self.player_role == "Defender":
+            self.active_player_units = [unit for unit in self.active_player_units if unit.unit_type == 'artillery']
+
+        if self.active_player_units and active_computer_units:
+            # Decide how many units to target based on the number of active computer units
+            num_targets = min(len(active_computer_units), len(self.active_player_units))
+            # Select the targets
+            self.target_units = self.rng.ai.sample(self.active_player_units, num_targets)
+            return self.target_units
+        else:
+            return []
+
+    def computer_fire_shot(self, unit):
+        """Computer fires shot at player's unit position"""
+
+        # First three shots of intruder shall be less accurate
+        if self.turn_index - 1 <= 2:
+            first_shots_correction = Settings.first_shots_accuracy[self.turn_index - 1]
+        else:
+            first_shots_correction = 0
+        if self.player_role == "Defender":
+            return (round(unit.coords[0] + self.rng.accuracy.randint(-300 - first_shots_correction, 300 + first_shots_correction)), round(unit.coords[1] + self.rng.accuracy.randint(-300 - first_shots_correction , 300 + first_shots_correction)))
+        else:
+            return (round(unit.coords[0] + self.rng.accuracy.randint(-150, 150)), round(unit.coords[1] + self.rng.accuracy.randint(-150, 150)))
+
+    def fire_computer_salvo(self, report):
+        """Computer chooses targets and fires shots at target units coords"""
+
+        # Computer chooses target units for the first time
+        if not self.target_units:
+            self.target_units = self.computer_make_decision(report)
+
+        # Computer checks if in targets are disabled units
+        for unit in self.target_units:
+            if not unit.is_active:
+                self.target_units = self.computer_make_decision(report)
+
+        # Make the sound of incoming shell
+        report.add('incoming')
+        target_index = 0
+        active_computer_artillery = [unit for unit in self.computer_units if unit.is_active and unit.unit_type == 'artillery']
+        blast_count = 0
+        for shooter in active_computer_artillery:
+            # Check if the current target is still active
+            while self.target_units and not self.target_units[target_index % len(self.target_units)].is_active:
+                # If not, find a new target and update target_index
+                self.target_units = self.computer_make_decision(report)
+                if not self.target_units:  # no active target units found
+                    report.battle_over = True
+                target_index = 0
+
+            if self.target_units:  # if there are active target units
+                # Make the shot
+                blast_position_computer = self.computer_fire_shot(self.target_units[target_index])
+                # Calculate blast number
+                if self.player_role == "Defender" and self.rng.duds.randint(1, 30) == 7:
+                    # 1 in 30 chance that the shell will not explode if it's an Intruder shell
+                    report.add('dud', shooter, coords=blast_position_computer, message="A shell fell nearby but did not explode.")
+                else:
+                    blast_count += 1
+                    # Inform player about blast with sound
+                    report.add('blast', shooter, coords=blast_position_computer, value=blast_count)
+                    # Add blast coordinates to the list
+                    report.blasts_list_computer.append(blast_position_computer)
+                if len(self.target_units) > 1:  # Check if there are still targets left
+                    target_index = (target_index + 1) % len(self.target_units)
+                # Subtract ammo shot made
+                if shooter.related_unit is not None:
+                    shooter.related_unit.ammo -= 1
+            else:  # if no active target units, shooter units stop firing
+                report.battle_over = True
+        # Inform player about blasts
+        report.add('blast_count', value=blast_count, message=f"{blast_count} enemy blasts counted")
+
+    def resolve_damage(self, report, blasts_list):
+        """Resolve damage and loss of ammo of units near the blasts in one batch"""
+
+        if not blasts_list:
+            return
+
+        units = self.all_units_list
+        # Units within the blast radius, found in the neighbouring cells of the spatial index
+        candidates = set()
+        for blast_coords in blasts_list:
+            candidates.update(self.unit_grid.indexes_within(blast_coords, 100))
+        # Ammo units without ammo are emptied (and negative ammo set to 0) by the first blast wherever it lands
+        candidates.update(index for index in self.ammo_unit_indexes if units[index].ammo <= 0)
+        if not candidates:
+            return
+        # Related units are deactivated together with destroyed or emptied units
+        candidates.update([self.partners[index] for index in candidates if self.partners[index] >= 0])
+        indexes = sorted(candidates)
+        local_indexes = {index: local_index for local_index, index in enumerate(indexes)}
+        partners = [local_indexes.get(self.partners[index], -1) for index in indexes]
+
+        damage = [units[index].damage if self.is_artillery[index] else 0 for index in indexes]
+        ammo = [0 if self.is_artillery[index] else units[index].ammo for index in indexes]
+        is_active = [units[index].is_active for index in indexes]
+        damage_delta, ammo_delta, active, events = self.shot.resolve_blasts(self.unit_coords[indexes], self.is_artillery[indexes], damage, ammo, is_active, partners, blasts_list)
+
+        # Apply deltas and new status to the units
+        for local_index in np.flatnonzero(damage_delta).tolist():
+            units[indexes[local_index]].damage += int(damage_delta[local_index])
+        for local_index in np.flatnonzero(ammo_delta).tolist():
+            units[indexes[local_index]].ammo += int(ammo_delta[local_index])
+        for local_index in np.flatnonzero(active != np.asarray(is_active)).tolist():
+            self.deactivate(units[indexes[local_index]])
+
+        # Inform player in the same order as the blasts hit the units
+        for kind, local_index, blast_index, value in events:
+            unit = units[indexes[local_index]]
+            blast_coords = blasts_list[blast_index]
+            if kind == 'damage':
+                message = f"{unit.name} Nr.{unit.unit_number} got {value} damage"
+            elif kind == 'destroyed':
+                message = f"{unit.name} Nr.{unit.unit_number} was destroyed"
+            elif kind == 'ammo_loss':
+                message = f"{unit.name} Nr.{unit.unit_number} was damaged"
+            elif kind == 'empty':
+                message = f"{unit.name} Nr.{unit.unit_number} is empty"
+            else:
+                message = f"{unit.name} Nr.{unit.unit_number} was silenced"
+                blast_coords = None
+            report.add(kind, unit, coords=blast_coords, value=value, message=message)
@@ -0,0 +1,339 @@
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import platform
+import argparse
+import statistics
+import subprocess
+import numpy as np
+
+from settings import Settings
+from calculations import Shot
+from units import Unit, generate_units
+from battle import Battle
+from setup import GameSetup
+from rng import RandomStreams
+from spatial import PlacementError
+
+###########################
+##### Benchmark suite #####
+###########################
+
+# Benchmarks of the hot paths of the game with fixed seeds and scaling parameters:
+#   units per side, blasts per turn and map size (field height in pixels).
+# Results are written as JSON and compared with a stored baseline, the run fails
+# if the median time of any benchmark is slower than the baseline by more than the threshold.
+#
+# Usage: python benchmarks.py --output results.json --baseline benchmark_baseline.json
+#        python benchmarks.py --save-baseline benchmark_baseline.json
+
+BENCHMARKS = []  # (name, function, scaling parameter names)
+
+
+def benchmark(name, scaling=()):
+    """Register benchmark: function(params) returns (prepare, run), only run(prepare()) is timed"""
+    def register(function):
+        BENCHMARKS.append((name, function, scaling))
+        return function
+    return register
+
+
+def get_map_size(params):
+    """Map size of the field height, width in proportion of the game maps"""
+    return (round(params['map_size'] * 4407 / 8192), params['map_size'])
+
+
+def get_weather(rng):
+    wind_speed = round(rng.uniform(2, 30), 1)
+    return {"Wind Speed,(m/s)": wind_speed, "Wind Gust,(m/s)": round(wind_speed + rng.uniform(1, wind_speed / 2), 1), "Wind Direction,(°)": round(rng.uniform(0, 360), 1)}
+
+
+@benchmark('shot_end_position', ('units',))
+def bench_shot_end_position(params):
+    rng = random.Random(params['seed'])
+    shot = Shot(params['map_size'])
+    weather = get_weather(rng)
+    shots = [(rng.uniform(0, 4000), rng.uniform(0, 8000), rng.randint(1, 5), round(rng.uniform(15, 75), 1), round(rng.uniform(0, 360), 1)) for _ in range(params['units'])]
+
+    def run(_):
+        for x, y, charge, elevation, azimuth in shots:
+            shot.calculate_shot_end_position(x, y, charge, elevation, azimuth, 90, weather["Wind Speed,(m/s)"], weather["Wind Gust,(m/s)"], weather["Wind Direction,(°)"])
+    return (lambda: None), run
+
+
+@benchmark('shot_end_positions_batch', ('units',))
+def bench_shot_end_positions(params):
+    rng = random.Random(params['seed'])
+    shot = Shot(params['map_size'])
+    weather = get_weather(rng)
+    n = params['units']
+    columns = ([rng.uniform(0, 4000) for _ in range(n)], [rng.uniform(0, 8000) for _ in range(n)], [rng.randint(1, 5) for _ in range(n)],
+               [round(rng.uniform(15, 75), 1) for _ in range(n)], [round(rng.uniform(0, 360), 1) for _ in range(n)])
+
+    def run(_):
+        shot.calculate_shot_end_positions(*columns, 90, weather["Wind Speed,(m/s)"], weather["Wind Gust,(m/s)"], weather["Wind Direction,(°)"])
+    return (lambda: None), run
+
+
+@benchmark('damage_or_ammo_loss', ('units', 'blasts'))
+def bench_damage_or_ammo_loss(params):
+    rng = random.Random(params['seed'])
+    shot = Shot(params['map_size'])
+    width, height = get_map_size(params)
+    units = [Unit(i, 'artillery' if i % 2 else 'ammo', (rng.uniform(0, width), rng.uniform(0, height)), 'north', 'Defender', 0, rng=rng) for i in range(params['units'] * 2)]
+    blasts = [(rng.uniform(0, width), rng.uniform(0, height)) for _ in range(params['blasts'])]
+
+    def run(_):
+        for blast in blasts:
+            for unit in units:
+                shot.calculate_damage_or_ammo_loss(unit, blast)
+    return (lambda: None), run
+
+
+@benchmark('resolve_blasts', ('units', 'blasts'))
+def bench_resolve_blasts(params):
+    rng = random.Random(params['seed'])
+    shot = Shot(params['map_size'])
+    width, height = get_map_size(params)
+    n = params['units'] * 2
+    coords = np.array([(rng.uniform(0, width), rng.uniform(0, height)) for _ in range(n)])
+    is_artillery = np.arange(n) % 2 == 1
+    partners = [index + 1 if index % 2 == 0 else index - 1 for index in range(n)]
+    blasts = [(rng.uniform(0, width), rng.uniform(0, height)) for _ in range(params['blasts'])]
+
+    def run(_):
+        shot.resolve_blasts(coords, is_artillery, [0] * n, [10] * n, [True] * n, partners, blasts)
+    return (lambda: None), run
+
+
+def bench_generate_units(params, deployment):
+    map_size = get_map_size(params)
+
+    def prepare():
+        Settings.deployment = deployment
+        return RandomStreams(params['seed'])
+
+    def run(rng):
+        generate_units('Defender', map_size, params['units'], max(params['units'], 3), rng)
+    return prepare, run
+
+
+@benchmark('generate_units_inline', ('units',))
+def bench_generate_units_inline(params):
+    return bench_generate_units(params, 'inline')
+
+
+@benchmark('generate_units_random', ('units',))
+def bench_generate_units_random(params):
+    return bench_generate_units(params, 'random')
+
+
+@benchmark('battle_turn', ('units',))
+def bench_battle_turn(params):
+    """Battle engine part of make_turn: player and computer salvos and damage of all blasts"""
+
+    map_size = get_map_size(params)
+
+    def prepare():
+        Settings.deployment = 'inline'
+        rng = RandomStreams(params['seed'])
+        units = generate_units('Defender', map_size, params['units'], max(params['units'], 3), rng)
+        battle = Battle(units, get_weather(rng.weather), 90, 'Defender', map_size[1], rng=rng)
+        for unit in battle.player_units:
+            if unit.unit_type == 'artillery':
+                unit.azimuth, unit.elevation, unit.charge = rng.player.uniform(0, 360), rng.player.uniform(15, 75), rng.player.randint(1, 5)
+        return battle
+
+    def run(battle):
+        battle.resolve_turn()
+    return prepare, run
+
+
+@benchmark('round_setup')
+def bench_round_setup(params):
+    def prepare():
+        Settings.level = 'hard'
+        Settings.deployment = 'random'
+        Settings.battle_index = 1
+        return GameSetup(None, prefetch=False, rng=RandomStreams(params['seed']))
+
+    def run(setup):
+        setup.round_setup()
+    return prepare, run
+
+
+class VirtualDisplay:
+    """Context to run Tk benchmarks: uses the display if there is one, else starts Xvfb if it is installed"""
+
+    def __init__(self):
+        self.process = None
+        self.available = True
+
+    def __enter__(self):
+        if platform.system() == "Windows" or os.environ.get('DISPLAY'):
+            return self
+        if shutil.which('Xvfb') is None:
+            self.available = False
+            return self
+        self.process = subprocess.Popen(['Xvfb', ':99', '-screen', '0', '1920x1080x24'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        os.environ['DISPLAY'] = ':99'
+        time.sleep(1)
+        return self
+
+    def __exit__(self, *exc):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait()
+            del os.environ['DISPLAY']
+
+
+def bench_view(params, create_view):
+    """Construction of a view window, tiles and radar base layer are in the disk cache already (as after prefetch)"""
+
+    import customtkinter as ctk
+    from assets import get_manifest
+    from scheduler import FrameScheduler
+
+    map_asset = get_manifest().maps[0]
+    Settings.field_width, Settings.field_height = map_asset.size
+    root = ctk.CTk()
+    Settings.screen_width, Settings.screen_height = root.winfo_screenwidth(), root.winfo_screenheight()
+    scheduler = FrameScheduler(root)
+    create_view(root, map_asset, scheduler).destroy()  # warm up the disk cache
+
+    def run(_):
+        window = create_view(root, map_asset, scheduler)
+        root.update()
+        window.destroy()
+    return (lambda: None), run
+
+
+@benchmark('map_view')
+def bench_map_view(params):
+    from map import Map
+    return bench_view(params, lambda root, map_asset, scheduler: Map(root, map_asset.map_path, scheduler).map_window)
+
+
+@benchmark('radar_view')
+def bench_radar_view(params):
+    from radar import Radar
+    return bench_view(params, lambda root, map_asset, scheduler: Radar(root, map_asset.radar_path, 90, 45, None).radar_window)
+
+
+GUI_BENCHMARKS = ('map_view', 'radar_view')
+
+
+def measure(prepare, run, repeat, number):
+    """Return times (s) of one call for each repeat"""
+
+    times = []
+    for _ in range(repeat):
+        elapsed = 0
+        for _ in range(number):
+            state = prepare()
+            start_time = time.perf_counter()
+            run(state)
+            elapsed += time.perf_counter() - start_time
+        times.append(elapsed / number)
+    return times
+
+
+def run_benchmarks(options):
+    """Run selected benchmarks for all values of their scaling parameters, combinations whose units do not fit the field are skipped"""
+
+    results = {}
+    for name, function, scaling in BENCHMARKS:
+        if options.only and name not in options.only:
+            continue
+        # All combinations of scaling parameter values, others at their first value
+        combinations = [{}]
+        for parameter in scaling:
+            combinations = [dict(combination, **{parameter: value}) for combination in combinations for value in getattr(options, parameter)]
+        for combination in combinations:
+            params = {'seed': options.seed, 'units': options.units[0], 'blasts': options.blasts[0], 'map_size': options.map_size[0]}
+            params.update(combination)
+            key = name + ''.join(f"[{parameter}={value}]" for parameter, value in combination.items())
+            try:
+                prepare, run = function(params)
+                times = measure(prepare, run, options.repeat, 1 if name in GUI_BENCHMARKS else options.number)
+            except PlacementError as error:
+                results[key] = {'skipped': str(error), 'params': params}
+                print(f"{key:<55} skipped: {error}", file=sys.stderr)
+                continue
+            results[key] = {'median': statistics.median(times), 'min': min(times), 'params': params}
+            print(f"{key:<55} median {results[key]['median'] * 1000:10.3f} ms   min {results[key]['min'] * 1000:10.3f} ms", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return list of (key, baseline median, median, ratio) of benchmarks slower than the baseline by more than the threshold"""
+
+    regressions = []
+    for key, result in results.items():
+        if 'skipped' in result or key not in baseline['results'] or 'skipped' in baseline['results'][key]:
+            continue
+        baseline_median = baseline['results'][key]['median']
+        ratio = result['median'] / baseline_median if baseline_median > 0 else 1
+        print(f"{key:<55} {baseline_median * 1000:10.3f} ms -> {result['median'] * 1000:10.3f} ms  {ratio:6.2f}x", file=sys.stderr)
+        if ratio > 1 + threshold:
+            regressions.append((key, baseline_median, result['median'], ratio))
+    return regressions
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the game hot paths.")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--units', type=int, nargs='+', default=[10, 30, 60], help="units (batteries) per side")
+    parser.add_argument('--blasts', type=int, nargs='+', default=[10, 100], help="blasts per turn")
+    parser.add_argument('--map-size', type=int, nargs='+', default=[8192], help="field height in pixels")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=20, help="calls in one repeat")
+    parser.add_argument('--only', nargs='+', default=None, help="names of benchmarks to run")
+    parser.add_argument('--no-gui', action='store_true', help="skip Map and Radar benchmarks")
+    parser.add_argument('--output', default=None, help="file for JSON results")
+    parser.add_argument('--baseline', default=None, help="compare with baseline results")
+    parser.add_argument('--threshold', type=float, default=0.25, help="allowed slowdown against baseline, 0.25 = 25%%")
+    parser.add_argument('--save-baseline', default=None, help="write results as the new baseline")
+    options = parser.parse_args(arguments)
+
+    # Images and manifest are found relative to the game folder
+    output_paths = [os.path.abspath(path) if path else None for path in (options.output, options.baseline, options.save_baseline)]
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    options.output, options.baseline, options.save_baseline = output_paths
+
+    with VirtualDisplay() as display:
+        if options.no_gui or not display.available:
+            if not options.no_gui:
+                print("No display and no Xvfb, Map and Radar benchmarks are skipped", file=sys.stderr)
+            skipped = set(GUI_BENCHMARKS)
+            BENCHMARKS[:] = [entry for entry in BENCHMARKS if entry[0] not in skipped]
+        results = run_benchmarks(options)
+
+    report = {
+        'meta': {'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'python': platform.python_version(), 'numpy': np.__version__,
+                 'platform': platform.platform(), 'machine': platform.machine(), 'seed': options.seed,
+                 'repeat': options.repeat, 'number': options.number},
+        'results': results,
+    }
+    for path in (options.output, options.save_baseline):
+        if path:
+            with open(path, 'w') as file:
+                json.dump(report, file, indent=4)
+
+    if options.baseline:
+        with open(options.baseline, 'r') as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, options.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmarks are slower than the baseline by more than {options.threshold:.0%}:", file=sys.stderr)
+            for key, baseline_median, median, ratio in regressions:
+                print(f"  {key}: {ratio:.2f}x", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
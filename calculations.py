@@ -1,40 +1,54 @@
 import random
 import math
+import numpy as np
 
 from settings import Settings
 
 
+def round_array(values, ndigits):
+    """Round array the same as built-in round() does for each number"""
+
+    scaled = values * 10**ndigits
+    rounded = np.round(values, ndigits)
+    # np.round may differ from round() only near halves, round these values one by one
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for index in np.flatnonzero(near_half).tolist():
+        rounded.flat[index] = round(float(values.flat[index]), ndigits)
+    return rounded
+
+
 class Shot:
     """A class for calculating shot trajectory, damage to artillery units and loss of ammo"""
 
-    def __init__(self):
+    def __init__(self, field_height=None):
         """ Initialize variables for calculations."""
 
-        self.field_height = Settings.field_height
+        self.field_height = field_height if field_height is not None else Settings.field_height
 
         # Constants
         self.g = 9.8 # Acceleration due to gravity in m/s^2
         self.scale = round(25000 / self.field_height, 3) # Scale 25 km in m/pixel
 
+        # Calculate initial velocity based on a standard charge (e.g., charge 1)
+        # This velocity is calculated using the range equation (R = v^2 / g * sin(2*theta))
+        # where R = 5 km (for charge 1), theta = 45 degrees
+        self.v_1 = math.sqrt(5 * 1000 * self.g / math.sin(math.radians(2 * 45)))
+
     def calculate_shot_end_position(self, x_start, y_start, p_charge, elevation, azimuth, map_direction, wind_speed, wind_gust, wind_direction):
-       
+        """Calculate blast position of one shot, shot parameters are numbers or numeric strings"""
+
         # Adjust the azimuth and wind direction according to the map_direction
-        azimuth = round((map_direction + float(azimuth.get())) % 360, 1)
+        azimuth = round((map_direction + float(azimuth)) % 360, 1)
         wind_direction = round((map_direction + wind_direction) % 360, 1)
         wind_speed = wind_speed + (wind_gust - wind_speed) / 2
 
         # Convert degrees to radians
-        elevation_rad = math.radians(float(elevation.get()))
+        elevation_rad = math.radians(float(elevation))
         azimuth_rad = math.radians(azimuth)
         wind_direction_rad = math.radians(wind_direction)
 
-        # Calculate initial velocity based on a standard charge (e.g., charge 1)
-        # This velocity is calculated using the range equation (R = v^2 / g * sin(2*theta))
-        # where R = 5 km (for charge 1), theta = 45 degrees
-        v_1 = math.sqrt(5 * 1000 * self.g / math.sin(math.radians(2 * 45)))
-
-        # Adjust the initial velocity based on the actual charge
-        v = v_1 * math.sqrt(int(p_charge.get()))
+        # Adjust the initial velocity of charge 1 based on the actual charge
+        v = self.v_1 * math.sqrt(int(p_charge))
 
         # Calculate the total distance traveled by the projectile in the absence of wind
         d = (v**2 / self.g) * math.sin(2 * elevation_rad)
@@ -54,6 +68,49 @@ class Shot:
 
         return (x_end, y_end)
 
+    def calculate_shot_end_positions(self, x_start, y_start, p_charge, elevation, azimuth, map_direction, wind_speed, wind_gust, wind_direction):
+        """Calculate blast positions of many shots in one call, the same as calculate_shot_end_position for each shot.
+
+        Start positions, charges, elevations and azimuths are arrays (or numbers) of equal length,
+        map direction and weather are the same for all shots. Returns array (n, 2) of blast positions.
+        """
+
+        x_start = np.asarray(x_start, dtype=np.float64)
+        y_start = np.asarray(y_start, dtype=np.float64)
+        p_charge = np.asarray(p_charge, dtype=np.float64).astype(np.int64)
+        elevation = np.asarray(elevation, dtype=np.float64)
+        azimuth = np.asarray(azimuth, dtype=np.float64)
+
+        # Adjust the azimuth and wind direction according to the map_direction
+        azimuth = round_array((map_direction + azimuth) % 360, 1)
+        wind_direction = round((map_direction + wind_direction) % 360, 1)
+        wind_speed = wind_speed + (wind_gust - wind_speed) / 2
+
+        # Convert degrees to radians
+        elevation_rad = np.radians(elevation)
+        azimuth_rad = np.radians(azimuth)
+        wind_direction_rad = math.radians(wind_direction)
+
+        # Adjust the initial velocity of charge 1 based on the actual charge
+        v = self.v_1 * np.sqrt(p_charge)
+
+        # Calculate the total distance traveled by the projectile in the absence of wind
+        d = (v**2 / self.g) * np.sin(2 * elevation_rad)
+
+        # Adjust the distance for wind speed and direction
+        wind_effect = wind_speed * np.cos(wind_direction_rad - azimuth_rad) # Component of wind in the direction of fire
+        d_adjusted = d + wind_effect * d / v
+
+        # Calculate the change in x and y position
+        dx = d_adjusted * np.sin(azimuth_rad) / self.scale
+        dy = d_adjusted * np.cos(azimuth_rad) / self.scale
+
+        # Calculate the end positions
+        x_end = np.rint(x_start + dx).astype(np.int64)
+        y_end = np.rint(y_start - dy).astype(np.int64)
+
+        return np.stack((x_end, y_end), axis=-1).reshape(-1, 2)
+
     def calculate_damage_or_ammo_loss(self, unit, blast_coords):
         """Calculate damage to artillery unit and ammo loss if shell landed nearby unit"""
 
@@ -74,3 +131,73 @@ class Shot:
             else:
                 return 0  # No loss
 
+
+    def resolve_blasts(self, unit_coords, is_artillery, damage, ammo, is_active, partners, blasts_coords):
+        """Calculate damage and ammo loss of all units from all blasts of the turn in one pass.
+
+        Takes arrays of unit coordinates (n, 2), unit types (True for artillery), current damage, ammo and
+        active status, index of the related unit (artillery <-> ammo) and blast coordinates (m, 2).
+        Returns per-unit damage and ammo deltas, new active status and ordered list of events
+        (kind, unit index, blast index, value), the same as the units were looped through blasts one by one.
+        """
+
+        is_artillery = np.asarray(is_artillery, dtype=bool)
+        damage = np.asarray(damage, dtype=np.int64)
+        ammo = np.asarray(ammo, dtype=np.int64)
+        active = np.array(is_active, dtype=bool)
+        events = []
+
+        # No blasts - nothing changes
+        if len(unit_coords) == 0 or len(blasts_coords) == 0:
+            return np.zeros_like(damage), np.zeros_like(ammo), active, events
+
+        # Distance matrix between units and blasts
+        unit_coords = np.asarray(unit_coords, dtype=np.float64)
+        blasts_coords = np.asarray(blasts_coords, dtype=np.float64)
+        dx = blasts_coords[np.newaxis, :, 0] - unit_coords[:, np.newaxis, 0]
+        dy = blasts_coords[np.newaxis, :, 1] - unit_coords[:, np.newaxis, 1]
+        distance = np.sqrt(dx**2 + dy**2)
+
+        # Damage from 1 to 100 for artillery and loss of from 1 to 10 ammo, only if shell landed within 100 px
+        in_range = distance <= 100
+        loss = np.where(in_range, np.where(is_artillery[:, np.newaxis], np.trunc(100 - distance), np.trunc(10 - distance / 10)), 0).astype(np.int64)
+
+        # Damage and ammo after each blast, capped the same as when added one by one
+        cumulative_loss = np.cumsum(loss, axis=1)
+        damage_path = np.minimum(damage[:, np.newaxis] + cumulative_loss, 100)
+        ammo_path = np.maximum(ammo[:, np.newaxis] - cumulative_loss, 0)
+
+        # First blast after which artillery is destroyed (damage >= 50) or ammo unit is empty (ammo <= 0)
+        crossed = np.where(is_artillery[:, np.newaxis], damage_path >= 50, ammo_path <= 0)
+        has_crossed = crossed.any(axis=1)
+        first_crossed = np.argmax(crossed, axis=1)
+
+        damage_delta = np.where(is_artillery, damage_path[:, -1] - damage, 0)
+        ammo_delta = np.where(is_artillery, 0, ammo_path[:, -1] - ammo)
+
+        # Ordered events, only for units touched by blasts or crossed the limit
+        for unit_index in np.flatnonzero(loss.any(axis=1) | has_crossed).tolist():
+            unit_loss = loss[unit_index]
+            artillery = bool(is_artillery[unit_index])
+            crossing = int(first_crossed[unit_index]) if has_crossed[unit_index] and active[unit_index] else -1
+            blasts = np.flatnonzero(unit_loss).tolist()
+            if crossing >= 0 and unit_loss[crossing] == 0:
+                blasts = sorted(blasts + [crossing])
+            for blast_index in blasts:
+                if unit_loss[blast_index] > 0:
+                    events.append(('damage' if artillery else 'ammo_loss', unit_index, blast_index, int(unit_loss[blast_index])))
+                if blast_index == crossing:
+                    # Make unit and related unit inactive
+                    active[unit_index] = False
+                    partner = partners[unit_index]
+                    if artillery:
+                        events.append(('destroyed', unit_index, blast_index, 0))
+                        if partner >= 0:
+                            active[partner] = False
+                    else:
+                        events.append(('empty', unit_index, blast_index, 0))
+                        if partner >= 0:
+                            active[partner] = False
+                            events.append(('silenced', partner, blast_index, 0))
+
+        return damage_delta, ammo_delta, active, events
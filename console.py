@@ -9,7 +9,6 @@ if platform.system() == "Windows":
     from ctypes import windll
 
 from settings import Settings
-from units import Unit
 
 ############################################
 ##### Player's console (tablet) window #####
@@ -141,72 +140,226 @@ class SituationReport(tk.LabelFrame):
         self.report_area.see('end')
 
 
+class UnitVariables:
+    """A class to bind tkinter variables of console widgets to the plain unit of the battle engine"""
+
+    def __init__(self, unit):
+        self.unit = unit
+        if unit.unit_type == 'artillery':
+            self.damage = tk.IntVar(value=unit.damage)
+            self.azimuth = tk.StringVar(value=unit.azimuth)
+            self.elevation = tk.StringVar(value=unit.elevation)
+            self.charge = tk.StringVar(value=unit.charge)
+            # Battery is selected in the unit table for bulk edit
+            self.selected = tk.BooleanVar(value=False)
+        elif unit.unit_type == 'ammo':
+            self.ammo = tk.IntVar(value=unit.ammo)
+
+    def set_shot_parameters(self, azimuth, elevation, charge):
+        """Set values of the entry widgets, None clears the entry"""
+        self.azimuth.set('' if azimuth is None else azimuth)
+        self.elevation.set('' if elevation is None else elevation)
+        self.charge.set('' if charge is None else charge)
+
+    def push(self):
+        """Pass shot parameters from the entry widgets to the unit"""
+        if self.unit.unit_type == 'artillery':
+            self.unit.azimuth = self.azimuth.get()
+            self.unit.elevation = self.elevation.get()
+            self.unit.charge = self.charge.get()
+
+    def pull(self):
+        """Refresh damage and ammo labels from the unit"""
+        if self.unit.unit_type == 'artillery':
+            self.damage.set(self.unit.damage)
+        elif self.unit.unit_type == 'ammo':
+            self.ammo.set(self.unit.ammo)
+
+
+class UnitTable(tk.Frame):
+    """A class for scrollable table of player batteries, widgets are created for visible rows only and recycled while scrolling"""
+
+    def __init__(self, parent, batteries, unit_variables, is_locked, visible_rows=None, **kwargs):
+        super().__init__(parent, bg="#3D5328", **kwargs)
+        self.batteries = batteries # List of (artillery unit, ammo unit)
+        self.unit_variables = unit_variables
+        self.is_locked = is_locked # Function returning True if shot parameters are confirmed (entries read-only)
+        self.visible_rows = min(visible_rows or Settings.console_visible_rows, len(batteries))
+        self.first_row = 0 # Index of the battery shown in the first row
+
+        # Add column headings, checkbox selects all active batteries
+        self.select_all = tk.BooleanVar(value=False)
+        tk.Checkbutton(self, variable=self.select_all, command=self.toggle_all, bg="#3D5328", activebackground="#3D5328", selectcolor="#59782b", bd=0, highlightthickness=0).grid(row=0, column=0)
+        headings = ["UNIT", "AZIMUTH", "ELEVATION", "CHARGES", "DAMAGE,(%)", "GUN", "TRUCK", "AMMO", "STATUS"]
+        for column, heading in enumerate(headings, start=1):
+            tk.Label(self, text=heading, bg="#3D5328", font=("Courier New", 14, "bold")).grid(row=0, column=column, padx=5)
+
+        # Add widgets of the visible rows, they are bound to the batteries in refresh()
+        self.rows = [self.create_row(index) for index in range(self.visible_rows)]
+
+        # Add scrollbar if not all batteries fit in the table
+        self.scrollbar = None
+        if len(batteries) > self.visible_rows:
+            self.scrollbar = tk.Scrollbar(self, orient='vertical', command=self.on_scrollbar, bg="#3D5328", troughcolor="#59782b", activebackground="#3D5328")
+            self.scrollbar.grid(row=1, column=len(headings) + 1, rowspan=self.visible_rows, sticky="ns")
+        self.bind_mousewheel(self)
+
+        self.refresh()
+
+    def create_row(self, index):
+        """Create widgets of one table row"""
+
+        row = {}
+        row['select'] = tk.Checkbutton(self, bg="#3D5328", activebackground="#3D5328", selectcolor="#59782b", bd=0, highlightthickness=0)
+        row['unit'] = tk.Label(self, bg="#3D5328", font=("Courier New", 14, "bold"), width=8)
+        for column, name in enumerate(('azimuth', 'elevation', 'charge')):
+            entry = tk.Entry(self, bg="#59782b", selectbackground="#3D5328", selectforeground="black", font=("Courier New", 14, "bold"), width=6, bd=0, justify='right', relief="solid", cursor="xterm", readonlybackground='#3D5328')
+            # Arrow keys move to the same entry of the next or previous battery, scrolling the table
+            entry.bind('<Down>', lambda event, index=index, name=name: self.move_focus(index, name, 1))
+            entry.bind('<Up>', lambda event, index=index, name=name: self.move_focus(index, name, -1))
+            row[name] = entry
+        row['damage'] = tk.Label(self, bg="#3D5328", font=("Courier New", 14, "bold"), width=4)
+        row['gun_status'] = tk.Label(self, bg="#3D5328", font=("Courier New", 14, "bold"), width=6)
+        row['truck'] = tk.Label(self, bg="#3D5328", font=("Courier New", 14, "bold"), width=6)
+        row['ammo'] = tk.Label(self, bg="#3D5328", font=("Courier New", 14, "bold"), width=4)
+        row['truck_status'] = tk.Label(self, bg="#3D5328", font=("Courier New", 14, "bold"), width=6)
+
+        for column, name in enumerate(('select', 'unit', 'azimuth', 'elevation', 'charge', 'damage', 'gun_status', 'truck', 'ammo', 'truck_status')):
+            row[name].grid(row=index + 1, column=column, padx=5, pady=1)
+            self.bind_mousewheel(row[name])
+        return row
+
+    def bind_mousewheel(self, widget):
+        widget.bind("<MouseWheel>", self.on_mousewheel)
+        widget.bind("<Button-4>", self.on_mousewheel)
+        widget.bind("<Button-5>", self.on_mousewheel)
+
+    def refresh(self):
+        """Bind rows to the batteries from the first visible row, update states and statuses"""
+
+        locked = self.is_locked()
+        for index, row in enumerate(self.rows):
+            artillery_unit, ammo_unit = self.batteries[self.first_row + index]
+            artillery_variables = self.unit_variables[artillery_unit]
+            row['select'].configure(variable=artillery_variables.selected, state='normal' if artillery_unit.is_active else 'disabled')
+            row['unit'].configure(text=f"UNIT {artillery_unit.unit_number}")
+            # Entries of inactive units and confirmed parameters are read-only
+            for name in ('azimuth', 'elevation', 'charge'):
+                row[name].configure(textvariable=getattr(artillery_variables, name), state='readonly' if locked or not artillery_unit.is_active else 'normal')
+            row['damage'].configure(textvariable=artillery_variables.damage)
+            row['gun_status'].configure(text='Active' if artillery_unit.is_active else 'Down')
+            if ammo_unit is not None:
+                row['truck'].configure(text=ammo_unit.name)
+                row['ammo'].configure(textvariable=self.unit_variables[ammo_unit].ammo)
+                row['truck_status'].configure(text='Active' if ammo_unit.is_active else 'Down')
+
+        if self.scrollbar is not None:
+            self.scrollbar.set(self.first_row / len(self.batteries), (self.first_row + self.visible_rows) / len(self.batteries))
+
+    def scroll_to(self, first_row):
+        first_row = max(0, min(first_row, len(self.batteries) - self.visible_rows))
+        if first_row != self.first_row:
+            self.first_row = first_row
+            self.refresh()
+
+    def see(self, battery_index):
+        """Scroll the table to show the battery"""
+        if battery_index < self.first_row:
+            self.scroll_to(battery_index)
+        elif battery_index >= self.first_row + self.visible_rows:
+            self.scroll_to(battery_index - self.visible_rows + 1)
+
+    def on_scrollbar(self, *args):
+        if args[0] == 'moveto':
+            self.scroll_to(round(float(args[1]) * len(self.batteries)))
+        elif args[0] == 'scroll':
+            step = self.visible_rows if args[2] == 'pages' else 1
+            self.scroll_to(self.first_row + int(args[1]) * step)
+
+    def on_mousewheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.scroll_to(self.first_row - 1)
+        elif event.num == 5 or event.delta < 0:
+            self.scroll_to(self.first_row + 1)
+        return "break"
+
+    def move_focus(self, row_index, name, step):
+        """Move focus to the entry of the next or previous battery"""
+
+        battery_index = self.first_row + row_index + step
+        if 0 <= battery_index < len(self.batteries):
+            self.see(battery_index)
+            self.rows[battery_index - self.first_row][name].focus_set()
+        return "break"
+
+    def toggle_all(self):
+        """Select or clear all active batteries"""
+        for artillery_unit, _ in self.batteries:
+            self.unit_variables[artillery_unit].selected.set(self.select_all.get() and artillery_unit.is_active)
+
+
 class ShotParameterInput(tk.LabelFrame):
     """A class to display entry widgets for input of shot parameters"""
 
-    def __init__(self, parent, situation_report_reference, game_loop_reference, units, **kwargs):
+    def __init__(self, parent, situation_report_reference, game_loop_reference, units, unit_variables, **kwargs):
         super().__init__(parent,**kwargs)
         self.situation_report = situation_report_reference
         self.game_loop = game_loop_reference
         self.player_units = units[Settings.player_role]
+        self.unit_variables = unit_variables # Tkinter variables of the player units
+        self.batteries = [(unit, unit.related_unit) for unit in self.player_units if unit.unit_type == "artillery"]
+        self.locked = False # Shot parameters are confirmed, entries are read-only
+        self.battle_over = False # Entries stay read-only after the battle
         self.make_copy_of_units() # Create copy to be able reset to initial
 
         # Configure labelframe
         self.configure(text="Shot Parameter Input", bg="#3D5328", labelanchor="nw", bd=1, relief="solid", font=("TkDefaultFont", 12, "italic"))
         self.grid(row=1, column=0, columnspan=4, sticky="nsew", padx=10, pady=10)
-        # Expand widgets in main frame columns 
+        # Expand widgets in main frame columns
         for column in range(1, 4):
             self.master.grid_columnconfigure(column, weight=1)
-        
-        # Add input fields names
-        azimuth_label = tk.Label(self, text="AZIMUTH\n(0.0-±360.0)", bg="#3D5328",  font=("Courier New", 14, "bold"))
-        elevation_label = tk.Label(self, text="ELEVATION\n(15.0-75.0)", bg="#3D5328", font=("Courier New", 14, "bold"))
-        charge_label = tk.Label(self, text="  CHARGES\n  (1-5)", bg="#3D5328", font=("Courier New", 14, "bold"))
-        azimuth_label.grid(row=1, column=0, sticky="w", padx=10)
-        elevation_label.grid(row=2, sticky="w", column=0, padx=10)
-        charge_label.grid(row=3, sticky="w", column=0, padx=10)
-        
-        # Add a list to store entry widgets
-        self.entry_widgets = []
-
-        # Add unit names and input boxes
-        for unit in self.player_units:
-            if unit.unit_type == "artillery":
-                artillery_unit_number = f"UNIT {unit.unit_number}"
-                unit_label = tk.Label(self, text=artillery_unit_number, bg="#3D5328", font=("Courier New", 14, "bold"))
-                azimuth_entry = tk.Entry(self, textvariable=unit.azimuth, bg="#59782b", selectbackground="#3D5328", selectforeground="black", font=("Courier New", 14, "bold"), width=6, bd=0, justify='right', relief="solid", cursor="xterm", readonlybackground='#3D5328')
-                elevation_entry = tk.Entry(self, textvariable=unit.elevation, bg="#59782b", selectbackground="#3D5328", selectforeground="black", font=("Courier New", 14, "bold"), width=6, bd=0, justify='right', relief="solid", cursor="xterm", readonlybackground='#3D5328')
-                charges_entry = tk.Entry(self, textvariable=unit.charge, bg="#59782b", selectbackground="#3D5328", selectforeground="black", font=("Courier New", 14, "bold"), width=6, bd=0, justify='right', relief="solid", cursor="xterm", readonlybackground='#3D5328')
-                unit_label.grid(row=0, column=unit.unit_number, sticky="ew", padx=10)
-                azimuth_entry.grid(row=1, column=unit.unit_number, padx=10)
-                elevation_entry.grid(row=2, column=unit.unit_number, padx=10)
-                charges_entry.grid(row=3, column=unit.unit_number, padx=10)
-
-                # Add the entries to the list along with the unit's information
-                self.entry_widgets.append((azimuth_entry, unit))
-                self.entry_widgets.append((elevation_entry, unit))
-                self.entry_widgets.append((charges_entry, unit))
-
-                self.grid_columnconfigure(unit.unit_number, weight=1)
-            else:
-                continue
+        self.grid_columnconfigure(0, weight=1)
+
+        # Add table of the batteries with input boxes
+        self.unit_table = UnitTable(self, self.batteries, self.unit_variables, lambda: self.locked)
+        self.unit_table.grid(row=0, column=0, padx=10)
+
+        # Add bulk edit of selected units: parameters typed here or copied from a unit
+        frame_for_bulk_edit = tk.Frame(self, bg="#3D5328")
+        frame_for_bulk_edit.grid(row=1, column=0, padx=10, pady=(10, 0))
+        self.bulk_variables = {name: tk.StringVar() for name in ('azimuth', 'elevation', 'charge')}
+        self.copy_unit_number = tk.StringVar()
+        tk.Label(frame_for_bulk_edit, text="SELECTED:", bg="#3D5328", font=("Courier New", 14, "bold")).grid(row=0, column=0, padx=5)
+        for column, name in enumerate(('azimuth', 'elevation', 'charge'), start=1):
+            tk.Entry(frame_for_bulk_edit, textvariable=self.bulk_variables[name], bg="#59782b", selectbackground="#3D5328", selectforeground="black", font=("Courier New", 14, "bold"), width=6, bd=0, justify='right', relief="solid", cursor="xterm").grid(row=0, column=column, padx=5)
+        self.bulk_buttons = {}
+        self.bulk_buttons["APPLY TO SELECTED"] = tk.Button(frame_for_bulk_edit, text="APPLY TO SELECTED", bg="#3D5328", bd=1, cursor="hand2", command=self.apply_to_selected, font=("Courier New", 14, "bold"), relief="flat", activebackground="#59782b", disabledforeground="#3D5328", overrelief="solid")
+        self.bulk_buttons["APPLY TO SELECTED"].grid(row=0, column=4, padx=10)
+        tk.Entry(frame_for_bulk_edit, textvariable=self.copy_unit_number, bg="#59782b", selectbackground="#3D5328", selectforeground="black", font=("Courier New", 14, "bold"), width=4, bd=0, justify='right', relief="solid", cursor="xterm").grid(row=0, column=5, padx=5)
+        self.bulk_buttons["COPY FROM UNIT"] = tk.Button(frame_for_bulk_edit, text="COPY FROM UNIT", bg="#3D5328", bd=1, cursor="hand2", command=self.copy_from_unit, font=("Courier New", 14, "bold"), relief="flat", activebackground="#59782b", disabledforeground="#3D5328", overrelief="solid")
+        self.bulk_buttons["COPY FROM UNIT"].grid(row=0, column=6, padx=10)
 
         # Insert frame for the buttons
         frame_for_buttons = tk.Frame(self, bg="#3D5328")
-        frame_for_buttons.grid(row=4, column=0, columnspan=int(len(self.player_units) / 2 + 1), padx=10, pady=10)
+        frame_for_buttons.grid(row=2, column=0, padx=10, pady=10)
 
         # Add buttons to manage input and shot
         buttons = {
-                "SHOW INITIAL": {   
+                "SHOW INITIAL": {
                                     "color": "#3D5328",
                                     "state": "normal",
                                     "command": lambda: self.show_previous(self.player_units_copy),
                                     },
-                "RESET": {  
+                "RESET": {
                                     "color": "#3D5328",
                                     "state": "normal",
                                     "command": lambda: self.reset_to_previous(self.player_units_copy),
                                     },
+                "SOLVE": {
+                                    "color": "#3D5328",
+                                    "state": "normal",
+                                    "command": self.solve,
+                                    },
                 "CONFIRM": {
                                     "color": "#3D5328",
                                     "state": "normal",
@@ -220,7 +373,7 @@ class ShotParameterInput(tk.LabelFrame):
                 }
         self.buttons = {}
         for index, (text, button_configure) in enumerate(buttons.items()):
-            button = tk.Button(frame_for_buttons, text=text, bg=button_configure["color"], bd=1, cursor="hand2", command=button_configure["command"], font=("Courier New", 14, "bold"), width=20, relief="flat", state=button_configure["state"], activebackground="#59782b", disabledforeground="#3D5328", overrelief="solid")
+            button = tk.Button(frame_for_buttons, text=text, bg=button_configure["color"], bd=1, cursor="hand2", command=button_configure["command"], font=("Courier New", 14, "bold"), width=16, relief="flat", state=button_configure["state"], activebackground="#59782b", disabledforeground="#3D5328", overrelief="solid")
             button.grid(row=0, column=index, padx=10)
             self.buttons[text] = button
 
@@ -229,69 +382,127 @@ class ShotParameterInput(tk.LabelFrame):
         return self.player_units_copy
 
     def copy_unit(self, unit):
-        """Function to make copy of units containing StringVar"""
-        if unit.unit_type == 'artillery':
-            return Unit(unit.unit_number, unit.unit_type, unit.coords, unit.image_direction, unit.player_role, unit.unit_orientation, unit.azimuth.get(), unit.elevation.get(), unit.charge.get())
-        elif unit.unit_type == 'ammo':
-            return Unit(unit.unit_number, unit.unit_type, unit.coords, unit.image_direction, unit.player_role, unit.unit_orientation)
+        """Function to make copy of unit with its current shot parameters"""
+        return copy.copy(unit)
 
 
     def show_previous(self, player_units_copy):
         """Shows message in status report area of previous entry values"""
-        
-        units_labels = ["    "]
-        azimuths = []
-        elevations = []
-        charges = []
-        
+
         # Prepare data
+        columns = []
         for unit in self.player_units_copy:
             if unit.unit_type == "artillery":
-                units_labels.append(f"Unt{unit.unit_number}")
-                if unit.azimuth.get():
-                    azimuths.append(f"{float(unit.azimuth.get())}")
-                else:
-                    azimuths.append('N/A')
-                if unit.elevation.get():
-                    elevations.append(f"{float(unit.elevation.get())}")
-                else:
-                    elevations.append('N/A')
-                if unit.charge.get():
-                    charges.append(f"{float(unit.charge.get())}")
-                else:
-                    charges.append('N/A')
-            else:
-                continue
+                columns.append((f"Unt{unit.unit_number}",
+                                f"{float(unit.azimuth)}" if unit.azimuth else 'N/A',
+                                f"{float(unit.elevation)}" if unit.elevation else 'N/A',
+                                f"{float(unit.charge)}" if unit.charge else 'N/A'))
 
-        # Prepare the report message
-        length = 27 - int(len(self.player_units_copy) * 3 / 2) # Center table
-        spaces = " " * length
+        # Prepare the report message, the table is split to blocks fitting the width of situation report
         report_message = "Showing initial shot parameters:\n"
-        report_message += f"{spaces}" + " ".join(f"{unit_label:>5}" for unit_label in units_labels) + "\n"
-        report_message += f"{spaces}" + "AZMT: " + " ".join(f"{azimuth:>5}" for azimuth in azimuths) + "\n"
-        report_message += f"{spaces}" + "ELVT: " + " ".join(f"{elevation:>5}" for elevation in elevations) + "\n"
-        report_message += f"{spaces}" + "CHRG: " + " ".join(f"{charge:>5}" for charge in charges) + "\n"
+        units_per_line = Settings.report_units_per_line
+        for start in range(0, len(columns), units_per_line):
+            block = columns[start:start + units_per_line]
+            length = 27 - int(len(block) * 3) # Center table
+            spaces = " " * length
+            report_message += f"{spaces}" + "      " + " ".join(f"{column[0]:>5}" for column in block) + "\n"
+            report_message += f"{spaces}" + "AZMT: " + " ".join(f"{column[1]:>5}" for column in block) + "\n"
+            report_message += f"{spaces}" + "ELVT: " + " ".join(f"{column[2]:>5}" for column in block) + "\n"
+            report_message += f"{spaces}" + "CHRG: " + " ".join(f"{column[3]:>5}" for column in block) + "\n"
 
         self.situation_report.insert_message(report_message)
 
+    def refresh(self):
+        """Refresh statuses and entry states of the unit table"""
+        self.unit_table.refresh()
+
+    def unlock(self):
+        """Make entries of active units editable, new parameters shall be confirmed before the shot"""
+        if self.battle_over:
+            return
+        self.locked = False
+        self.unit_table.refresh()
+        self.buttons['FIRE'].config(state='disabled')
+        self.buttons['CONFIRM'].config(state='normal')
+
+    def end_battle(self):
+        """Lock entries and disable buttons changing or firing shot parameters"""
+        self.battle_over = True
+        self.locked = True
+        self.unit_table.refresh()
+        for text in ('FIRE', 'CONFIRM', 'RESET', 'SOLVE'):
+            self.buttons[text].config(state='disabled')
+        for button in self.bulk_buttons.values():
+            button.config(state='disabled')
+
     def reset_to_previous(self, player_units_copy):
         """Resets entry widgets to previous values"""
-        for entry, unit in self.entry_widgets:
-            if unit.is_active: # Leave entry readonly for inactive units
-                entry.config(state='normal')
         for unit, unit_copy in zip(self.player_units, self.player_units_copy):
             if unit.unit_type == 'artillery':
                 if unit.is_active:
-                    unit.azimuth.set(unit_copy.azimuth.get())
-                    unit.elevation.set(unit_copy.elevation.get())
-                    unit.charge.set(unit_copy.charge.get())
+                    self.unit_variables[unit].set_shot_parameters(unit_copy.azimuth, unit_copy.elevation, unit_copy.charge)
                 else: # Kill unit's values if inactive
-                    unit.azimuth.set("0.0")
-                    unit.elevation.set("15.0")
-                    unit.charge.set("1")
-        self.buttons['FIRE'].config(state='disabled')
-        self.buttons['CONFIRM'].config(state='normal')
+                    self.unit_variables[unit].set_shot_parameters("0.0", "15.0", "1")
+        self.unlock()
+
+    def get_selected_units(self):
+        """Return active selected artillery units"""
+        return [unit for unit, _ in self.batteries if unit.is_active and self.unit_variables[unit].selected.get()]
+
+    def apply_to_selected(self):
+        """Sets shot parameters typed in bulk edit to all selected units, empty fields are left unchanged"""
+
+        if self.battle_over:
+            return
+        if self.locked:
+            self.situation_report.insert_message("Shot parameters are confirmed, reset them to edit.")
+            return
+        selected_units = self.get_selected_units()
+        if not selected_units:
+            self.situation_report.insert_message("Select active units first.")
+            return
+        for unit in selected_units:
+            for name, variable in self.bulk_variables.items():
+                if variable.get().strip():
+                    getattr(self.unit_variables[unit], name).set(variable.get().strip())
+        self.unlock()
+        self.situation_report.insert_message(f"Shot parameters are set to {len(selected_units)} units, confirm to fire.")
+
+    def copy_from_unit(self):
+        """Copies shot parameters of the unit to bulk edit and all selected units"""
+
+        unit_number = self.copy_unit_number.get().strip()
+        source_unit = next((unit for unit, _ in self.batteries if str(unit.unit_number) == unit_number), None)
+        if source_unit is None:
+            self.situation_report.insert_message(f"There is no unit {unit_number} to copy from.")
+            return
+        for name, variable in self.bulk_variables.items():
+            variable.set(getattr(self.unit_variables[source_unit], name).get())
+        self.apply_to_selected()
+
+    def solve(self):
+        """Fills entries of active units with fire-control solutions for the target marked on radar"""
+
+        if self.battle_over:
+            return
+        target_coords = self.game_loop.radar.target_coords
+        if target_coords is None:
+            self.situation_report.insert_message("Mark the target on radar first (left mouse click).")
+            return
+
+        # Solve all guns at once, the most accurate solution first
+        artillery_units = [unit for unit in self.player_units if unit.unit_type == 'artillery' and unit.is_active]
+        solutions = self.game_loop.fire_control.solve_all([unit.coords for unit in artillery_units], target_coords)
+        for unit, unit_solutions in zip(artillery_units, solutions):
+            if unit_solutions:
+                solution = unit_solutions[0]
+                self.unit_variables[unit].set_shot_parameters(f"{solution.azimuth}", f"{solution.elevation}", f"{solution.charge}")
+            else:
+                self.situation_report.insert_message(f"The target is out of range of unit {unit.unit_number}.")
 
+        # New parameters shall be confirmed before the shot
+        self.unlock()
+        self.situation_report.insert_message("Fire-control solutions are set, confirm to fire.")
 
     def confirm(self):
         """Checks player's input and activates 'Fire' button"""
@@ -299,11 +510,11 @@ class ShotParameterInput(tk.LabelFrame):
         message = self.validate_input()
         self.situation_report.insert_message(message)
         if message == "Ready for shot":
-            for entry, unit in self.entry_widgets:
-                entry.config(state='readonly')
+            self.locked = True
+            self.unit_table.refresh()
             self.buttons['FIRE'].config(state='normal')
             self.buttons['CONFIRM'].config(state='disabled')
-        
+
     def validate_input(self):
         """Validates player input"""
         error_messages = []
@@ -311,9 +522,9 @@ class ShotParameterInput(tk.LabelFrame):
         for unit in self.player_units:
             if unit.unit_type == "artillery":
                 try:
-                    azimuth = float(unit.azimuth.get())
-                    elevation = float(unit.elevation.get())
-                    charge = int(unit.charge.get())
+                    azimuth = float(self.unit_variables[unit].azimuth.get())
+                    elevation = float(self.unit_variables[unit].elevation.get())
+                    charge = int(self.unit_variables[unit].charge.get())
 
                     if not (-360.0 <= azimuth <= 360.0):
                         error_messages.append(f"The specified azimuth of unit {unit.unit_number} is not valid.")
@@ -336,31 +547,23 @@ class ShotParameterInput(tk.LabelFrame):
 
 
 class UnitStatus(tk.LabelFrame):
-    """A class to display unit status"""
+    """A class to display summary of unit status, status of every battery is shown in the unit table"""
 
-    def __init__(self, parent, units, **kwargs):
+    def __init__(self, parent, units, unit_variables, **kwargs):
         super().__init__(parent, **kwargs)
-        player_units = units[Settings.player_role]
+        self.player_units = units[Settings.player_role]
         self.configure(text="Unit Status", bg="#3D5328", labelanchor="nw", bd=1, relief="solid", font=("TkDefaultFont", 12, "italic"))
         self.grid(row=2, column=0, columnspan=4, sticky="nsew", padx=10, pady=10)
-        damage_label = tk.Label(self, text="DAMAGE,(%)", bg="#3D5328", font=("Courier New", 14, "bold"))
-        ammo_label = tk.Label(self, text="AMMO,(pcs)", bg="#3D5328",  font=("Courier New", 14, "bold"))
-        damage_label.grid(row=2, column=0, sticky="w", padx=10)
-        ammo_label.grid(row=4, sticky="w", column=0, padx=10)
-
-        for unit in player_units:
-            if unit.unit_type == "artillery":
-                unit_name = f"Unit {unit.unit_number}"
-                unit_label = tk.Label(self, text=unit_name.upper(), bg="#3D5328", font=("Courier New", 14, "bold"))
-                name_label = tk.Label(self, text=unit.name, bg="#3D5328", font=("Courier New", 14, "bold"))
-                damage_label = tk.Label(self, textvariable=unit.damage, bg="#3D5328", font=("Courier New", 14, "bold"))
-                unit_label.grid(row=0, column=unit.unit_number, sticky="nsew", padx=10)
-                name_label.grid(row=1, column=unit.unit_number, sticky="nsew", padx=10)
-                damage_label.grid(row=2, sticky="nsew", column=unit.unit_number, padx=10)
-                self.grid_columnconfigure(unit.unit_number, weight=1)
-            else:
-                ammo_name_label = tk.Label(self, text=unit.name, bg="#3D5328", font=("Courier New", 14, "bold"))
-                ammo_label = tk.Label(self, textvariable=unit.ammo, bg="#3D5328",  font=("Courier New", 14, "bold"))
-                ammo_name_label.grid(row=3, column=unit.unit_number, sticky="nsew", padx=10)
-                ammo_label.grid(row=4, sticky="nsew", column=unit.unit_number, padx=10)
-                continue
+        self.summary = tk.StringVar()
+        tk.Label(self, textvariable=self.summary, bg="#3D5328", font=("Courier New", 14, "bold")).pack(padx=10)
+        self.refresh()
+
+    def refresh(self):
+        """Update the summary from the player units"""
+
+        guns = [unit for unit in self.player_units if unit.unit_type == "artillery"]
+        trucks = [unit for unit in self.player_units if unit.unit_type == "ammo"]
+        active_guns = sum(unit.is_active for unit in guns)
+        active_trucks = sum(unit.is_active for unit in trucks)
+        ammo = sum(unit.ammo for unit in trucks if unit.is_active)
+        self.summary.set(f"GUNS ACTIVE: {active_guns}/{len(guns)}    TRUCKS ACTIVE: {active_trucks}/{len(trucks)}    AMMO LEFT: {ammo} pcs")
@@ -0,0 +1,171 @@
+import io
+import os
+import json
+import time
+import queue
+import struct
+import threading
+import numpy as np
+
+from settings import Settings
+
+###################################
+##### Battle event log module #####
+###################################
+
+# Battle events are written to an append-only file of compressed columnar chunks:
+#   [b'AWEV'][header length, uint32][header, JSON][data length, uint64][data, compressed NumPy .npz]
+# Header of a chunk keeps number of rows and sets of event kinds, battles and units in it, so a reader
+# skips chunks without wanted events and never loads more than one chunk into memory.
+# Rows are buffered by the caller and compressed and written by a background thread.
+
+MAGIC = b'AWEV'
+
+EVENT_KINDS = ('fired', 'dud', 'incoming', 'blast', 'blast_count', 'impact', 'broken', 'damage', 'destroyed', 'ammo_loss', 'empty', 'silenced')
+EVENT_CODES = {kind: code for code, kind in enumerate(EVENT_KINDS)}
+ROLES = ('Defender', 'Intruder')
+
+# Columns of the log and their types; missing unit is -1, missing coordinates are NaN
+COLUMNS = (
+    ('war', np.int64),  # war id, e.g. seed of the war
+    ('battle', np.int32),  # battle number in the war
+    ('turn', np.int32),
+    ('time', np.float64),  # seconds since epoch
+    ('kind', np.int8),  # index in EVENT_KINDS
+    ('unit', np.int32),  # index of the unit in the battle
+    ('unit_number', np.int16),
+    ('role', np.int8),  # index in ROLES
+    ('x', np.float32),
+    ('y', np.float32),
+    ('value', np.int32),
+)
+
+
+class EventLogWriter:
+    """A class to append battle events to the log, compression and writing are done in a background thread"""
+
+    def __init__(self, path, chunk_size=None):
+        self.path = path
+        self.chunk_size = chunk_size or Settings.event_log_chunk_size
+        self.rows = []
+        self.queue = queue.Queue()
+        self.writer = threading.Thread(target=self.run_writer, name="EventLogWriter", daemon=True)
+        self.writer.start()
+
+    def log_report(self, war, battle_number, report, unit_indexes):
+        """Add events of the battle turn report"""
+
+        now = time.time()
+        for event in report.events:
+            unit = event.unit
+            x, y = event.coords if event.coords is not None else (np.nan, np.nan)
+            self.rows.append((war, battle_number, report.turn_index, now, EVENT_CODES[event.kind],
+                              unit_indexes.get(unit, -1), unit.unit_number if unit is not None else -1,
+                              ROLES.index(unit.player_role) if unit is not None else -1, x, y, event.value))
+        if len(self.rows) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Hand buffered rows over to the writer thread"""
+        if self.rows:
+            self.queue.put(self.rows)
+            self.rows = []
+
+    def close(self):
+        """Write all buffered rows and stop the writer thread"""
+        self.flush()
+        self.queue.put(None)
+        self.writer.join()
+
+    def run_writer(self):
+        with open(self.path, 'ab') as file:
+            while True:
+                rows = self.queue.get()
+                if rows is None:
+                    break
+                file.write(encode_chunk(rows))
+                file.flush()
+
+
+def encode_chunk(rows):
+    """Return bytes of one chunk of rows"""
+
+    columns = {name: np.array([row[index] for row in rows], dtype=dtype) for index, (name, dtype) in enumerate(COLUMNS)}
+    data = io.BytesIO()
+    np.savez_compressed(data, **columns)
+    data = data.getvalue()
+    header = json.dumps({
+        'rows': len(rows),
+        'kinds': np.unique(columns['kind']).tolist(),
+        'battles': [[int(war), int(battle)] for war, battle in sorted(set(zip(columns['war'].tolist(), columns['battle'].tolist())))],
+        'unit_numbers': np.unique(columns['unit_number']).tolist(),
+    }).encode()
+    return MAGIC + struct.pack('<I', len(header)) + header + struct.pack('<Q', len(data)) + data
+
+
+class EventLogReader:
+    """A class to stream events of the log chunk by chunk with filters"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def chunk_headers(self):
+        """Yield (header, file offset of data, data length) of all chunks, a truncated last chunk (e.g. the game was killed) is ignored"""
+
+        with open(self.path, 'rb') as file:
+            file_size = os.fstat(file.fileno()).st_size
+            while True:
+                magic = file.read(4)
+                if len(magic) < 4:
+                    return
+                if magic != MAGIC:
+                    raise ValueError(f"{self.path} is not a battle event log or it is damaged")
+                header_length = file.read(4)
+                if len(header_length) < 4:
+                    return
+                header_length, = struct.unpack('<I', header_length)
+                header = file.read(header_length)
+                data_length = file.read(8)
+                if len(header) < header_length or len(data_length) < 8:
+                    return
+                header = json.loads(header)
+                data_length, = struct.unpack('<Q', data_length)
+                if file.tell() + data_length > file_size:
+                    return
+                yield header, file.tell(), data_length
+                file.seek(data_length, io.SEEK_CUR)
+
+    def chunks(self, kinds=None, unit_number=None, role=None, war=None, battle=None):
+        """Yield dicts of column arrays with rows matching all given filters, one chunk at a time"""
+
+        kind_codes = {EVENT_CODES[kind] for kind in ([kinds] if isinstance(kinds, str) else kinds)} if kinds is not None else None
+        with open(self.path, 'rb') as file:
+            for header, offset, data_length in self.chunk_headers():
+                # Skip chunks without wanted events without decompressing them
+                if kind_codes is not None and not kind_codes.intersection(header['kinds']):
+                    continue
+                if unit_number is not None and unit_number not in header['unit_numbers']:
+                    continue
+                if war is not None and not any(chunk_war == war and (battle is None or chunk_battle == battle) for chunk_war, chunk_battle in header['battles']):
+                    continue
+
+                file.seek(offset)
+                with np.load(io.BytesIO(file.read(data_length))) as data:
+                    columns = {name: data[name] for name, _ in COLUMNS}
+                mask = np.ones(header['rows'], dtype=bool)
+                if kind_codes is not None:
+                    mask &= np.isin(columns['kind'], list(kind_codes))
+                if unit_number is not None:
+                    mask &= columns['unit_number'] == unit_number
+                if role is not None:
+                    mask &= columns['role'] == ROLES.index(role)
+                if war is not None:
+                    mask &= columns['war'] == war
+                if battle is not None:
+                    mask &= columns['battle'] == battle
+                if mask.any():
+                    yield {name: column[mask] for name, column in columns.items()}
+
+    def count(self, **filters):
+        """Return number of events matching the filters"""
+        return sum(len(columns['kind']) for columns in self.chunks(**filters))
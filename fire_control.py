@@ -0,0 +1,138 @@
+import math
+import functools
+import numpy as np
+
+from calculations import Shot
+
+###############################
+##### Fire-control module #####
+###############################
+
+# Range tables are built once per round's weather and map direction and kept in cache:
+#   - distance without wind for every charge (1-5) and elevation (15.0-75.0, step 0.1),
+#   - wind correction factor for every charge and azimuth (0.0-359.9, step 0.1).
+# The inverse problem (elevation for the distance) is solved by interpolation in the low (15-45)
+# and high (45-75) angle branches of the table, where the distance is monotonic.
+
+CHARGES = (1, 2, 3, 4, 5)
+MIN_ELEVATION = 15.0
+MAX_ELEVATION = 75.0
+ELEVATION_STEP = 0.1
+AZIMUTH_STEP = 0.1
+
+
+class FiringSolution:
+    """A class for one set of shot parameters to hit the target"""
+
+    def __init__(self, charge, elevation, azimuth, blast_coords, miss):
+        self.charge = charge  # 1-5
+        self.elevation = elevation  # degrees, 15.0-75.0
+        self.azimuth = azimuth  # degrees as entered on console, corrected for map direction
+        self.blast_coords = blast_coords  # expected blast position (x, y)
+        self.miss = miss  # distance from the expected blast to the target in pixels
+
+    def __repr__(self):
+        return f"FiringSolution(charge={self.charge}, elevation={self.elevation}, azimuth={self.azimuth}, miss={self.miss})"
+
+
+@functools.lru_cache(maxsize=16)
+def get_range_tables(v_1, g, wind_speed, wind_gust, wind_direction, map_direction):
+    """Return range tables: elevations, distances (charge, elevation) and wind factors (charge, azimuth)"""
+
+    charges = np.array(CHARGES, dtype=np.float64)
+    elevations = np.round(np.arange(MIN_ELEVATION, MAX_ELEVATION + ELEVATION_STEP / 2, ELEVATION_STEP), 1)
+    azimuths = np.round(np.arange(0, 360, AZIMUTH_STEP), 1)
+
+    # Distance in meters without wind, the same range equation as in calculations.Shot
+    v = v_1 * np.sqrt(charges)
+    distances = (v[:, np.newaxis]**2 / g) * np.sin(2 * np.radians(elevations))[np.newaxis, :]
+
+    # Wind correction: d_adjusted = d + wind_effect * d / v = d * (1 + wind_effect / v)
+    wind_direction = round((map_direction + wind_direction) % 360, 1)
+    wind_speed = wind_speed + (wind_gust - wind_speed) / 2
+    wind_effect = wind_speed * np.cos(math.radians(wind_direction) - np.radians(azimuths))
+    wind_factors = 1 + wind_effect[np.newaxis, :] / v[:, np.newaxis]
+
+    return elevations, distances, wind_factors
+
+
+class FireControl:
+    """A class for fire-control computer: calculates shot parameters for guns to hit the target point"""
+
+    def __init__(self, shot, weather_conditions, map_direction):
+        """Set the round conditions and get range tables for them"""
+
+        self.shot = shot if shot is not None else Shot()
+        self.map_direction = map_direction
+        self.wind_speed = weather_conditions["Wind Speed,(m/s)"]
+        self.wind_gust = weather_conditions["Wind Gust,(m/s)"]
+        self.wind_direction = weather_conditions["Wind Direction,(°)"]
+        self.elevations, self.distances, self.wind_factors = get_range_tables(
+            self.shot.v_1, self.shot.g, self.wind_speed, self.wind_gust, self.wind_direction, self.map_direction)
+
+        # Split table to low and high angle branches with increasing distance for interpolation
+        middle = int(np.argmax(self.distances[0]))
+        self.low_elevations = self.elevations[:middle + 1]
+        self.low_distances = self.distances[:, :middle + 1]
+        self.high_elevations = self.elevations[middle:][::-1]
+        self.high_distances = self.distances[:, middle:][:, ::-1]
+
+    def solve(self, gun_coords, target_coords):
+        """Return all valid solutions for the gun to hit the target, the most accurate first"""
+        return self.solve_all([gun_coords], target_coords)[0]
+
+    def solve_all(self, guns_coords, target_coords):
+        """Return lists of valid solutions for each gun to hit the same target, the most accurate first"""
+
+        guns_coords = np.asarray(guns_coords, dtype=np.float64).reshape(-1, 2)
+        if len(guns_coords) == 0:
+            return []
+
+        # Distance in meters and true azimuth (north is up of the map) to the target
+        dx = target_coords[0] - guns_coords[:, 0]
+        dy = guns_coords[:, 1] - target_coords[1]
+        target_distance = np.sqrt(dx**2 + dy**2) * self.shot.scale
+        true_azimuth = np.round(np.degrees(np.arctan2(dx, dy)) % 360, 1) % 360
+        # Azimuth to enter on console, the shot adds map direction to it
+        console_azimuth = np.round((true_azimuth - self.map_direction) % 360, 1) % 360
+
+        # Distance to reach without wind
+        azimuth_index = np.rint(true_azimuth / AZIMUTH_STEP).astype(np.int64) % self.wind_factors.shape[1]
+        factors = self.wind_factors[:, azimuth_index]  # (charge, gun)
+        no_wind_distance = np.where(factors > 0, target_distance[np.newaxis, :] / np.where(factors > 0, factors, 1), np.inf)
+
+        # Interpolate elevations in both branches of the range table
+        candidates = []  # (gun index, charge, elevation)
+        for charge_index, charge in enumerate(CHARGES):
+            for elevations, distances in ((self.low_elevations, self.low_distances[charge_index]), (self.high_elevations, self.high_distances[charge_index])):
+                reachable = (no_wind_distance[charge_index] >= distances[0]) & (no_wind_distance[charge_index] <= distances[-1])
+                gun_indexes = np.flatnonzero(reachable)
+                if len(gun_indexes) == 0:
+                    continue
+                elevation = np.round(np.interp(no_wind_distance[charge_index, gun_indexes], distances, elevations), 1)
+                elevation = np.clip(elevation, MIN_ELEVATION, MAX_ELEVATION)
+                for gun_index, gun_elevation in zip(gun_indexes.tolist(), elevation.tolist()):
+                    candidates.append((gun_index, charge, gun_elevation))
+
+        solutions = [[] for _ in range(len(guns_coords))]
+        if not candidates:
+            return solutions
+
+        # Check all candidates with the same calculations as the shot is made
+        gun_indexes = [gun_index for gun_index, _, _ in candidates]
+        blast_positions = self.shot.calculate_shot_end_positions(
+            guns_coords[gun_indexes, 0], guns_coords[gun_indexes, 1],
+            [charge for _, charge, _ in candidates], [elevation for _, _, elevation in candidates], console_azimuth[gun_indexes],
+            self.map_direction, self.wind_speed, self.wind_gust, self.wind_direction)
+        misses = np.sqrt(((blast_positions - np.asarray(target_coords, dtype=np.float64))**2).sum(axis=1))
+
+        seen = set()
+        for (gun_index, charge, elevation), blast_position, miss in zip(candidates, blast_positions.tolist(), misses.tolist()):
+            # Low and high branches may meet at 45 degrees
+            if (gun_index, charge, elevation) in seen:
+                continue
+            seen.add((gun_index, charge, elevation))
+            solutions[gun_index].append(FiringSolution(charge, elevation, float(console_azimuth[gun_index]), tuple(blast_position), round(miss, 1)))
+        for gun_solutions in solutions:
+            gun_solutions.sort(key=lambda solution: (solution.miss, solution.charge, solution.elevation))
+        return solutions
@@ -3,16 +3,21 @@ from tkinter import ttk
 import customtkinter as ctk
 import random
 import os
+import time
 import tempfile
 
 # Import application modules
-from console import Console, WeatherConditions, SituationReport, ShotParameterInput, UnitStatus
+from console import Console, WeatherConditions, SituationReport, ShotParameterInput, UnitStatus, UnitVariables
 from map import Map
 from radar import Radar
 from settings import Settings, SoundManager
 from setup import GameSetup
 from units import Unit
-from calculations import Shot
+from battle import Battle
+from fire_control import FireControl
+from replay import BattleRecorder
+from event_log import EventLogWriter
+from metrics import metrics
 
 ############################
 ##### Game loop module #####
@@ -36,9 +41,29 @@ class Play:
 
     def __init__(self, main_instance_reference):
         self.main = main_instance_reference
-        self.shot = Shot()
-        # Initialize mixer for game sound
-        self.sound_manager = SoundManager()
+        # Initialize mixer for game sound, cues are played by the frame scheduler of the app
+        self.sound_manager = SoundManager(scheduler=self.main.scheduler)
+
+        # Record of the current battle for replay
+        self.recorder = None
+
+        # Structured log of battle events for analysis
+        self.event_log = None
+        if Settings.log_events:
+            os.makedirs(os.path.dirname(Settings.event_log_path), exist_ok=True)
+            self.event_log = EventLogWriter(Settings.event_log_path)
+
+    def close_recorder(self):
+        """Close record of the current battle, also when the game is quit during the battle"""
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def close_event_log(self):
+        """Write buffered events and stop the writer thread of the event log"""
+        if self.event_log is not None:
+            self.event_log.close()
+            self.event_log = None
 
     def play_the_game(self, event=None):
         """Function for game and round setup, to open game windows and set navigation among windows"""
@@ -60,51 +85,64 @@ class Play:
         else:
             # Start counting battles
             Settings.battle_index += 1
+            # Profile the round if it is switched on by the environment variable
+            metrics.start_profile()
+            self.main.watchdog.set_phase('round_setup')
         
             # Bring root window on top of others
             self.main.root.attributes('-topmost', 1)
 
-            # Add a label with typing effect above war results
-            def type_label_text(label, text, index=0):
-                """Typing effect"""
-                if index < len(text):
-                    label.configure(text=label.cget("text") + text[index])
-                    self.sound_manager.play_sound('typing', delay=0)
-                    label.after(50, type_label_text, label, text, index+1)
-
+            # Add a label above war results, battle number is typed in it later
             self.battle_no_label = ctk.CTkLabel(master=self.main.root, text="ENTER THE", fg_color="#3D5328", text_color="black", font=("Courier New", 70, "bold"), padx=15)
             self.battle_no_label.place(relx=0.5, rely=0.04, anchor='center')
 
             # Setup the round
-            self.weather_conditions, self.units, map_path, radar_path, self.map_direction = self.setup.round_setup()
+            with metrics.span('round_setup'):
+                self.weather_conditions, self.units, map_path, radar_path, self.map_direction = self.setup.round_setup()
             self.all_units_list = self.units['Defender'] + self.units['Intruder']
-            self.turn_index = 0
 
-            # Setup initial empty list of targets for computer
-            self.target_units = [] 
+            # Setup the battle engine of the round
+            self.battle = Battle(self.units, self.weather_conditions, self.map_direction, unit_grid=self.setup.unit_grid, rng=self.setup.battle_rng)
+            # Indexes of units of the battle for event log
+            self.battle_unit_indexes = {unit: index for index, unit in enumerate(self.battle.all_units_list)}
+
+            # Record the battle for replay
+            self.recorder = None
+            if Settings.record_battles:
+                record_path = os.path.join(Settings.replay_dir, f"{time.strftime('%Y%m%d_%H%M%S')}_battle{Settings.battle_index}.jsonl")
+                self.recorder = BattleRecorder(self.battle, record_path)
+
+            # Fire-control computer with range tables for the weather of the round
+            self.fire_control = FireControl(self.battle.shot, self.weather_conditions, self.map_direction)
+
+            # Bind tkinter variables of console widgets to the player units
+            self.unit_variables = {unit: UnitVariables(unit) for unit in self.units[Settings.player_role]}
             
             # Open console view
-            self.console = Console(self.main.root)
-            WeatherConditions(self.console.main_frame, self.weather_conditions)
-            self.situation_report = SituationReport(self.console.main_frame)
-            self.situation_report.insert_message(f"             {Settings.call_sign}, WELCOME!")
-            self.shot_parameter_input = ShotParameterInput(self.console.main_frame, self.situation_report, self, self.units)
-            self.unit_status = UnitStatus(self.console.main_frame, self.units)
+            with metrics.span('window.console'):
+                self.console = Console(self.main.root)
+                WeatherConditions(self.console.main_frame, self.weather_conditions)
+                self.situation_report = SituationReport(self.console.main_frame)
+                self.situation_report.insert_message(f"             {Settings.call_sign}, WELCOME!")
+                self.shot_parameter_input = ShotParameterInput(self.console.main_frame, self.situation_report, self, self.units, self.unit_variables)
+                self.unit_status = UnitStatus(self.console.main_frame, self.units, self.unit_variables)
             self.situation_report.insert_message(f"      ----- ----- BATTLE #{Settings.battle_index} ----- -----")
 
             # Open drone view if defender
             if Settings.player_role == 'Defender':
-                self.map_drone = Map(self.main.root, map_path)
-                # Add units to the map
-                for unit in self.all_units_list:
-                    self.map_drone.add_unit(unit)
+                with metrics.span('window.map'):
+                    self.map_drone = Map(self.main.root, map_path, self.main.scheduler, self.setup.round_assets.map_tiles)
+                    # Add units to the map
+                    for unit in self.all_units_list:
+                        self.map_drone.add_unit(unit)
 
             # Open radar view
-            self.radar = Radar(self.main.root, radar_path, self.map_direction, self.weather_conditions["Wind Direction,(°)"], self.situation_report)
-            # Add units to the radar
-            for unit in self.all_units_list:
-                if unit.unit_type == 'artillery':
-                    self.radar.add_unit(unit)
+            with metrics.span('window.radar'):
+                self.radar = Radar(self.main.root, radar_path, self.map_direction, self.weather_conditions["Wind Direction,(°)"], self.situation_report, self.setup.round_assets.radar_image)
+                # Add units to the radar
+                for unit in self.all_units_list:
+                    if unit.unit_type == 'artillery':
+                        self.radar.add_unit(unit)
             
             # Hide other windows behind root
             if Settings.player_role != 'Intruder':
@@ -112,9 +150,12 @@ class Play:
             self.radar.radar_window.attributes('-topmost', 0)
             self.console.console.attributes('-topmost', 0)
             
+            # Prepare map and radar of the next round while this battle is played
+            self.setup.prefetch_next_round()
+
             # Show battle number above war report
             self.battle_no_label.configure(text="")
-            type_label_text(self.battle_no_label, f"BATTLE #{Settings.battle_index}")
+            self.main.scheduler.type_text(self.battle_no_label, f"BATTLE #{Settings.battle_index}", 50, lambda: self.sound_manager.play_sound('typing', delay=0))
 
             # Bind keyboard keys for navigation among console, drone, radar and war results
             self.main.root.unbind_all('c')
@@ -128,6 +169,7 @@ class Play:
             self.main.root.bind_all('c', self.raise_console)
             self.main.root.bind_all('s', self.raise_menu)
             self.main.root.bind_all('w', self.withdraw)
+            self.main.watchdog.set_phase('battle')
 
     def raise_map(self, event=None):
         """Drone view on top"""
@@ -185,7 +227,7 @@ class Play:
                 else:
                     player_units = self.units["Intruder"]
                 for unit in player_units:
-                    unit.is_active = False
+                    self.battle.deactivate(unit)
                 self.show_battle_results()
 
             def on_yes(event):
@@ -197,7 +239,7 @@ class Play:
                     if Settings.player_role == "Intruder":
                         self.situation_report.insert_message("\n     Let everything burn in HELL, we're getting out of here, every man for himself!")
                     # Give time to read message
-                    self.console.console.after(3000, withdraw_consequences)
+                    self.main.scheduler.call_later(3000, withdraw_consequences)
 
             def on_other_key(event):
                 """If negative answer"""
@@ -247,238 +289,87 @@ class Play:
         selected_message = random.choice(messages_list)
         return selected_message
 
+    @metrics.timed('make_turn')
     def make_turn(self):
         """Player fires shots from artillery guns and receives the same in return from computer, after shots checks for active units, if not - end battle"""
 
-        # Make copy of last parameters to be able reset them on console to initial
-        player_units_copy = self.shot_parameter_input.make_copy_of_units()
-        # Find roles and units of the player and computer
-        if Settings.player_role == "Defender":
-            player_units = self.units["Defender"]
-            computer_units = self.units["Intruder"]
-        else:
-            player_units = self.units["Intruder"]
-            computer_units = self.units["Defender"]
-        
-        # Lists for blast coordinates of player and computer used to draw on map and radar
-        blasts_list_player = [] 
-        blasts_list_computer = []
-        self.turn_index += 1 # Calculate turns (attacks)
-        self.situation_report.insert_message(f"      ----- ----- ATTACK #{self.turn_index} ----- -----")
-    
-        # Show in situation report latest shot parameters
-        self.shot_parameter_input.show_previous(player_units_copy)
-
-        def get_active_units(units):
-            """Return a list of active units."""
-            active_units = []
-            for unit in units:
-                # 1 in 30 chance that the unit is broken if it's an Intruder unit
-                if unit.player_role == "Intruder" and unit.unit_type == "artillery" and random.randint(1, 30) == 7:
-                    unit.is_active = False
-                    if Settings.player_role == "Defender":
-                        self.situation_report.insert_message(f"Unit {unit.name} Nr.{unit.unit_number} is silent.")
-                    else:
-                        self.situation_report.insert_message(f"Unit {unit.name} Nr.{unit.unit_number} is broken.")
-                    # Set related ammo unit to False
-                    for related_unit in self.all_units_list:
-                        if (related_unit.unit_number == unit.unit_number and 
-                            related_unit.unit_type == 'ammo' and 
-                            related_unit.player_role == unit.player_role):
-                            related_unit.is_active = False
-                if unit.is_active:
-                    active_units.append(unit)
-            return active_units
-        # Get active player units
-        self.active_player_units = get_active_units(player_units)
-        assert len(self.active_player_units) % 2 == 0
-
-        # Calculate trajectories of player's shots
-        for unit in self.active_player_units:
-            if unit.unit_type == "artillery":
-                x_start, y_start = unit.coords
-                p_charge = unit.charge
-                elevation = unit.elevation
-                azimuth = unit.azimuth
-                map_direction = self.map_direction
-                wind_speed = self.weather_conditions["Wind Speed,(m/s)"]
-                wind_gust = self.weather_conditions["Wind Gust,(m/s)"]
-                wind_direction = self.weather_conditions["Wind Direction,(°)"]
-                blast_position_player = self.shot.calculate_shot_end_position(x_start, y_start, p_charge, elevation, azimuth, map_direction, wind_speed, wind_gust, wind_direction)
-                # Intruders shots are less accurate
-                if Settings.player_role == "Intruder":
-                    blast_position_player = (blast_position_player[0] + random.randint(-100, 100), blast_position_player[1] + random.randint(-100, 100))
-                # Inform player about the shot
-                self.situation_report.insert_message(f"Unit {unit.name} Nr. {unit.unit_number} fired!")
-                shot_sound_length = random.uniform(0.3, self.sound_manager.sounds['shot'].get_length())
-                self.sound_manager.play_sound('shot', delay=shot_sound_length)
-                # Add blast coordinates to the list
-                if Settings.player_role == "Intruder" and random.randint(1, 30) == 7:
-                    # 1 in 30 chance that the shell will not explode if it's an Intruder shell
-                    self.situation_report.insert_message("The shell did not explode.")
-                else:
-                    blasts_list_player.append(blast_position_player)
-                # Subtract ammo shot made
-                related_units_found = 0
-                for related_unit in self.active_player_units:
-                    if (related_unit.unit_number == unit.unit_number and related_unit.unit_type == 'ammo'):
-                        related_unit.ammo.set(related_unit.ammo.get() - 1)
-                        related_units_found += 1
-                # Assert that exactly one related unit was found
-                assert related_units_found == 1, f"Unexpected number of related units found: {related_units_found}"
-        
-        # Computer makes decision which units to target
-        def select_random_units(active_units, num_units):
-            """Return a list of random units from the list of active units."""
-            return random.sample(active_units, num_units)
-
-        def computer_make_decision(player_units, computer_units):
-            """Have the AI make a decision on which units to target."""
-            
-            # Get active computer units
-            active_computer_units = get_active_units(computer_units)
-
-            # Intruder does not have drone, therefore does not see ammo units
-            if Settings.player_role == "Defender":
-                self.active_player_units = [unit for unit in self.active_player_units if unit.unit_type == 'artillery']
-
-            if self.active_player_units and active_computer_units:
-
-                # Decide how many units to target based on the number of active computer units
-                num_targets = min(len(active_computer_units), len(self.active_player_units))
-
-                # Select the targets
-                self.target_units = select_random_units(self.active_player_units, num_targets)
-                return self.target_units
-            else:
-                return []
+        self.main.watchdog.set_phase('make_turn')
+
+        # Pass shot parameters from console to the units of the battle engine
+        with metrics.span('make_turn.console_input'):
+            for unit_variables in self.unit_variables.values():
+                unit_variables.push()
+            # Make copy of last parameters to be able reset them on console to initial
+            player_units_copy = self.shot_parameter_input.make_copy_of_units()
+            self.situation_report.insert_message(f"      ----- ----- ATTACK #{self.battle.turn_index + 1} ----- -----")
+
+            # Show in situation report latest shot parameters
+            self.shot_parameter_input.show_previous(player_units_copy)
+
+        # Resolve the turn in the battle engine
+        if self.recorder is not None:
+            self.recorder.before_turn()
+        with metrics.span('make_turn.resolve'):
+            turn_report = self.battle.resolve_turn()
+        with metrics.span('make_turn.record'):
+            if self.recorder is not None:
+                self.recorder.after_turn(turn_report)
+            if self.event_log is not None:
+                self.event_log.log_report(self.setup.rng.seed, Settings.battle_index, turn_report, self.battle_unit_indexes)
+
+        # Show events of the turn to the player
+        with metrics.span('make_turn.show_events'):
+            for event in turn_report.events:
+                self.show_battle_event(event)
+
+        # Refresh damage and ammo on console
+        with metrics.span('make_turn.console_output'):
+            for unit_variables in self.unit_variables.values():
+                unit_variables.pull()
+            self.shot_parameter_input.refresh()
+            self.unit_status.refresh()
+        self.main.watchdog.set_phase('battle')
+
+        # End battle if there are no active units left
+        if turn_report.battle_over:
+            self.show_battle_results()
 
-        def computer_fire_shot(unit):
-            """Computer fires shot at player's unit position"""
-            
-            # First three shots of intruder shall be less accurate
-            if self.turn_index - 1 <= 2:
-                first_shots_correction = Settings.first_shots_accuracy[self.turn_index - 1]
+    def show_battle_event(self, event):
+        """Show battle engine event: message in situation report, sound, blast pit on the map and blast echo on radar"""
+
+        if event.message:
+            self.situation_report.insert_message(event.message)
+
+        if event.kind == 'fired':
+            # Sound of the shot
+            shot_sound_length = random.uniform(0.3, self.sound_manager.get_length('shot'))
+            self.sound_manager.play_sound('shot', delay=shot_sound_length)
+        elif event.kind == 'incoming':
+            # Make the sound of incoming shell
+            self.sound_manager.play_sound('incoming', delay=2)
+        elif event.kind == 'blast':
+            # Inform player about blast with sound
+            if event.value == 1:
+                blast_sound_length = 1
             else:
-                first_shots_correction = 0
-            if Settings.player_role == "Defender":
-                return (round(unit.coords[0] + random.randint(-300 - first_shots_correction, 300 + first_shots_correction)), round(unit.coords[1] + random.randint(-300 - first_shots_correction , 300 + first_shots_correction)))
-            else:
-                return (round(unit.coords[0] + random.randint(-150, 150)), round(unit.coords[1] + random.randint(-150, 150)))
-
-        # Computer chooses target units for the first time
-        if not self.target_units:
-            self.target_units = computer_make_decision(player_units, computer_units)
-
-        # Computer checks if in targets are disabled units
-        for unit in self.target_units:
-            if not unit.is_active:
-                self.target_units = computer_make_decision(player_units, computer_units)
-
-        # Computer fires shots at target units coords
-        # Make the sound of incoming shell
-        self.sound_manager.play_sound('incoming', delay=2)
-        target_index = 0
-        active_computer_artillery = [unit for unit in computer_units if unit.is_active and unit.unit_type == 'artillery']
-        blast_count = 0
-        for shooter in active_computer_artillery:
-            # Check if the current target is still active
-            while self.target_units and not self.target_units[target_index % len(self.target_units)].is_active:
-                # If not, find a new target and update target_index
-                self.target_units = computer_make_decision(player_units, computer_units)
-                if not self.target_units: # break the loop if no active target units found
-                    self.show_battle_results()
-                target_index = 0
-
-            if self.target_units: # if there are active target units
-                # Make the shot
-                blast_position_computer = computer_fire_shot(self.target_units[target_index])
-                # Calculate blast number
-                if Settings.player_role == "Defender" and random.randint(1, 30) == 7:
-                    # 1 in 30 chance that the shell will not explode if it's an Intruder shell
-                    self.situation_report.insert_message("A shell fell nearby but did not explode.")
-                else:
-                    blast_count += 1
-                    # Inform player about blast with sound
-                    if blast_count == 1:
-                        blast_sound_length = 1
-                    else:
-                        blast_sound_length = random.uniform(0.3, self.sound_manager.sounds['blast'].get_length())
-                    self.sound_manager.play_sound('blast', delay=blast_sound_length)
-                    # Add blast coordinates to the list
-                    blasts_list_computer.append(blast_position_computer)
-                if len(self.target_units) > 1:  # Check if there are still targets left
-                    target_index = (target_index + 1) % len(self.target_units)
-                # Subtract ammo shot made
-                for related_unit in computer_units:
-                    if related_unit.unit_number == shooter.unit_number and related_unit.unit_type == 'ammo':
-                        related_unit.ammo.set(related_unit.ammo.get() - 1)
-            else: # if no active target units, shooter units stop firing
-                self.show_battle_results()
-        # Inform player about blasts
-        self.situation_report.insert_message(f"{blast_count} enemy blasts counted")
-
-        # Draw blasts pits on the map and blasts echo arcs on radar
-        for index, blasts_list in enumerate((blasts_list_player, blasts_list_computer)):    
-            for coords in blasts_list:
+                blast_sound_length = random.uniform(0.3, self.sound_manager.get_length('blast'))
+            self.sound_manager.play_sound('blast', delay=blast_sound_length)
+        elif event.kind == 'impact':
+            # Draw blasts pits on the map and blasts echo arcs on radar
+            with metrics.span('make_turn.draw_blast'):
                 if Settings.player_role == "Defender":
-                    self.map_drone.add_blast_pit(coords)
-                self.radar.add_blast_echo(index, coords)
-        
-        # Loop through all units for damage and loss of ammo
-        blasts_list = blasts_list_player + blasts_list_computer
-        for unit in self.all_units_list:
-            # Loop through all blasts
-            for blast_coords in blasts_list:
-                # Calculate damage or ammo loss
-                loss = self.shot.calculate_damage_or_ammo_loss(unit, blast_coords)
-                if unit.unit_type == 'artillery':
-                    # Add damage to unit's health
-                    unit.damage.set(min(unit.damage.get() + loss, 100))
-                    if loss > 0:
-                        self.situation_report.insert_message(f"{unit.name} Nr.{unit.unit_number} got {loss} damage")
-                        # Sound of damage
-                        destroy_sound_length = random.uniform(0.3, self.sound_manager.sounds['destroy'].get_length())
-                        self.sound_manager.play_sound('destroy', delay=destroy_sound_length)
-                    if unit.damage.get() >= 50 and unit.is_active:
-                        # If the unit's damage is more than or equal to 50, make it and related unit inactive
-                        self.situation_report.insert_message(f"{unit.name} Nr.{unit.unit_number} was destroyed")
-                        unit.is_active = False
-                        for related_unit in self.all_units_list:
-                            if (related_unit.unit_number == unit.unit_number and 
-                                related_unit.unit_type == 'ammo' and 
-                                related_unit.player_role == unit.player_role):
-                                related_unit.is_active = False
-                elif unit.unit_type == 'ammo':
-                    # Subtract ammo loss from unit's ammo
-                    unit.ammo.set(max(unit.ammo.get() - loss, 0))
-                    if loss > 0:
-                        self.situation_report.insert_message(f"{unit.name} Nr.{unit.unit_number} was damaged")
-                        # Sound of damage
-                        destroy_sound_length = random.uniform(0.3, self.sound_manager.sounds['destroy'].get_length())
-                        self.sound_manager.play_sound('destroy', delay=destroy_sound_length)
-                    if unit.ammo.get() <= 0 and unit.is_active:
-                        # If the unit's ammo is less than or equal to 0, make it and related unit inactive
-                        self.situation_report.insert_message(f"{unit.name} Nr.{unit.unit_number} is empty")
-                        unit.is_active = False
-                        for related_unit in self.all_units_list:
-                            if (related_unit.unit_number == unit.unit_number and 
-                                related_unit.unit_type == 'artillery' and 
-                                related_unit.player_role == unit.player_role):
-                                related_unit.is_active = False
-                                self.situation_report.insert_message(f"{related_unit.name} Nr.{related_unit.unit_number} was silenced")
-
-        # Get active units
-        active_player_units = get_active_units(player_units)
-        active_computer_units = get_active_units(computer_units)
-        if active_player_units and active_computer_units:
-            pass
-        else:
-            self.show_battle_results()
-
+                    self.map_drone.add_blast_pit(event.coords)
+                self.radar.add_blast_echo(event.value, event.coords)
+        elif event.kind in ('damage', 'ammo_loss'):
+            # Sound of damage
+            destroy_sound_length = random.uniform(0.3, self.sound_manager.get_length('destroy'))
+            self.sound_manager.play_sound('destroy', delay=destroy_sound_length)
+
+    @metrics.timed('show_battle_results')
     def show_battle_results(self):
         """Shows statistics of the round"""
 
+        @metrics.timed('show_battle_results.report')
         def continue_execution():
             """Function created to make 3 sec pause before the console changes after message in situation report will be read"""
 
@@ -486,10 +377,8 @@ class Play:
             self.main.border_frame.pack_forget()
             self.raise_menu()
 
-            # Disable console 'fire' button
-            self.shot_parameter_input.buttons['FIRE'].config(state='disabled')
-            self.shot_parameter_input.buttons['CONFIRM'].config(state='disabled')
-            self.shot_parameter_input.buttons['RESET'].config(state='disabled')
+            # Disable console input and 'fire' button
+            self.shot_parameter_input.end_battle()
 
             # Collect statistics to variable
             battle_statistics = f"\n                                   BATTLE REPORT Nr.{Settings.battle_index}\n\n"
@@ -507,10 +396,10 @@ class Play:
                 for unit in self.units[role]:
                     if unit.unit_type == "artillery":
                         stats["units_labels"].append(f"UNIT {unit.unit_number}")
-                        stats["damages"].append(f"{unit.damage.get()}")
+                        stats["damages"].append(f"{unit.damage}")
                         stats["status_artillery"].append(f"{unit.is_active}")
                     elif unit.unit_type == "ammo":
-                        stats["ammos"].append(f"{unit.ammo.get()}")
+                        stats["ammos"].append(f"{unit.ammo}")
                         stats["status_ammo"].append(f"{unit.is_active}")
 
                 # Prepare the report message
@@ -543,13 +432,14 @@ class Play:
 
         # Set game status to 'show battle results', used in main window
         Settings.battle_results = True
+        self.main.watchdog.set_phase('battle_results')
 
         # Check who won the battle
         self.calculate_battle_results()
 
         # Raise console for 4 sec.
         self.raise_console()
-        self.console.console.after(4000, continue_execution)
+        self.main.scheduler.call_later(4000, continue_execution)
 
     def update_war_results(self, event):
         """Shows updated war statistics window"""
@@ -568,10 +458,16 @@ class Play:
         # Close war statistics, raise main window, destroy windows of the round
         self.main.root.attributes('-topmost', 1)
         if Settings.player_role != 'Intruder':
+            self.map_drone.scroll_animator.stop()
             self.map_drone.map_window.destroy()
         self.radar.radar_window.destroy()
         self.console.console.destroy()
 
+        self.close_recorder()
+        if self.event_log is not None:
+            self.event_log.flush()
+        metrics.stop_profile(f"round{Settings.battle_index}")
+
         self.setup.calculate_remainder_add() # Return what's left after battle to the equipment and ammo total amounts
         
         # Set game status to 'show war results', used in main window
@@ -584,6 +480,7 @@ class Play:
 
         # Change game status, used in main window
         Settings.battle_results = False
+        self.main.watchdog.set_phase('war_results')
 
         # Collect statistics to variable
         war_statistics = "\n                                       WAR REPORT\n\n"
@@ -646,46 +543,23 @@ class Play:
     def calculate_battle_results(self):
         """Check who wins the battle"""
         
-        def get_active_units(units):
-            """Return a list of active units."""
-            return [unit for unit in units if unit.is_active]
-
-        # Find roles and units of the player and computer
-        if Settings.player_role == "Defender":
-            player_units = self.units["Defender"]
-            computer_units = self.units["Intruder"]
-        else:
-            player_units = self.units["Intruder"]
-            computer_units = self.units["Defender"]
-
-        # Get active units
-        active_player_units = get_active_units(player_units)
-        active_computer_units = get_active_units(computer_units)
+        # Update war statistics
+        outcome = self.battle.outcome()
+        self.setup.record_battle_result(outcome)
 
         # Set default battle message
         self.battle_message = ""
         spaces = " " * 10
 
-        if len(active_player_units) == 0 and len(active_computer_units) == 0:
+        if outcome == 'tied':
             # Battle ends in a draw
             self.battle_message = f"\n\n{spaces}We retreat from the battlefield.\n" + f"{spaces}The enemy retreated from the battlefield."
-            Settings.battles_tied += 1
-        elif len(active_player_units) > 0 and len(active_computer_units) == 0:
+        elif outcome == 'won':
             # Player wins
-            if Settings.player_role == "Defender":
-                Settings.territory_occupied -= 2  # Player reoccupies 2% of the territory
-            else:
-                Settings.territory_occupied += 2  # Player occupies 2% of the territory
             self.battle_message = f"\n\n{spaces}{Settings.call_sign}, you won the battle and took 2% of the territory.\n" + f"{spaces}Now the occupied territory is {Settings.territory_occupied}%."
-            Settings.battles_won += 1
-        elif len(active_player_units) == 0 and len(active_computer_units) > 0:
+        elif outcome == 'lost':
             # Player loses
-            if Settings.player_role == "Intruder":
-                Settings.territory_occupied -= 2  # Player loses 2% of the territory
-            else:
-                Settings.territory_occupied += 2  # Player takes 2% of the territory
             self.battle_message = f"\n\n{spaces}{Settings.call_sign}, you lost the battle and 2% of the territory.\n" + f"{spaces}Now the occupied territory is {Settings.territory_occupied}%."
-            Settings.battles_lost += 1
         else:
             self.situation_report.insert_message(f"\n\nThe battle is ongoing. Current percentage of occupied territory is {Settings.territory_occupied}%.\n")
 
@@ -708,15 +582,18 @@ class Play:
         Settings.game = False
         self.main.root.unbind_all('c')
 
+        # Keep timings of the war phases
+        metrics.dump(Settings.metrics_path)
+        metrics.reset()
+
         # Consequences of breaching the front line
-        if intruder_total_damage < 150 and defender_total_damage >= 50:
-            Settings.territory_occupied -= 10
+        front_line_change = self.setup.calculate_front_line_breach()
+        if front_line_change < 0:
             if player_role == "Defender":
                 self.final_message += "Your relentless artillery fire has dealt significant damage, disrupting the enemy front line and triggering a disorganized retreat. This successful operation has led to the liberation of 10% of the Homeland.\n"
             elif player_role == "Intruder":
                 self.final_message += "The damage dealt by the defenders has been catastrophic, leading to a collapse of your front line. In the chaotic retreat, your forces have abandoned 10% of the occupied territory in a single day.\n"
-        elif defender_total_damage < 50 and intruder_total_damage >=150:
-            Settings.territory_occupied += 10
+        elif front_line_change > 0:
             if player_role == "Defender":
                 self.final_message += "The heavy damage inflicted by the invaders has forced your units to retreat deeper into your country. This strategic fallback, albeit necessary, results in the loss of an additional 10% of your territory.\n"
             elif player_role == "Intruder":
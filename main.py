@@ -1,21 +1,33 @@
+import time
+START_TIME = time.perf_counter()
 import tkinter as tk
 from tkinter import ttk, messagebox
 import customtkinter as ctk
 from PIL import Image, ImageTk
 import os
+import json
 import platform
+import threading
+import importlib
 if platform.system() == "Windows":
     from ctypes import windll
 
-# Import application modules
+# Import application modules, the game modules are imported in background after the start screen is shown
 from settings import Settings
-from game_loop import Play
+from assets import get_manifest, get_scaled_image
+from scheduler import FrameScheduler
+from stall_detector import StallWatchdog
+from metrics import metrics
 
 
 ################################
 ##### Main loop of the app #####
 ################################
 
+# Startup: root window -> start screen -> (background: game modules, map manifest, pre-scaled menu image)
+#          -> menu buttons and game loop when the loader is done or on the first use (Space key).
+# Times of the stages since the launch are written to Settings.startup_report_path.
+
 class Game:
     """Class to run the app, main tkinter loop, root window, manage welcome screen and menu screen"""
 
@@ -28,6 +40,9 @@ class Game:
         # Set dark mode
         ctk.set_appearance_mode("dark")  # Available modes: system (default), light, dark
 
+        # Times of the startup stages since the launch (ms)
+        self.startup_times = {'imports': round((time.perf_counter() - START_TIME) * 1000, 1)}
+
         # Create main window for app, start screen and menu
         self.root = ctk.CTk()
         self.root.attributes('-fullscreen',True)
@@ -39,29 +54,105 @@ class Game:
         self.root.update_idletasks()
         Settings.screen_width = self.root.winfo_screenwidth()
         Settings.screen_height = self.root.winfo_screenheight()
+        self.mark_startup('window')
         
-        # Open images for welcome and menu screens
+        # Open image for welcome screen
         start_image_path = os.path.join(os.getcwd(), 'images', 'img_start.png')
-        menu_image_path = os.path.join(os.getcwd(), 'images', 'img_menu.png')
-        self.start_image = ctk.CTkImage(light_image=Image.open(start_image_path), dark_image=Image.open(start_image_path), size=(1152, 720))
-        self.menu_image = ctk.CTkImage(light_image=Image.open(menu_image_path), dark_image=Image.open(menu_image_path), size=(Settings.screen_width, Settings.screen_height))
-        
-        # Initiate game loop class Play
-        self.play = Play(self)
-
-        # Set variable for the player name (call-sign)
-        self.callsign = tk.StringVar()
+        start_image = Image.open(start_image_path)
+        self.start_image = ctk.CTkImage(light_image=start_image, dark_image=start_image, size=(1152, 720))
 
         # Open start screen
         self.create_image_label()
         self.create_instruction_label()
-        
-        # Open menu
-        self.create_menu_buttons()
+        self.root.update()
+        self.mark_startup('start_screen')
+
+        # Start the frame scheduler of all UI timers and animations
+        self.scheduler = FrameScheduler(self.root)
+        self.scheduler.start()
+
+        # Measure responsiveness of the event loop, stalls are logged with the stack of the blocking code
+        os.makedirs(os.path.dirname(Settings.stall_log_path), exist_ok=True)
+        self.watchdog = StallWatchdog(self.root)
+        self.watchdog.start()
+
+        # Import game modules, load the manifest of map and radar images and menu image in background
+        self.play = None
+        self.menu_pil_image = None
+        self.loader_error = None  # Exception of the loader thread, raised again in the main thread
+        self.loader = threading.Thread(target=self.load_game, name="GameLoader", daemon=True)
+        self.loader.start()
+        self.scheduler.call_later(50, self.check_loader)
+
+        # Set variable for the player name (call-sign)
+        self.callsign = tk.StringVar()
 
         # Bind keyboard keys for navigation
         self.root.bind_all('q', self.ask_quit)        
         self.root.bind('<space>', lambda event: self.show_menu('main'))
+        self.watchdog.set_phase('menu')
+
+    def mark_startup(self, stage):
+        """Keep time of the startup stage since the launch"""
+        self.startup_times[stage] = round((time.perf_counter() - START_TIME) * 1000, 1)
+
+    def load_game(self):
+        """Import game modules, load the manifest and the menu image scaled to the screen, runs in the loader thread"""
+
+        try:
+            menu_image_path = os.path.join(os.getcwd(), 'images', 'img_menu.png')
+            self.menu_pil_image = get_scaled_image(menu_image_path, (Settings.screen_width, Settings.screen_height))
+            self.mark_startup('menu_image')
+            importlib.import_module('game_loop')
+            self.mark_startup('game_modules')
+            get_manifest()
+            self.mark_startup('manifest')
+        except BaseException as error:
+            self.loader_error = error
+
+    def check_loader(self):
+        """Finish loading in the main thread when the loader is done"""
+        if self.loader.is_alive():
+            self.scheduler.call_later(50, self.check_loader)
+        else:
+            self.finish_loading()
+
+    def finish_loading(self):
+        """Create menu and game loop, waits for the loader if they are used before it is done.
+
+        Returns False if the game could not be loaded, the app is closed then.
+        """
+
+        if self.play is not None:
+            return True
+        self.loader.join()
+        if self.loader_error is not None:
+            messagebox.showerror("Error", f"The game could not be loaded:\n{self.loader_error!r}")
+            self.scheduler.stop()
+            self.watchdog.stop()
+            self.root.destroy()
+            return False
+        self.menu_image = ctk.CTkImage(light_image=self.menu_pil_image, dark_image=self.menu_pil_image, size=(Settings.screen_width, Settings.screen_height))
+
+        # Initiate game loop class Play
+        from game_loop import Play
+        self.play = Play(self)
+
+        # Open menu
+        self.create_menu_buttons()
+        self.mark_startup('menu')
+        self.write_startup_report()
+        return True
+
+    def write_startup_report(self):
+        for stage, elapsed in self.startup_times.items():
+            metrics.observe(f"startup.{stage}", elapsed)
+        try:
+            os.makedirs(os.path.dirname(Settings.startup_report_path), exist_ok=True)
+            with open(Settings.startup_report_path, 'w') as file:
+                json.dump({'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'stages_ms': self.startup_times}, file, indent=4)
+        except OSError:
+            pass
 
     def create_image_label(self):
         self.image_label = ctk.CTkLabel(master=self.root, image=self.start_image, text="")
@@ -126,11 +217,13 @@ class Game:
                             'Easy',
                             'Medium',
                             'Hard',
+                            'Brigade',
                             ],
                     'commands': [
                             self.choose_easy,
                             self.choose_medium,
                             self.choose_hard,
+                            self.choose_brigade,
                         ],
             },
             'deployment': {
@@ -158,6 +251,8 @@ class Game:
 
     def show_menu(self, menu_name):
         
+        if not self.finish_loading():
+            return
         self.root.unbind('<space>')
         self.image_label.configure(image=self.menu_image)
         self.instruction_label.place_forget()
@@ -219,6 +314,11 @@ class Game:
         Settings.level = 'hard'
         self.hide_all_buttons()
         self.show_menu('settings')
+
+    def choose_brigade(self):
+        Settings.level = 'brigade'
+        self.hide_all_buttons()
+        self.show_menu('settings')
     
     def choose_inline(self):
         Settings.deployment = 'inline'
@@ -320,6 +420,9 @@ class Game:
         answer = messagebox.askyesno("Quit", "Do you really want to quit the game? You will lose all your game progress.", parent=current_topmost_window, default=messagebox.NO)
         
         if answer:
+            if self.play is not None:
+                self.play.close_recorder()
+                self.play.close_event_log()
             self.root.quit()
 
     def run(self):
@@ -3,31 +3,300 @@ from tkinter import ttk
 import customtkinter as ctk
 from PIL import Image, ImageTk
 import os
+import re
 import time
+import json
+import math
+import shutil
+import functools
+from collections import OrderedDict
 
 from settings import Settings
 from units import Unit, generate_units
 
+@functools.lru_cache(maxsize=Settings.sprite_cache_size)
+def get_unit_sprite(unit_type, player_role, image_direction, orientation, zoom_level=0):
+    """Return unit image ready for the canvas, decoded, resized and rotated once per process and zoom level"""
+
+    # Load the unit image
+    image_path = os.path.join(r'images', 'units', f"{unit_type}_{player_role}.png")
+    with Image.open(image_path) as unit_image:
+        # Halve the image size, and halve it again for each zoom level
+        width, height = unit_image.size
+        scale = 2 * 2 ** zoom_level
+        unit_image = unit_image.resize((max(width // scale, 1), max(height // scale, 1)), Image.ANTIALIAS)
+
+    # Rotate the image based on the direction and artillery position
+    if image_direction == 'south':
+        orientation += 180
+    unit_image = unit_image.rotate(orientation)
+
+    return ImageTk.PhotoImage(unit_image)
+
+
+@functools.lru_cache(maxsize=None)
+def get_blast_sprite(zoom_level=0):
+    """Return blast pit image of the zoom level decoded once per process, as PIL image (for baking) and canvas image"""
+    with Image.open(os.path.join(r'images', 'units', 'blast_pit.png')) as blast_image:
+        blast_image = blast_image.convert('RGBA')
+    if zoom_level:
+        width, height = blast_image.size
+        blast_image = blast_image.resize((max(width >> zoom_level, 1), max(height >> zoom_level, 1)), Image.ANTIALIAS)
+    return blast_image, ImageTk.PhotoImage(blast_image)
+
+
+def quantize_orientation(orientation):
+    """Round unit orientation to the sprite cache step"""
+    step = Settings.sprite_orientation_step
+    return round(orientation / step) * step % 360
+
+
+class MapTiles:
+    """Class for tiles of the map image and its downsampled pyramid, cut once and cached on disk"""
+
+    def __init__(self, map_image_path, tile_size=None, levels=None):
+        self.map_image_path = map_image_path
+        self.tile_size = tile_size or Settings.map_tile_size
+        self.levels = levels or Settings.map_zoom_levels
+
+        # Cache directory is unique for the map file version and tile size
+        file_stat = os.stat(map_image_path)
+        self.name = os.path.splitext(os.path.basename(map_image_path))[0]
+        self.directory = os.path.join(Settings.cache_dir, 'tiles', f"{self.name}_{file_stat.st_size}_{file_stat.st_mtime_ns}_{self.tile_size}_{self.levels}")
+        self.index_path = os.path.join(self.directory, 'index.json')
+
+        # Sizes of the zoom levels, tiles are cut if not cached yet
+        if not self.is_built():
+            self.build()
+        with open(self.index_path, 'r') as file:
+            self.level_sizes = [tuple(size) for size in json.load(file)['level_sizes']]
+
+    def is_built(self):
+        """Check if tiles are in cache"""
+        return os.path.exists(self.index_path)
+
+    def build(self):
+        """Decode the map image once and save tiles of all zoom levels"""
+
+        self.remove_stale()
+        os.makedirs(self.directory, exist_ok=True)
+        level_sizes = []
+        with Image.open(self.map_image_path) as image:
+            image = image.convert('RGB')
+            for level in range(self.levels):
+                level_image = image if level == 0 else image.reduce(2 ** level)
+                level_sizes.append(level_image.size)
+                for column in range(math.ceil(level_image.width / self.tile_size)):
+                    for row in range(math.ceil(level_image.height / self.tile_size)):
+                        box = (column * self.tile_size, row * self.tile_size, min((column + 1) * self.tile_size, level_image.width), min((row + 1) * self.tile_size, level_image.height))
+                        level_image.crop(box).save(self.tile_path(level, column, row), quality=90)
+
+        # Index file is written last, it marks complete cache
+        with open(self.index_path, 'w') as file:
+            json.dump({'level_sizes': level_sizes}, file)
+
+    def remove_stale(self):
+        """Remove cached tiles of other versions of the map, e.g. after the file was touched by a checkout"""
+
+        tiles_directory = os.path.dirname(self.directory)
+        if not os.path.isdir(tiles_directory):
+            return
+        pattern = re.compile(rf"{re.escape(self.name)}_\d+_\d+_\d+_\d+")
+        for name in os.listdir(tiles_directory):
+            path = os.path.join(tiles_directory, name)
+            if pattern.fullmatch(name) and path != self.directory:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def tile_path(self, level, column, row):
+        return os.path.join(self.directory, f"{level}_{column}_{row}.jpg")
+
+    def load_tile(self, level, column, row):
+        """Load tile image from cache"""
+        with Image.open(self.tile_path(level, column, row)) as tile:
+            tile.load()
+            return tile
+
+
+class BlastLayer:
+    """Class for blast pits on the drone map: live canvas items sharing one sprite, baked into map tiles when there are many"""
+
+    def __init__(self, map_view, bake_threshold=None):
+        self.map_view = map_view
+        self.bake_threshold = Settings.blast_bake_threshold if bake_threshold is None else bake_threshold  # 0 - never bake
+        self.live_pits = []  # coords of pits shown as canvas items tagged 'blast'
+        self.baked_pits = {}  # (level, column, row) -> list of pit coords drawn on the tile of the level
+        self.overlay_tiles = OrderedDict()  # (level, column, row) -> tile image with baked pits, least recently used first
+
+    def add(self, coords):
+        """Show blast pit at the full size map coordinates"""
+
+        self.live_pits.append(coords)
+        x, y = coords
+        zoom_factor = self.map_view.zoom_factor()
+        self.map_view.canvas.create_image(x * zoom_factor, y * zoom_factor, image=get_blast_sprite(self.map_view.zoom_level)[1], anchor='center', tags='blast')
+
+        if self.bake_threshold and len(self.live_pits) >= self.bake_threshold:
+            self.bake()
+
+    def bake(self):
+        """Move live pits into the tile overlays of all zoom levels and remove their canvas items"""
+
+        tile_size = self.map_view.tile_size
+        changed = set()
+        for level in range(len(self.map_view.map_tiles.level_sizes)):
+            sprite_width, sprite_height = get_blast_sprite(level)[0].size
+            zoom_factor = self.map_view.zoom_factor(level)
+            for x, y in self.live_pits:
+                # All tiles the pit sprite overlaps
+                left, top = x * zoom_factor - sprite_width / 2, y * zoom_factor - sprite_height / 2
+                for column in range(max(int(left // tile_size), 0), int((left + sprite_width) // tile_size) + 1):
+                    for row in range(max(int(top // tile_size), 0), int((top + sprite_height) // tile_size) + 1):
+                        self.baked_pits.setdefault((level, column, row), []).append((x, y))
+                        changed.add((level, column, row))
+
+        for key in changed:
+            self.overlay_tiles.pop(key, None)
+        self.live_pits = []
+        self.map_view.canvas.delete('blast')
+        self.map_view.refresh_tiles(changed)
+
+    def render_tile(self, level, column, row, tile_image):
+        """Return tile image with baked pits drawn on it"""
+
+        key = (level, column, row)
+        if key not in self.baked_pits:
+            return tile_image
+        if key in self.overlay_tiles:
+            self.overlay_tiles.move_to_end(key)
+            return self.overlay_tiles[key]
+
+        sprite = get_blast_sprite(level)[0]
+        zoom_factor = self.map_view.zoom_factor(level)
+        tile_size = self.map_view.tile_size
+        overlay = tile_image.convert('RGBA')
+        for x, y in self.baked_pits[key]:
+            position = (round(x * zoom_factor - column * tile_size - sprite.width / 2), round(y * zoom_factor - row * tile_size - sprite.height / 2))
+            overlay.alpha_composite(sprite, dest=(max(position[0], 0), max(position[1], 0)), source=(max(-position[0], 0), max(-position[1], 0)))
+        overlay = overlay.convert('RGB')
+
+        self.overlay_tiles[key] = overlay
+        while len(self.overlay_tiles) > self.map_view.max_tiles:
+            self.overlay_tiles.popitem(last=False)
+        return overlay
+
+
+class ScrollAnimator:
+    """Class for velocity based scrolling of the map with arrow keys, a task of the frame scheduler"""
+
+    # Key -> (axis, direction)
+    KEYS = {'Left': ('x', -1), 'Right': ('x', 1), 'Up': ('y', -1), 'Down': ('y', 1)}
+
+    def __init__(self, map_view, scheduler):
+        self.map_view = map_view
+        self.scheduler = scheduler
+        self.velocity = {'x': 0.0, 'y': 0.0}  # px/s
+        self.remainder = {'x': 0.0, 'y': 0.0}  # fractions of pixels not scrolled yet
+        self.held_keys = set()
+        self.running = False
+        self.last_frame_time = None
+
+    def press(self, event):
+        """Key press starts or keeps scrolling, repeated presses of a held key only keep the key held"""
+
+        axis, direction = self.KEYS[event.keysym]
+        if event.keysym not in self.held_keys:
+            self.held_keys.add(event.keysym)
+            # Give speed for a short tap, the direction changes at once
+            if self.velocity[axis] * direction < Settings.map_scroll_start_speed:
+                self.velocity[axis] = direction * Settings.map_scroll_start_speed
+        self.start()
+
+    def release(self, event):
+        self.held_keys.discard(event.keysym)
+
+    def release_all(self, event=None):
+        """Window lost focus, key releases will not come"""
+        self.held_keys.clear()
+
+    def stop(self):
+        """Stop scrolling at once"""
+
+        self.held_keys.clear()
+        self.velocity = {'x': 0.0, 'y': 0.0}
+        if self.running:
+            self.scheduler.remove_task(self.frame)
+            self.running = False
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.last_frame_time = time.perf_counter()
+            self.scheduler.add_task(self.frame)
+
+    def frame(self, now, deadline):
+        """Scroll the map by the velocity for the time passed, returns False when the map stops"""
+
+        frame_time = min(now - self.last_frame_time, 0.1)  # do not jump after a long stall
+        self.last_frame_time = now
+
+        moving = False
+        for axis in ('x', 'y'):
+            self.update_velocity(axis, frame_time)
+            if self.velocity[axis] == 0:
+                continue
+            moving = True
+            self.remainder[axis] += self.velocity[axis] * frame_time
+            pixels = int(self.remainder[axis])
+            if pixels:
+                self.remainder[axis] -= pixels
+                scroll = self.map_view.canvas.xview_scroll if axis == 'x' else self.map_view.canvas.yview_scroll
+                scroll(pixels, 'units')
+
+        # Visible tiles are always shown, neighbours are loaded if there is time left in the frame
+        self.map_view.update_tiles(deadline=deadline)
+
+        self.running = moving
+        return moving
+
+    def update_velocity(self, axis, frame_time):
+        """Accelerate while the key of the axis is held, slow down otherwise"""
+
+        held = [direction for key, (key_axis, direction) in self.KEYS.items() if key_axis == axis and key in self.held_keys]
+        if held and sum(held) != 0:
+            direction = sum(held)
+            speed = max(self.velocity[axis] * direction, 0) + Settings.map_scroll_acceleration * frame_time
+            self.velocity[axis] = direction * min(speed, Settings.map_scroll_max_speed)
+        else:
+            self.velocity[axis] *= math.exp(-Settings.map_scroll_friction * frame_time)
+            if abs(self.velocity[axis]) < 50:
+                self.velocity[axis] = 0.0
+                self.remainder[axis] = 0.0
+
+
 class Map:
     """Class to create drone map view window"""
 
-    def __init__(self, root, map_image_path):
+    def __init__(self, root, map_image_path, scheduler, map_tiles=None):
 
         # Create a new Toplevel window for drone view
         self.map_window = ctk.CTkToplevel(root)
         self.map_window.attributes('-fullscreen', True)
 
-        # Load the map image
-        self.map_image = Image.open(map_image_path)
-        self.map_image_tk = ImageTk.PhotoImage(self.map_image)
+        # Map image is shown by tiles, only tiles of the visible region and its neighbours are kept in memory
+        self.map_tiles = map_tiles if map_tiles is not None else MapTiles(map_image_path)
+        self.tile_size = self.map_tiles.tile_size
+        self.zoom_level = 0  # 0 - full size, each next level is downsampled by 2
+        self.tiles = OrderedDict()  # (level, column, row) -> (canvas item, PhotoImage), least recently used first
+        self.view_width = self.map_window.winfo_screenwidth()
+        self.view_height = self.map_window.winfo_screenheight()
+        # LRU bound: visible tiles with one ring of neighbours, twice
+        self.max_tiles = 2 * (math.ceil(self.view_width / self.tile_size) + 3) * (math.ceil(self.view_height / self.tile_size) + 3)
+        map_width, map_height = self.map_tiles.level_sizes[0]
 
         # Create a canvas for the map
-        self.canvas = tk.Canvas(self.map_window, width=self.map_window.winfo_screenwidth(), height=self.map_window.winfo_screenheight(), bd=0, highlightthickness=0, scrollregion=(0, 0, self.map_image.width, self.map_image.height))
+        self.canvas = tk.Canvas(self.map_window, width=self.view_width, height=self.view_height, bd=0, highlightthickness=0, scrollregion=(0, 0, map_width, map_height), xscrollincrement=1, yscrollincrement=1)
         self.canvas.pack()
 
-        # Add the map image to the canvas
-        self.canvas.create_image(0, 0, image=self.map_image_tk, anchor='nw')
-
         # Variables for scrolling functionality
         self.last_x = 0
         self.last_y = 0
@@ -37,100 +306,142 @@ class Map:
         self.canvas.bind("<B1-Motion>", self.on_drag)
         self.canvas.bind("<ButtonRelease-1>", self.stop_move)
 
-        # Dictionary to hold unit and blast images
+        # Dictionaries to hold unit images and canvas items, and layer of blast pits
         self.unit_images = {}
-        self.blast_images = {}
+        self.unit_items = {}
+        self.blast_layer = BlastLayer(self)
 
         # Move view to the bottom of the map
         self.canvas.xview_moveto(Settings.screen_width / Settings.field_width / 2)
         self.canvas.yview_moveto(1)
-
-        # Bind the keyboard arrow keys to the scrolling functions
-        self.map_window.bind("<Left>", self.scroll_left)
-        self.map_window.bind("<Right>", self.scroll_right)
-        self.map_window.bind("<Up>", self.scroll_up)
-        self.map_window.bind("<Down>", self.scroll_down)
+        self.update_tiles()
+
+        # Bind the keyboard arrow keys to the scroll animator
+        self.scroll_animator = ScrollAnimator(self, scheduler)
+        for key in ScrollAnimator.KEYS:
+            self.map_window.bind(f"<KeyPress-{key}>", self.scroll_animator.press)
+            self.map_window.bind(f"<KeyRelease-{key}>", self.scroll_animator.release)
+        self.map_window.bind("<FocusOut>", self.scroll_animator.release_all)
+        # Bind zoom keys
+        for key in ("<plus>", "<KP_Add>", "<equal>"):
+            self.map_window.bind(key, self.zoom_in)
+        for key in ("<minus>", "<KP_Subtract>"):
+            self.map_window.bind(key, self.zoom_out)
         self.canvas.focus_set()
 
+    # Functions to show map tiles
+    def zoom_factor(self, level=None):
+        """Scale of the zoom level to the full size map"""
+        return 1 / 2 ** (self.zoom_level if level is None else level)
+
+    def update_tiles(self, deadline=None):
+        """Show tiles intersecting the visible region, load neighbours ahead (until deadline) and evict least recently used tiles"""
+
+        level_width, level_height = self.map_tiles.level_sizes[self.zoom_level]
+        left = self.canvas.canvasx(0)
+        top = self.canvas.canvasy(0)
+        columns = math.ceil(level_width / self.tile_size)
+        rows = math.ceil(level_height / self.tile_size)
+        first_column = max(int(left // self.tile_size), 0)
+        first_row = max(int(top // self.tile_size), 0)
+        last_column = min(int((left + self.view_width) // self.tile_size), columns - 1)
+        last_row = min(int((top + self.view_height) // self.tile_size), rows - 1)
+
+        # Visible tiles first, then one ring of neighbours
+        visible = [(self.zoom_level, column, row) for row in range(first_row, last_row + 1) for column in range(first_column, last_column + 1)]
+        neighbours = [(self.zoom_level, column, row)
+                      for row in range(max(first_row - 1, 0), min(last_row + 1, rows - 1) + 1)
+                      for column in range(max(first_column - 1, 0), min(last_column + 1, columns - 1) + 1)
+                      if not (first_row <= row <= last_row and first_column <= column <= last_column)]
+        for key in visible + neighbours:
+            if key in self.tiles:
+                self.tiles.move_to_end(key)
+            elif key in visible or deadline is None or time.perf_counter() < deadline:
+                self.tiles[key] = self.create_tile(*key)
+
+        # Evict least recently used tiles, visible ones are always the most recent
+        while len(self.tiles) > self.max_tiles:
+            _, (item, _) = self.tiles.popitem(last=False)
+            self.canvas.delete(item)
+
+    def create_tile(self, level, column, row):
+        """Put tile image on the canvas under units and blasts"""
+        tile_image = self.blast_layer.render_tile(level, column, row, self.map_tiles.load_tile(level, column, row))
+        tile_image_tk = ImageTk.PhotoImage(tile_image)
+        item = self.canvas.create_image(column * self.tile_size, row * self.tile_size, image=tile_image_tk, anchor='nw', tags='tile')
+        self.canvas.tag_lower(item)
+        return item, tile_image_tk
+
+    def refresh_tiles(self, keys):
+        """Redraw tiles on the canvas which images have changed"""
+        for key in keys:
+            if key in self.tiles:
+                item, _ = self.tiles[key]
+                self.canvas.delete(item)
+                self.tiles[key] = self.create_tile(*key)
+
+    def zoom_in(self, event=None):
+        self.set_zoom_level(self.zoom_level - 1)
+
+    def zoom_out(self, event=None):
+        self.set_zoom_level(self.zoom_level + 1)
+
+    def set_zoom_level(self, level):
+        """Change zoom level keeping the center of the view"""
+
+        if not 0 <= level < len(self.map_tiles.level_sizes) or level == self.zoom_level:
+            return
+
+        # Center of the view in full size map coordinates
+        center_x = (self.canvas.canvasx(0) + self.view_width / 2) / self.zoom_factor()
+        center_y = (self.canvas.canvasy(0) + self.view_height / 2) / self.zoom_factor()
+
+        # Move units and blasts to the positions of the new level, canvas scale does not resize images
+        ratio = self.zoom_factor(level) / self.zoom_factor()
+        self.canvas.scale('unit', 0, 0, ratio, ratio)
+        self.canvas.scale('blast', 0, 0, ratio, ratio)
+        for unit, item in self.unit_items.items():
+            self.unit_images[unit] = get_unit_sprite(unit.unit_type, unit.player_role, unit.image_direction, quantize_orientation(unit.unit_orientation), level)
+            self.canvas.itemconfigure(item, image=self.unit_images[unit])
+        self.canvas.itemconfigure('blast', image=get_blast_sprite(level)[1])
+
+        # Scroll velocity is in pixels of the previous level
+        self.scroll_animator.stop()
+
+        # Remove tiles of the previous level
+        for item, _ in self.tiles.values():
+            self.canvas.delete(item)
+        self.tiles.clear()
+
+        self.zoom_level = level
+        level_width, level_height = self.map_tiles.level_sizes[level]
+        self.canvas.configure(scrollregion=(0, 0, level_width, level_height))
+        self.canvas.xview_moveto(max(center_x * self.zoom_factor() - self.view_width / 2, 0) / level_width)
+        self.canvas.yview_moveto(max(center_y * self.zoom_factor() - self.view_height / 2, 0) / level_height)
+        self.update_tiles()
+
     # Functions to operate map image movements in map window
     def start_move(self, event):
         self.canvas.scan_mark(event.x, event.y)
 
     def on_drag(self, event):
         self.canvas.scan_dragto(event.x, event.y, gain=2)
+        self.update_tiles()
 
     def stop_move(self, event):
         pass
 
-    def scroll_left(self, event):
-        for _ in range(5):
-            self.canvas.xview_scroll(-1, 'units')
-            self.map_window.update_idletasks()
-            time.sleep(0.1)
-
-    def scroll_right(self, event):
-        for _ in range(5):
-            self.canvas.xview_scroll(1, 'units')
-            self.map_window.update_idletasks()
-            time.sleep(0.1)
-
-    def scroll_up(self, event):
-        for _ in range(5):
-            self.canvas.yview_scroll(-1, 'units')
-            self.map_window.update_idletasks()
-            time.sleep(0.1)
-
-    def scroll_down(self, event):
-        for _ in range(5):
-            self.canvas.yview_scroll(1, 'units')
-            self.map_window.update_idletasks()
-            time.sleep(0.1)
-
     def add_unit(self, unit):
-        # Define the image name based on the unit type and player
-        image_name = f"{unit.unit_type}_{unit.player_role}.png"
-
-        # Load the unit image
-        image_path = os.path.join(r'images', 'units', image_name)
-        unit_image = Image.open(image_path)
-        
-        # Get the current image size
-        width, height = unit_image.size
-
-        # Calculate the new size
-        new_size = (width//2, height//2)
-
-        # Resize the image
-        unit_image = unit_image.resize(new_size, Image.ANTIALIAS)
-
-        # Rotate the image based on the direction and artillery position
-        if unit.image_direction == 'south':
-            unit_image = unit_image.rotate(180)
-            unit_image = unit_image.rotate(unit.unit_orientation)
-        else:
-            unit_image = unit_image.rotate(unit.unit_orientation)
-
-        unit_image_tk = ImageTk.PhotoImage(unit_image)
+        # Get the unit image from the sprite cache
+        unit_image_tk = get_unit_sprite(unit.unit_type, unit.player_role, unit.image_direction, quantize_orientation(unit.unit_orientation), self.zoom_level)
 
         # Add the unit image to the canvas
         x, y = unit.coords
-        self.canvas.create_image(x, y, image=unit_image_tk, anchor='center', tags='unit')
+        self.unit_items[unit] = self.canvas.create_image(x * self.zoom_factor(), y * self.zoom_factor(), image=unit_image_tk, anchor='center', tags='unit')
 
         # Store the unit image to prevent garbage collection
         self.unit_images[unit] = unit_image_tk
 
     def add_blast_pit(self, coords):
         """Adds blast pit image to the map"""
-
-        # Load the blast pit image
-        image_path = os.path.join(r'images' ,'units', 'blast_pit.png')
-        blast_image = Image.open(image_path)
-        blast_image_tk = ImageTk.PhotoImage(blast_image)
-
-        # Add the blast pit image to the canvas at the given coordinates
-        x, y = coords
-        self.canvas.create_image(x, y, image=blast_image_tk, anchor='center', tags='blast')
-
-        # Store the blast pit image to prevent garbage collection
-        self.blast_images[coords] = blast_image_tk
-
+        self.blast_layer.add(coords)
@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import bisect
+import cProfile
+import functools
+from contextlib import contextmanager
+
+##########################
+##### Metrics module #####
+##########################
+
+# Named timing spans, counters and histograms of the game phases, read in-process with metrics.snapshot()
+# and dumped as JSON at the end of a war (Settings.metrics_path). Span names are dotted by phase:
+#   make_turn.* (turn of the player in the UI), turn.* (battle engine), round_setup, window.*, show_battle_results.
+# With environment variable ARTILLERY_WAR_PROFILE=<directory> every round is also profiled with cProfile,
+# output is written to <directory>/round<N>.prof (read with pstats or snakeviz).
+
+PROFILE_ENVIRONMENT_VARIABLE = 'ARTILLERY_WAR_PROFILE'
+
+# Upper bounds (ms) of histogram buckets, the last bucket is unbounded
+HISTOGRAM_BOUNDS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 16, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class Histogram:
+    """A class for distribution of values (ms) in fixed buckets"""
+
+    def __init__(self, bounds=HISTOGRAM_BOUNDS):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, percent):
+        """Return upper bound of the bucket of the percentile, max value for the last bucket"""
+
+        if not self.count:
+            return None
+        rank = percent / 100 * self.count
+        cumulative = 0
+        for index, bucket in enumerate(self.buckets):
+            cumulative += bucket
+            if cumulative >= rank:
+                return round(min(self.bounds[index], self.max) if index < len(self.bounds) else self.max, 3)
+        return round(self.max, 3)
+
+    def to_dict(self):
+        buckets = {f"<={bound}": count for bound, count in zip(self.bounds, self.buckets) if count}
+        if self.buckets[-1]:
+            buckets[f">{self.bounds[-1]}"] = self.buckets[-1]
+        return {
+            'count': self.count, 'total': round(self.total, 3), 'mean': round(self.total / self.count, 3) if self.count else None,
+            'min': round(self.min, 3) if self.count else None, 'max': round(self.max, 3) if self.count else None,
+            'p50': self.percentile(50), 'p90': self.percentile(90), 'p99': self.percentile(99),
+            'buckets': buckets,
+        }
+
+
+class Metrics:
+    """A class for timing spans, counters and histograms of the game"""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.profile_dir = os.environ.get(PROFILE_ENVIRONMENT_VARIABLE) or None
+        self.profiler = None
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        """Add value (ms) to the histogram of the name"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.add(value)
+
+    @contextmanager
+    def span(self, name):
+        """Measure time of the block into the histogram of the name"""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start_time) * 1000)
+
+    def timed(self, name):
+        """Decorator to measure every call of the function as a span"""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        """Return counters and histograms, JSON serializable"""
+        return {
+            'counters': dict(self.counters),
+            'histograms': {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())},
+        }
+
+    def dump(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(dict(self.snapshot(), time=time.strftime('%Y-%m-%d %H:%M:%S')), file, indent=4)
+
+    def reset(self):
+        self.counters.clear()
+        self.histograms.clear()
+
+    def start_profile(self):
+        """Start cProfile of the round if it is switched on by the environment variable"""
+        if self.profile_dir is None or self.profiler is not None:
+            return
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    def stop_profile(self, name):
+        """Stop cProfile and write its output to <profile directory>/<name>.prof"""
+        if self.profiler is None:
+            return
+        self.profiler.disable()
+        os.makedirs(self.profile_dir, exist_ok=True)
+        self.profiler.dump_stats(os.path.join(self.profile_dir, f"{name}.prof"))
+        self.profiler = None
+
+
+# Metrics of this process
+metrics = Metrics()
@@ -0,0 +1,58 @@
+import threading
+
+from settings import Settings
+from map import MapTiles
+from radar import get_radar_base
+
+###########################
+##### Prefetch module #####
+###########################
+
+# Assets of the next round are prepared in a worker thread while the current battle is played:
+#   - drone map tiles of all zoom levels are cut and cached on disk (Defender only, Intruder has no drones),
+#   - radar image is decoded, scaled to screen width and its static overlay is drawn.
+# Tk objects (PhotoImage) are created later on the Tk thread from these ready images.
+
+
+class RoundAssets:
+    """A class for map and radar of one round, images are None if they were not prefetched"""
+
+    def __init__(self, map_path, radar_path, map_tiles=None, radar_image=None):
+        self.map_path = map_path
+        self.radar_path = radar_path
+        self.map_tiles = map_tiles  # MapTiles with tiles cached on disk
+        self.radar_image = radar_image  # PIL image of the radar base layer
+
+
+class AssetPrefetcher:
+    """A class to prepare map and radar images of the next round in a worker thread"""
+
+    def __init__(self):
+        self.thread = None
+        self.assets = None
+
+    def start(self, map_path, radar_path, with_map=True):
+        """Start preparing images of the map/radar pair in background"""
+
+        self.assets = RoundAssets(map_path, radar_path)
+        self.thread = threading.Thread(target=self.run, args=(self.assets, with_map), daemon=True)
+        self.thread.start()
+
+    def run(self, assets, with_map):
+        """Worker thread: decode, resize and convert images, missing ones are loaded on the Tk thread later"""
+
+        try:
+            assets.radar_image = get_radar_base(assets.radar_path, Settings.screen_width)
+            if with_map:
+                assets.map_tiles = MapTiles(assets.map_path)
+        except OSError:
+            # Images which are not ready are loaded by Map and Radar on the Tk thread
+            pass
+
+    def get(self):
+        """Return prefetched assets, waits for the worker if it is still running"""
+
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        return self.assets
@@ -1,17 +1,97 @@
 import tkinter as tk
 from tkinter import ttk # review
 import customtkinter as ctk
-from PIL import Image, ImageTk
+from PIL import Image, ImageTk, ImageDraw, ImageFont
 import os
 import random
+import hashlib
 
 from settings import Settings
 from units import Unit, generate_units
 
+# Version of the static radar overlay drawing, change it to invalidate cached base layers
+RADAR_BASE_VERSION = 1
+
+
+def load_font(size, bold=False):
+    """Return Arial like TrueType font, or PIL default font if there is none"""
+    names = ('arialbd.ttf', 'DejaVuSans-Bold.ttf') if bold else ('arial.ttf', 'DejaVuSans.ttf')
+    for name in names:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            pass
+    return ImageFont.load_default()
+
+
+def draw_text(draw, xy, text, font, fill):
+    """Draw text centered at the point as canvas create_text does"""
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    draw.text((xy[0] - (left + right) / 2, xy[1] - (top + bottom) / 2), text, font=font, fill=fill)
+
+
+def render_radar_base(radar_image_path, screen_width):
+    """Return radar image scaled to screen width with static grid, range arcs, scale and compass ring drawn on it"""
+
+    # Load the radar image and re-scale it to fit screen width
+    with Image.open(radar_image_path) as radar_image:
+        scale_factor = screen_width / radar_image.width
+        radar_image = radar_image.convert('RGB').resize((int(radar_image.width * scale_factor), int(radar_image.height * scale_factor)))
+    width, height = radar_image.size
+    draw = ImageDraw.Draw(radar_image)
+
+    # Draw grid
+    step = max(int(height / 25), 100)  # One square corresponds to 1x1 km, ensure step is never less than 100
+    correction_y = int(height % step) # Start horizontal grid lines from the bottom
+    correction_x = int(width % step / 2) # Justify vertical grid lines
+    for i in range(0 + correction_x, width, step):
+        draw.line((i, 0, i, height), fill="grey") # Vertical lines
+    for i in range(0 + correction_y, height, step):
+        draw.line((0, i, width, i), fill="grey") # Horizontal lines
+
+    # Draw scale and compass ring
+    font = load_font(16, bold=True)
+    draw.line((0 + 0.5 * step + correction_x, height - step, 2.5 * step + correction_x, height - step), fill="yellow", width=3)
+    draw_text(draw, (0 + 0.5 * step + correction_x, height - step - 10), "0", font, "yellow")
+    draw_text(draw, (2.5 * step + correction_x - 2, height - step - 10), "2 km", font, "yellow")
+    draw.ellipse((width - 2.5 * step - correction_x, height - 1.5 * step, width - 1.5 * step - correction_x, height - 0.5 * step), outline="yellow", width=2)
+
+    # Draw arcs, canvas angles are counterclockwise and PIL angles are clockwise
+    font = load_font(12)
+    for i in range(1, int(height / step + 1)):
+        arc_box = (width / 2 - i * step, height - i * step, width / 2 + i * step, height)
+        draw.arc(arc_box, start=240, end=300, fill="yellow")
+        draw_text(draw, (width / 2 - 2, height - i * step - 8), str(i) + ".000", font, "yellow")
+
+    return radar_image
+
+
+def get_radar_base(radar_image_path, screen_width):
+    """Return radar base layer from disk cache keyed by radar file, screen width and its content hash, render it if missing"""
+
+    with open(radar_image_path, 'rb') as file:
+        content_hash = hashlib.sha1(file.read()).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(radar_image_path))[0]
+    cache_path = os.path.join(Settings.cache_dir, 'radar', f"{name}_{screen_width}_{content_hash}_v{RADAR_BASE_VERSION}.png")
+
+    if os.path.exists(cache_path):
+        with Image.open(cache_path) as radar_base:
+            radar_base.load()
+            return radar_base
+
+    radar_base = render_radar_base(radar_image_path, screen_width)
+    # Write to temporary file first, so an interrupted write is never loaded
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    temporary_path = cache_path + '.tmp'
+    radar_base.save(temporary_path, format='PNG', compress_level=1)
+    os.replace(temporary_path, cache_path)
+    return radar_base
+
+
 class Radar:
     """Class to create radar map view window"""
 
-    def __init__(self, root, radar_image_path, map_direction, wind_direction, situation_report_reference):
+    def __init__(self, root, radar_image_path, map_direction, wind_direction, situation_report_reference, radar_image=None):
         # Creating a new Toplevel window
         
         self.situation_report = situation_report_reference
@@ -20,12 +100,9 @@ class Radar:
         self.radar_window = ctk.CTkToplevel(root)
         self.radar_window.attributes('-fullscreen', True)
 
-        # Load the radar image
-        self.radar_image = Image.open(radar_image_path)
-
-        # Re-scale image to fit screen width and set scroll region
-        self.scale_factor = Settings.screen_width / self.radar_image.width
-        self.radar_image = self.radar_image.resize((int(self.radar_image.width * self.scale_factor), int(self.radar_image.height * self.scale_factor)))
+        # Load the radar image scaled to screen width with static overlay drawn on it
+        self.radar_image = radar_image if radar_image is not None else get_radar_base(radar_image_path, Settings.screen_width)
+        self.scale_factor = Settings.screen_width / Settings.field_width  # radar image has the same size as the map
         self.radar_image_tk = ImageTk.PhotoImage(self.radar_image)
 
         # Create a frame and a canvas for the radar with associated scrollbar
@@ -43,24 +120,16 @@ class Radar:
         # Add mouse scroll event
         self.canvas.bind("<MouseWheel>", self.on_mousewheel)
 
+        # Mark target for fire-control computer with left mouse click
+        self.target_coords = None
+        self.canvas.bind("<Button-1>", self.mark_target)
+
         # Add the radar image to the canvas
         self.canvas.create_image(0, 0, image=self.radar_image_tk, anchor='nw')
 
-        # Draw grid
-        km_scale_factor = self.radar_image.height / 25  # One square corresponds to 1x1 km
-        step = max(int(km_scale_factor), 100)  # Ensure step is never less than 100
-        correction_y = int(self.radar_image.height % step) # Start horizontal grid lines from the bottom
-        correction_x = int(self.radar_image.width % step / 2) # Justify vertical grid lines
-        for i in range(0 + correction_x, self.radar_image.width, step):
-            self.canvas.create_line(i, 0, i, self.radar_image.height, fill="grey") # Vertical lines
-        for i in range(0 + correction_y, self.radar_image.height, step):
-            self.canvas.create_line(0, i, self.radar_image.width, i, fill="grey") # Horizontal lines
-
-        # Draw scale and compass
-        self.canvas.create_line(0 + 0.5 * step + correction_x, self.radar_image.height - step, 2.5 * step + correction_x, self.radar_image.height - step, fill="yellow", width=3)
-        self.canvas.create_text(0 + 0.5 * step + correction_x, self.radar_image.height - step - 10, text="0", font=("Arial", 12, "bold"), fill="yellow")
-        self.canvas.create_text(2.5 * step + correction_x - 2, self.radar_image.height - step - 10, text="2 km", font=("Arial", 12, "bold"), fill="yellow")
-        self.canvas.create_oval(self.radar_image.width - 2.5 * step - correction_x, self.radar_image.height - 1.5 * step, self.radar_image.width - 1.5 * step - correction_x, self.radar_image.height - 0.5 * step, outline="yellow", width=2)
+        # Grid, scale, compass ring and range arcs are in the radar image, draw only the round's compass
+        step = max(int(self.radar_image.height / 25), 100)
+        correction_x = int(self.radar_image.width % step / 2)
         # Show North direction
         map_direction_compass = 360 - map_direction + 90 # Set the compass azimuth values clockwise and 0 to the top
         wind_direction = map_direction - wind_direction
@@ -77,20 +146,9 @@ class Radar:
             self.canvas.create_text(self.radar_image.width - 1.5 * step - correction_x + 12, self.radar_image.height - 1  * step, text="90", fill="white", font=("Arial", 12, "bold"))
             self.canvas.create_text(self.radar_image.width - 2 * step - correction_x, self.radar_image.height - 1.5 * step - 12, text="360", fill="white", font=("Arial", 12, "bold"))
         
-        # Draw arcs
-        for i in range(1, int(self.radar_image.height / step + 1)):
-            arc_box = (
-                self.radar_image.width / 2 - i * step,
-                self.radar_image.height - i * step,
-                self.radar_image.width / 2 + i * step,
-                self.radar_image.height
-            )
-            self.canvas.create_arc(arc_box, start=60, extent=60, style="arc", outline="yellow")
-            self.canvas.create_text(self.radar_image.width / 2 - 2, self.radar_image.height - i * step - 8, text=str(i) + ".000", fill="yellow")
-
-            # Blast echo count
-            self.blast_echo_number_player = 0
-            self.blast_echo_number_computer = 0
+        # Blast echo count
+        self.blast_echo_number_player = 0
+        self.blast_echo_number_computer = 0
 
     def add_unit(self, unit):
         """Adds units on radar map"""
@@ -107,6 +165,20 @@ class Radar:
 
         self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")  # Scroll the canvas with mouse wheel
 
+    def mark_target(self, event):
+        """Marks target point for fire-control computer"""
+
+        # Canvas coordinates of the click scaled back to map coordinates
+        x = self.canvas.canvasx(event.x)
+        y = self.canvas.canvasy(event.y)
+        self.target_coords = (round(x / self.scale_factor), round(y / self.scale_factor))
+
+        # Draw target cross
+        self.canvas.delete('target')
+        self.canvas.create_line(x - 15, y, x + 15, y, fill="red", width=2, tags='target')
+        self.canvas.create_line(x, y - 15, x, y + 15, fill="red", width=2, tags='target')
+        self.canvas.create_text(x + 20, y - 15, text="T", font=("Arial", 12, "bold"), fill="red", tags='target')
+
     def add_blast_echo(self, index, coords):
         """Adds blast echo arcs on radar map"""
         
@@ -0,0 +1,212 @@
+import os
+import json
+import argparse
+
+from settings import Settings
+from units import Unit, link_battery
+from battle import Battle
+from rng import RandomStreams, BATTLE_STREAMS
+
+#######################################
+##### Battle record/replay module #####
+#######################################
+
+# A battle is recorded as JSON lines:
+#   - 'battle': units as deployed, weather, map direction, player role and seed of the battle random streams,
+#   - 'keyframe': full state before the turn: damage, ammo and status of units, computer targets, random streams,
+#     written before the first turn and every Settings.replay_keyframe_interval turns,
+#   - 'turn': inputs (shot parameters of player guns) and outputs (events) of the turn.
+# Replay rebuilds the battle without UI at full speed and checks that the outputs are the same,
+# or seeks to a turn from the nearest keyframe.
+#
+# Usage: python replay.py <record.jsonl> [--seek N]
+
+RECORD_VERSION = 1
+
+
+def get_unit_state(unit):
+    """Return changing state of the unit"""
+    if unit.unit_type == 'artillery':
+        return [unit.is_active, unit.damage, unit.azimuth, unit.elevation, unit.charge]
+    return [unit.is_active, unit.ammo]
+
+
+def get_event_output(event, unit_indexes):
+    """Return compact form of the battle event"""
+    return [event.kind, unit_indexes.get(event.unit, -1), list(event.coords) if event.coords is not None else None, event.value]
+
+
+class BattleRecorder:
+    """A class to write inputs and outputs of the battle turns with periodic state keyframes"""
+
+    def __init__(self, battle, path, keyframe_interval=None):
+        self.battle = battle
+        self.path = path
+        self.keyframe_interval = keyframe_interval or Settings.replay_keyframe_interval
+        self.unit_indexes = {unit: index for index, unit in enumerate(battle.all_units_list)}
+        self.inputs = None
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.file = open(path, 'w')
+        self.write({
+            'type': 'battle', 'version': RECORD_VERSION, 'seed': battle.rng.seed, 'player_role': battle.player_role,
+            'weather_conditions': battle.weather_conditions, 'map_direction': battle.map_direction,
+            'field_height': battle.shot.field_height,
+            'units': [[unit.unit_number, unit.unit_type, list(unit.coords), unit.image_direction, unit.player_role,
+                       unit.unit_orientation, unit.name, self.unit_indexes.get(unit.related_unit, -1)]
+                      for unit in battle.all_units_list],
+        })
+
+    def write(self, record):
+        self.file.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+    def write_keyframe(self):
+        self.write({
+            'type': 'keyframe', 'turn': self.battle.turn_index,
+            'units': [get_unit_state(unit) for unit in self.battle.all_units_list],
+            'target_units': [self.unit_indexes[unit] for unit in self.battle.target_units],
+            'rng': self.battle.rng.get_state(BATTLE_STREAMS),
+        })
+
+    def before_turn(self):
+        """Keep shot parameters of player guns, write keyframe if it is due"""
+
+        if self.battle.turn_index % self.keyframe_interval == 0:
+            self.write_keyframe()
+        self.inputs = [[self.unit_indexes[unit], unit.azimuth, unit.elevation, unit.charge]
+                       for unit in self.battle.player_units if unit.unit_type == 'artillery' and unit.is_active]
+
+    def after_turn(self, report):
+        """Write inputs and outputs of the turn"""
+
+        self.write({
+            'type': 'turn', 'turn': report.turn_index, 'inputs': self.inputs,
+            'events': [get_event_output(event, self.unit_indexes) for event in report.events],
+            'battle_over': report.battle_over,
+        })
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class BattleReplay:
+    """A class to rebuild recorded battle without UI"""
+
+    def __init__(self, path):
+        self.header = None
+        self.keyframes = []  # ordered by turn
+        self.turns = {}  # turn number -> turn record
+        with open(path, 'r') as file:
+            for line in file:
+                record = json.loads(line)
+                if record['type'] == 'battle':
+                    self.header = record
+                elif record['type'] == 'keyframe':
+                    self.keyframes.append(record)
+                elif record['type'] == 'turn':
+                    self.turns[record['turn']] = record
+        if self.header is None or self.header['version'] != RECORD_VERSION:
+            raise ValueError(f"{path} is not a battle record of version {RECORD_VERSION}")
+        self.last_turn = max(self.turns, default=0)
+
+    def build_battle(self):
+        """Return the battle as deployed, before the first turn"""
+
+        units = {'Defender': [], 'Intruder': []}
+        all_units_list = []
+        for unit_number, unit_type, coords, image_direction, player_role, unit_orientation, name, _ in self.header['units']:
+            unit = Unit(unit_number, unit_type, tuple(coords), image_direction, player_role, unit_orientation)
+            unit.name = name
+            units[player_role].append(unit)
+            all_units_list.append(unit)
+        for unit, (*_, related_index) in zip(all_units_list, self.header['units']):
+            if unit.unit_type == 'artillery' and related_index >= 0:
+                link_battery(unit, all_units_list[related_index])
+
+        return Battle(units, self.header['weather_conditions'], self.header['map_direction'], self.header['player_role'],
+                      self.header['field_height'], rng=RandomStreams(self.header['seed']))
+
+    def restore(self, battle, keyframe):
+        """Set the battle state of the keyframe"""
+
+        for unit, state in zip(battle.all_units_list, keyframe['units']):
+            if unit.unit_type == 'artillery':
+                is_active, unit.damage, unit.azimuth, unit.elevation, unit.charge = state
+            else:
+                is_active, unit.ammo = state
+            if is_active:
+                unit.is_active = True
+            else:
+                battle.deactivate(unit)
+        battle.target_units = [battle.all_units_list[index] for index in keyframe['target_units']]
+        battle.turn_index = keyframe['turn']
+        battle.rng.set_state(keyframe['rng'])
+
+    def play_turn(self, battle):
+        """Resolve the next recorded turn, returns its report"""
+
+        record = self.turns[battle.turn_index + 1]
+        for index, azimuth, elevation, charge in record['inputs']:
+            unit = battle.all_units_list[index]
+            unit.azimuth, unit.elevation, unit.charge = azimuth, elevation, charge
+        return battle.resolve_turn()
+
+    def seek(self, turn):
+        """Return the battle state after the turn, replayed from the nearest keyframe"""
+
+        turn = min(max(turn, 0), self.last_turn)
+        keyframe = max((keyframe for keyframe in self.keyframes if keyframe['turn'] <= turn), key=lambda keyframe: keyframe['turn'])
+        battle = self.build_battle()
+        self.restore(battle, keyframe)
+        while battle.turn_index < turn:
+            self.play_turn(battle)
+        return battle
+
+    def run(self, on_turn=None):
+        """Replay all turns at full speed, returns numbers of turns with outputs different from the record"""
+
+        battle = self.build_battle()
+        self.restore(battle, self.keyframes[0])
+        unit_indexes = {unit: index for index, unit in enumerate(battle.all_units_list)}
+        mismatches = []
+        while battle.turn_index < self.last_turn:
+            report = self.play_turn(battle)
+            events = [get_event_output(event, unit_indexes) for event in report.events]
+            if json.loads(json.dumps(events)) != self.turns[report.turn_index]['events']:
+                mismatches.append(report.turn_index)
+            if on_turn is not None:
+                on_turn(report)
+        return mismatches
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Replay recorded battle without GUI.")
+    parser.add_argument('path', help="battle record (JSON lines)")
+    parser.add_argument('--seek', type=int, default=None, help="show state of units after the turn")
+    options = parser.parse_args(arguments)
+
+    replay = BattleReplay(options.path)
+    if options.seek is not None:
+        battle = replay.seek(options.seek)
+        print(f"State after turn {battle.turn_index}:")
+        for unit in battle.all_units_list:
+            state = f"damage {unit.damage}" if unit.unit_type == 'artillery' else f"ammo {unit.ammo}"
+            print(f"  {unit.player_role:<9} {unit.name:<6} Nr.{unit.unit_number:<3} {'active' if unit.is_active else 'inactive':<9} {state}")
+        return
+
+    def show_turn(report):
+        print(f"----- ATTACK #{report.turn_index} -----")
+        for event in report.events:
+            if event.message:
+                print(event.message)
+
+    mismatches = replay.run(show_turn)
+    if mismatches:
+        print(f"Replay differs from the record in turns: {mismatches}")
+    else:
+        print(f"Replay of {replay.last_turn} turns is the same as the record")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+import random
+
+########################################
+##### Random number streams module #####
+########################################
+
+# Every war has its own seed. Random numbers of each subsystem come from an independent stream,
+# so adding a random call to one subsystem does not change the others:
+#   - maps: choice of the map of the round (war level),
+#   - weather: map direction and weather conditions,
+#   - deployment: unit positions, names: truck names,
+#   - breakdown: broken Intruder guns, duds: shells which did not explode,
+#   - ai: computer choice of targets, accuracy: spread of the shots,
+#   - player: automatic player of the tournament runner.
+# Streams of one battle are derived from the war seed and battle number, any battle can be rebuilt alone.
+
+STREAMS = ('maps', 'weather', 'deployment', 'names', 'breakdown', 'duds', 'ai', 'accuracy', 'player')
+# Streams used while the battle turns are resolved
+BATTLE_STREAMS = ('breakdown', 'duds', 'ai', 'accuracy', 'player')
+
+
+class RandomStreams:
+    """A class for independent seeded random streams of the subsystems"""
+
+    def __init__(self, seed=None):
+        # Without seed the war is not reproducible, but its seed is still known and can be recorded
+        self.seed = seed if seed is not None else random.SystemRandom().randrange(2**63)
+        for name in STREAMS:
+            setattr(self, name, random.Random(f"{self.seed}-{name}"))
+
+    def for_battle(self, battle_index):
+        """Return streams of the battle (round)"""
+        return RandomStreams(f"{self.seed}-battle-{battle_index}")
+
+    def get_state(self, names=STREAMS):
+        """Return states of the streams, JSON serializable"""
+        return {name: [state[0], list(state[1]), state[2]] for name, state in ((name, getattr(self, name).getstate()) for name in names)}
+
+    def set_state(self, state):
+        """Restore states of streams returned by get_state"""
+        for name, (version, internal_state, gauss_next) in state.items():
+            getattr(self, name).setstate((version, tuple(internal_state), gauss_next))
@@ -0,0 +1,148 @@
+import time
+import heapq
+import itertools
+import traceback
+
+from settings import Settings
+
+############################
+##### Scheduler module #####
+############################
+
+# One fixed-rate tick on the Tk main loop runs all UI timers and animations:
+#   - delayed actions (call_later), run in order of their due time,
+#   - frame tasks (typewriter effects, sound cues, map scrolling), called every frame until they are done.
+# Work of one frame is limited by the frame budget, the rest waits for the next frame.
+# Exception of a callback or task is printed and does not stop the frame, the failed task stays registered.
+# Frame times are measured here, it is the one place to see UI stalls.
+
+
+class Typewriter:
+    """A class for typing effect: label text grows by one character per interval"""
+
+    def __init__(self, label, text, interval_ms=50, on_character=None):
+        self.label = label
+        self.text = text
+        self.interval = interval_ms / 1000
+        self.on_character = on_character  # called for each typed character, e.g. to play typing sound
+        self.index = 0
+        self.next_time = time.perf_counter() + self.interval
+
+    def __call__(self, now, deadline):
+        """Type characters which time has come, return False when the text is typed"""
+
+        while self.index < len(self.text) and self.next_time <= now:
+            self.label.configure(text=self.label.cget("text") + self.text[self.index])
+            if self.on_character is not None:
+                self.on_character()
+            self.index += 1
+            self.next_time += self.interval
+        return self.index < len(self.text)
+
+
+class FrameScheduler:
+    """A class for the central frame scheduler of the app, owned by main.Game"""
+
+    def __init__(self, root, frame_ms=None, budget_ms=None):
+        self.root = root
+        self.frame_ms = frame_ms or Settings.frame_ms
+        self.budget = (budget_ms or Settings.frame_budget_ms) / 1000
+
+        # Delayed actions: heap of [due time, sequence number, callback, args], callback None if cancelled
+        self.actions = []
+        self.sequence = itertools.count()
+        # Frame tasks: callables task(now, deadline) returning False when done
+        self.tasks = []
+
+        # Frame statistics: frames, frames over budget, longest frame and delay of the tick (s)
+        self.stats = {'frames': 0, 'over_budget': 0, 'max_frame_time': 0.0, 'max_tick_delay': 0.0}
+        self.tick_job = None
+        self.next_tick = None
+
+    def start(self):
+        if self.tick_job is None:
+            self.next_tick = time.perf_counter() + self.frame_ms / 1000
+            self.tick_job = self.root.after(self.frame_ms, self.tick)
+
+    def stop(self):
+        if self.tick_job is not None:
+            self.root.after_cancel(self.tick_job)
+            self.tick_job = None
+
+    def call_later(self, delay_ms, callback, *args):
+        """Run callback after the delay, returns handle to cancel it"""
+
+        action = [time.perf_counter() + delay_ms / 1000, next(self.sequence), callback, args]
+        heapq.heappush(self.actions, action)
+        return action
+
+    def cancel(self, action):
+        action[2] = None
+
+    def add_task(self, task):
+        """Call task every frame until it returns False"""
+        if task not in self.tasks:
+            self.tasks.append(task)
+
+    def remove_task(self, task):
+        if task in self.tasks:
+            self.tasks.remove(task)
+
+    def type_text(self, label, text, interval_ms=50, on_character=None):
+        """Start typing effect on the label"""
+
+        typewriter = Typewriter(label, text, interval_ms, on_character)
+        self.add_task(typewriter)
+        return typewriter
+
+    def tick(self):
+        """Run one frame and schedule the next tick at fixed rate, even if a callback fails"""
+
+        try:
+            self.run_frame()
+        finally:
+            # Next tick is counted from the planned time, frames are skipped after a stall.
+            # No next tick if a callback has stopped the scheduler, e.g. when the app is closed
+            if self.tick_job is not None:
+                self.next_tick += self.frame_ms / 1000
+                if self.next_tick < time.perf_counter():
+                    self.next_tick = time.perf_counter()
+                self.tick_job = self.root.after(max(int((self.next_tick - time.perf_counter()) * 1000), 1), self.tick)
+
+    def run_frame(self):
+        """Run due actions and frame tasks within the frame budget"""
+
+        now = time.perf_counter()
+        deadline = now + self.budget
+        self.stats['max_tick_delay'] = max(self.stats['max_tick_delay'], now - self.next_tick)
+
+        # Delayed actions in order of due time, at least one per frame
+        while self.actions and self.actions[0][0] <= now:
+            _, _, callback, args = heapq.heappop(self.actions)
+            if callback is not None:
+                try:
+                    callback(*args)
+                except Exception:
+                    traceback.print_exc()
+            if time.perf_counter() > deadline:
+                break
+
+        # Frame tasks, the ones not called for lack of time go first in the next frame
+        for task in list(self.tasks):
+            if time.perf_counter() > deadline:
+                break
+            self.tasks.remove(task)
+            try:
+                done = task(now, deadline) is False
+            except Exception:
+                traceback.print_exc()
+                done = False
+            if not done:
+                self.tasks.append(task)
+
+        # Statistics
+        frame_time = time.perf_counter() - now
+        self.stats['frames'] += 1
+        self.stats['max_frame_time'] = max(self.stats['max_frame_time'], frame_time)
+        if frame_time > self.budget:
+            self.stats['over_budget'] += 1
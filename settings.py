@@ -1,5 +1,9 @@
-import pygame
 import os
+import sys
+import time
+import heapq
+import itertools
+import threading
 
 class Settings:
     """A class to keep settings for all modules"""
@@ -30,6 +34,54 @@ class Settings:
     # Set first shots accuracy for computer if intruder
     # First three shots of intruder shall be less accurate
     first_shots_accuracy = [600, 400, 200]
+    # Sound voice budget: max concurrent voices, window (s) to merge cues of the same sound,
+    # max pending cues of one sound (others are merged) and merged cue size to play longer
+    sound_max_voices = 8
+    sound_merge_window = 0.4
+    sound_max_pending_cues = 4
+    sound_big_burst = 3
+    # Drone map is shown by tiles of this size (px), zoom levels are downsampled by 2 each
+    map_tile_size = 512
+    map_zoom_levels = 3
+    # Unit sprites are cached for orientations rounded to this step (degrees)
+    sprite_orientation_step = 1
+    sprite_cache_size = 512
+    # Blast pits are drawn into map tiles when there are this many on the map (0 - never)
+    blast_bake_threshold = 50
+    # Frame scheduler of UI timers and animations: frame period and time budget of one frame (ms)
+    frame_ms = 16
+    frame_budget_ms = 10
+    # Drone map arrow keys scrolling: speed on key press, acceleration while the key is held
+    # and max speed (px/s), slowdown after the key is released (1/s)
+    map_scroll_start_speed = 2000
+    map_scroll_acceleration = 3000
+    map_scroll_max_speed = 5000
+    map_scroll_friction = 4
+    # Directory for cached game assets (map tiles, pre-rendered images)
+    cache_dir = os.path.join(os.path.expanduser('~'), '.artillery_war', 'cache')
+    # Battles are recorded for replay (replay.py) with full state keyframes every few turns, one file per battle
+    record_battles = False
+    replay_dir = os.path.join(os.path.expanduser('~'), '.artillery_war', 'replays')
+    replay_keyframe_interval = 10
+    # Battle events are logged for analysis (event_log.py) to one growing file, rows per compressed chunk
+    log_events = False
+    event_log_path = os.path.join(os.path.expanduser('~'), '.artillery_war', 'events.awev')
+    event_log_chunk_size = 4096
+    # Timing spans and counters of the game phases (metrics.py) are dumped as JSON at the end of a war
+    metrics_path = os.path.join(os.path.expanduser('~'), '.artillery_war', 'metrics.json')
+    # Stall detector of the tkinter event loop (stall_detector.py): heartbeat and stack sampling intervals (ms),
+    # heartbeat delay reported as a stall (ms) and JSON lines log of the stalls
+    watchdog_interval_ms = 50
+    watchdog_sample_ms = 10
+    stall_threshold_ms = 100
+    stall_log_path = os.path.join(os.path.expanduser('~'), '.artillery_war', 'stalls.jsonl')
+    # Candidates tried to place one unit apart from others in its zone (spatial.PoissonDiskSampler)
+    placement_attempts = 30
+    # Rows of batteries shown in the console unit table (scrolled for more), batteries per line of shot parameters report
+    console_visible_rows = 8
+    report_units_per_line = 8
+    # Times of the startup stages of the last launch (main.py)
+    startup_report_path = os.path.join(os.path.expanduser('~'), '.artillery_war', 'startup.json')
 
     # Dict to define the total number of units, amounts of ammo and damage based on the difficulty level
     total_amounts = {   'easy': {
@@ -47,6 +99,11 @@ class Settings:
                                     'ammo': (300, 900),
                                     'damage': (1500, 4500)
                                 },
+                        'brigade': {
+                                    'units': (240, 720),
+                                    'ammo': (2400, 7200),
+                                    'damage': (12000, 36000)
+                                },
                     }
 
     # Dict to define max number of units, amounts of ammo and damage based on the difficulty level for the one game round (battle)
@@ -65,32 +122,159 @@ class Settings:
                                     'ammo': (30, 90),
                                     'damage': (150, 450)
                                 },
+                        'brigade': {
+                                    'units': (48, 72),
+                                    'ammo': (480, 720),
+                                    'damage': (2400, 3600)
+                                },
                     }
 
 class SoundManager:
     """A class to manage sounds of the game"""
 
-    def __init__(self):
-        pygame.mixer.init()
+    def __init__(self, max_voices=None, scheduler=None):
+        # Limit concurrent voices, cue is dropped if all channels are busy
+        self.max_voices = max_voices if max_voices is not None else Settings.sound_max_voices
         self.sounds = {}  # A dictionary to store the sounds.
-        self.load_sound('blast', os.path.join('sounds', 'blast.wav'))
-        self.load_sound('shot', os.path.join('sounds', 'shot.wav'))
-        self.load_sound('incoming', os.path.join('sounds', 'incoming.wav'))
-        self.load_sound('destroy', os.path.join('sounds', 'destroy.wav'))
-        self.load_sound('typing', os.path.join('sounds', 'typing.wav'))
+        # Mixer is initialized and sounds are loaded in background, sounds are played when they are ready
+        self.mixer = None
+        self.ready = threading.Event()  # Set when loading is finished, also if it has failed
+        self.load_error = None  # Exception of the loader, sound is off then
+
+        # Scheduled sound cues: heap of [start time, sequence number, name, number of merged sounds]
+        self.queue = []
+        self.sequence = itertools.count()
+        # Start time of the last scheduled cue, delays of consecutive sounds add up as if they were played one after another
+        self.timeline_end = 0
+        self.condition = threading.Condition()
+
+        # Counters of sound cues: requested, played, merged to other cue and dropped for lack of voices
+        self.stats = {'requested': 0, 'played': 0, 'merged': 0, 'dropped': 0}
+
+        # Load sounds in background
+        self.loader = threading.Thread(target=self.load_sounds, name="SoundLoader", daemon=True)
+        self.loader.start()
+
+        # Cues are played on time by the frame scheduler of the app, or by dispatcher thread without it.
+        # The UI thread never sleeps
+        self.scheduler = scheduler
+        if scheduler is not None:
+            scheduler.add_task(self.dispatch_frame)
+        else:
+            self.dispatcher = threading.Thread(target=self.run_dispatcher, name="SoundDispatcher", daemon=True)
+            self.dispatcher.start()
+
+    def load_sounds(self):
+        """Initialize the mixer and load all sounds, runs in the loader thread. Sound is off if it fails."""
+        try:
+            # pygame is slow to import, it is imported here to keep it off the startup path
+            import pygame
+            pygame.mixer.init()
+            pygame.mixer.set_num_channels(self.max_voices)
+            self.mixer = pygame.mixer
+            self.load_sound('blast', os.path.join('sounds', 'blast.wav'))
+            self.load_sound('shot', os.path.join('sounds', 'shot.wav'))
+            self.load_sound('incoming', os.path.join('sounds', 'incoming.wav'))
+            self.load_sound('destroy', os.path.join('sounds', 'destroy.wav'))
+            self.load_sound('typing', os.path.join('sounds', 'typing.wav'))
+        except Exception as error:
+            # Drop queued cues, new ones are not queued any more
+            with self.condition:
+                self.load_error = error
+                self.stats['dropped'] += len(self.queue)
+                self.queue = []
+        self.ready.set()
 
     def load_sound(self, name, path):
         """Load a sound from a file and store it in the dictionary."""
-        sound = pygame.mixer.Sound(path)
+        sound = self.mixer.Sound(path)
         self.sounds[name] = sound
 
+    def get_length(self, name):
+        """Return length of the sound (s), 1 s if it is not loaded yet."""
+        return self.sounds[name].get_length() if name in self.sounds else 1
+
     def play_sound(self, name, delay=0):
-        """Play a sound after an optional delay."""
-        if name in self.sounds:
-            pygame.time.delay(int(delay * 1000))  # delay for multiple explosions
-            self.sounds[name].play()
+        """Schedule a sound to play after an optional delay, returns immediately.
+
+        Cues requested while the sounds are still loading are queued and played when they are loaded.
+        """
+        if name in self.sounds or not self.ready.is_set():
+            with self.condition:
+                if self.load_error is not None:
+                    return
+                self.stats['requested'] += 1
+                # Delay for multiple explosions counts from the previous scheduled sound
+                start_time = max(time.monotonic(), self.timeline_end) + delay
+
+                # Merge burst of the same sound into one layered cue
+                pending_cues = [cue for cue in self.queue if cue[2] == name]
+                if pending_cues:
+                    last_cue = max(pending_cues)
+                    if start_time - last_cue[0] <= Settings.sound_merge_window or len(pending_cues) >= Settings.sound_max_pending_cues:
+                        last_cue[3] += 1
+                        self.stats['merged'] += 1
+                        return
+
+                self.timeline_end = start_time
+                heapq.heappush(self.queue, [start_time, next(self.sequence), name, 1])
+                self.condition.notify()
+
+    def dispatch_due(self):
+        """Play all sounds whose start time has come."""
+        if not self.ready.is_set() or self.load_error is not None:
+            return
+        due = []
+        with self.condition:
+            now = time.monotonic()
+            while self.queue and self.queue[0][0] <= now:
+                due.append(heapq.heappop(self.queue))
+        played = dropped = 0
+        for _, _, name, count in due:
+            # Drop the cue of unknown sound, or if all voices are busy
+            if name not in self.sounds:
+                dropped += 1
+                continue
+            channel = self.mixer.find_channel()
+            if channel is None:
+                dropped += 1
+                continue
+            # Big burst of merged cues plays longer
+            channel.play(self.sounds[name], loops=1 if count >= Settings.sound_big_burst else 0)
+            played += 1
+        with self.condition:
+            self.stats['played'] += played
+            self.stats['dropped'] += dropped
+
+    def dispatch_frame(self, now, deadline):
+        """Frame scheduler task, plays due cues every frame. Reports failed loading and stops then."""
+        if self.load_error is not None:
+            print(f"Sound is off, sounds could not be loaded: {self.load_error!r}", file=sys.stderr)
+            return False
+        self.dispatch_due()
+        return True
+
+    def run_dispatcher(self):
+        """Wait for the start time of the next cue and play it."""
+        self.ready.wait()
+        if self.load_error is not None:
+            print(f"Sound is off, sounds could not be loaded: {self.load_error!r}", file=sys.stderr)
+            return
+        while True:
+            with self.condition:
+                while not self.queue:
+                    self.condition.wait()
+                timeout = self.queue[0][0] - time.monotonic()
+                if timeout > 0:
+                    # New cue may be scheduled earlier, wait for notification or the start time
+                    self.condition.wait(timeout)
+                    continue
+            self.dispatch_due()
 
     def stop_sound(self, name):
-        """Stop a sound by its name."""
+        """Stop a sound by its name and remove its scheduled cues."""
         if name in self.sounds:
-            self.sounds[name].stop()
\ No newline at end of file
+            with self.condition:
+                self.queue = [cue for cue in self.queue if cue[2] != name]
+                heapq.heapify(self.queue)
+            self.sounds[name].stop()
@@ -1,20 +1,24 @@
-import random
-import os
 import tempfile
-import glob
-from PIL import Image
 from settings import Settings
 from units import  Unit, generate_units
+from spatial import SpatialGrid
+from prefetch import AssetPrefetcher
+from assets import get_manifest
+from rng import RandomStreams
 
 
 class GameSetup:
     """Class for game and round setup when starts"""
 
-    def __init__(self, play_instance_refference):
+    def __init__(self, play_instance_refference, prefetch=True, rng=None):
         """Setup the game"""
 
         self.play = play_instance_refference
 
+        # Random streams of the war, each battle gets its own streams derived from them
+        self.rng = rng if rng is not None else RandomStreams()
+        self.battle_rng = None
+
         #  Setting variables for the entire game:
         #                           the player's role,
         #                           game difficulty,
@@ -47,6 +51,10 @@ class GameSetup:
         # Setting empty list for used maps in the round
         self.used_maps = []
 
+        # Start preparing images of the first round, headless games (tournament) do not need images
+        self.prefetcher = AssetPrefetcher() if prefetch else None
+        self.prefetch_next_round()
+
     def round_setup(self):
         """Setting variables for one game round"""
 
@@ -57,20 +65,27 @@ class GameSetup:
         # Subtract resources needed for the round from total amounts
         self.calculate_remainder_subtract()
 
-        # Choose the map and get dimensions
-        map_path, radar_path = self.get_random_map_and_radar()
+        # Take the map chosen and prefetched for this round and get dimensions
+        if self.prefetcher is not None:
+            self.round_assets = self.prefetcher.get()
+            map_path, radar_path = self.round_assets.map_path, self.round_assets.radar_path
+        else:
+            map_path, radar_path = self.get_random_map_and_radar()
 
-        # Open the image file
-        with Image.open(map_path) as img:
-            # Get dimensions
-            map_size = img.size
-            Settings.field_width, Settings.field_height = map_size
+        map_size = get_manifest().get(map_path).size
+        Settings.field_width, Settings.field_height = map_size
+
+        # Random streams of the battle
+        self.battle_rng = self.rng.for_battle(Settings.battle_index)
 
         # Generate random map direction
-        map_direction = random.randint(0, 360)
+        map_direction = self.battle_rng.weather.randint(0, 360)
 
         # Generate units
-        self.units = generate_units(self.player_role, map_size, self.units_to_generate_defender, self.units_to_generate_intruder)
+        self.units = generate_units(self.player_role, map_size, self.units_to_generate_defender, self.units_to_generate_intruder, self.battle_rng)
+
+        # Build spatial index of unit positions for the round
+        self.unit_grid = SpatialGrid(self.units['Defender'] + self.units['Intruder'])
 
         # Generate weather conditions
         weather_conditions = self.generate_weather_conditions()
@@ -82,44 +97,48 @@ class GameSetup:
 
         # Generate random weather conditions for the game
         self.weather_conditions = {
-            "Sea Level Pressure,(hPa)": round(random.uniform(990, 1030), 1),
-            "Relative Humidity,(%)": round(random.uniform(20, 100), 1),
-            "Air Temperature, (°C)": round(random.uniform(-5, 35), 1),
-            "Wind Speed,(m/s)": round(random.uniform(2, 30), 1),
+            "Sea Level Pressure,(hPa)": round(self.battle_rng.weather.uniform(990, 1030), 1),
+            "Relative Humidity,(%)": round(self.battle_rng.weather.uniform(20, 100), 1),
+            "Air Temperature, (°C)": round(self.battle_rng.weather.uniform(-5, 35), 1),
+            "Wind Speed,(m/s)": round(self.battle_rng.weather.uniform(2, 30), 1),
             "Wind Gust,(m/s)": None,
-            "Wind Direction,(°)": round(random.uniform(0, 360), 1)
+            "Wind Direction,(°)": round(self.battle_rng.weather.uniform(0, 360), 1)
         }
-        self.weather_conditions["Wind Gust,(m/s)"] = round(self.weather_conditions["Wind Speed,(m/s)"] + random.uniform(1, int(self.weather_conditions["Wind Speed,(m/s)"]/2)), 1)
+        self.weather_conditions["Wind Gust,(m/s)"] = round(self.weather_conditions["Wind Speed,(m/s)"] + self.battle_rng.weather.uniform(1, int(self.weather_conditions["Wind Speed,(m/s)"]/2)), 1)
 
         return self.weather_conditions
 
+    def prefetch_next_round(self):
+        """Choose map and radar of the next round and start preparing their images in background"""
+
+        if self.prefetcher is None:
+            return
+        map_path, radar_path = self.get_random_map_and_radar()
+        self.prefetcher.start(map_path, radar_path, with_map=self.player_role == 'Defender')
+
     def get_random_map_and_radar(self):
         """Choses random images from list for map and radar"""
 
-        # Get a list of all map files
-        maps = glob.glob(os.path.join('images', 'maps', 'map*.jpg'))
+        # Get a list of all maps from the asset manifest
+        maps = get_manifest().maps
 
         # If all maps have been used, clear the used_maps list
         if len(self.used_maps) == len(maps):
             self.used_maps = []
 
-        # Choose a random map that hasn't been used yet
-        map_path = random.choice([map for map in maps if map not in self.used_maps])
+        # Choose a random map that hasn't been used yet, the radar image is its pair
+        map_asset = self.rng.maps.choice([map_asset for map_asset in maps if map_asset.map_path not in self.used_maps])
+        map_path, radar_path = map_asset.map_path, map_asset.radar_path
 
         # Add the chosen map to the used maps list
         self.used_maps.append(map_path)
 
-        # Build the corresponding radar file path
-        map_filename = os.path.basename(map_path)
-        map_number = map_filename[3:-4]  # strip off 'map' and '.jpg'
-        radar_path = os.path.join('images', 'maps', 'radar' + map_number + '.jpg')
-
         return map_path, radar_path
 
     def game_should_end(self):
         """Check if there are left resources to continue game"""
 
-        end_thresholds = {'easy': (1, 10, 50), 'medium': (1, 10, 50), 'hard': (1, 10, 50)}
+        end_thresholds = {'easy': (1, 10, 50), 'medium': (1, 10, 50), 'hard': (1, 10, 50), 'brigade': (8, 80, 400)}
 
         # Get the thresholds for the current difficulty level
         units_threshold, ammo_threshold, damage_threshold = end_thresholds[self.difficulty_level]
@@ -139,6 +158,30 @@ class GameSetup:
         # If none of the end conditions were met, the game should continue
         return False
 
+    def record_battle_result(self, outcome):
+        """Update war statistics with the battle result for the player, the winner takes 2% of the territory"""
+
+        if outcome == 'tied':
+            Settings.battles_tied += 1
+        elif outcome == 'won':
+            Settings.territory_occupied += -2 if self.player_role == "Defender" else 2
+            Settings.battles_won += 1
+        elif outcome == 'lost':
+            Settings.territory_occupied += 2 if self.player_role == "Defender" else -2
+            Settings.battles_lost += 1
+
+    def calculate_front_line_breach(self):
+        """Consequences of breaching the front line at the end of the war, returns change of occupied territory"""
+
+        if self.intruder_total_damage < 150 and self.defender_total_damage >= 50:
+            change = -10
+        elif self.defender_total_damage < 50 and self.intruder_total_damage >= 150:
+            change = 10
+        else:
+            change = 0
+        Settings.territory_occupied += change
+        return change
+
     def calculate_remainder_subtract(self):
         """Subtracts resources needed for the round from total amounts"""
 
@@ -151,10 +194,10 @@ class GameSetup:
         """Adds to total amounts the remainder of the resources from the active units after the loss incurred during the battle round, some disadvantages for intruder"""
         defender_units = [unit for unit in self.units["Defender"]]
         intruder_units = [unit for unit in self.units["Intruder"]]
-        self.defender_total_units += len([unit for unit in defender_units if unit.unit_type == "artillery" and unit.damage.get() < 50])
-        self.defender_total_ammo += sum(unit.ammo.get() for unit in defender_units if unit.unit_type == "ammo")
-        self.defender_total_damage -= sum(unit.damage.get() for unit in defender_units if unit.unit_type == "artillery")
+        self.defender_total_units += len([unit for unit in defender_units if unit.unit_type == "artillery" and unit.damage < 50])
+        self.defender_total_ammo += sum(unit.ammo for unit in defender_units if unit.unit_type == "ammo")
+        self.defender_total_damage -= sum(unit.damage for unit in defender_units if unit.unit_type == "artillery")
         self.intruder_total_units += len([unit for unit in intruder_units if unit.is_active]) // 2
-        self.intruder_total_ammo += sum(unit.ammo.get() for unit in intruder_units if unit.unit_type == "ammo" and unit.is_active)
-        self.intruder_total_damage -= sum(unit.damage.get() for unit in intruder_units if unit.unit_type == "artillery")
+        self.intruder_total_ammo += sum(unit.ammo for unit in intruder_units if unit.unit_type == "ammo" and unit.is_active)
+        self.intruder_total_damage -= sum(unit.damage for unit in intruder_units if unit.unit_type == "artillery")
 
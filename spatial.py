@@ -0,0 +1,137 @@
+import math
+
+from settings import Settings
+
+################################
+##### Spatial index module #####
+################################
+
+class SpatialGrid:
+    """A class for uniform grid (bucket) index of unit positions, used for proximity queries of blasts, radar and AI"""
+
+    def __init__(self, units=(), cell_size=100):
+        """Build the index; cell size is equal to the blast damage radius"""
+
+        self.cell_size = cell_size
+        self.cells = {}  # (column, row) -> list of unit indexes, all units
+        self.active_cells = {}  # (column, row) -> list of unit indexes, active units only
+        self.units = []  # units in order of insertion
+        self.unit_indexes = {}  # unit -> index
+        for unit in units:
+            self.insert(unit)
+
+    def cell_of(self, point):
+        """Return grid cell of the point"""
+        return (math.floor(point[0] / self.cell_size), math.floor(point[1] / self.cell_size))
+
+    def insert(self, unit):
+        """Add unit to the index"""
+
+        index = len(self.units)
+        self.units.append(unit)
+        self.unit_indexes[unit] = index
+        cell = self.cell_of(unit.coords)
+        self.cells.setdefault(cell, []).append(index)
+        if unit.is_active:
+            self.active_cells.setdefault(cell, []).append(index)
+
+    def deactivate(self, unit):
+        """Remove inactive unit from queries of active units"""
+
+        index = self.unit_indexes.get(unit)
+        if index is None:
+            return
+        indexes = self.active_cells.get(self.cell_of(unit.coords), [])
+        if index in indexes:
+            indexes.remove(index)
+
+    def indexes_within(self, point, radius, active_only=False):
+        """Return sorted indexes of units within radius (inclusive) from the point"""
+
+        cells = self.active_cells if active_only else self.cells
+        x, y = point
+        first_column, first_row = self.cell_of((x - radius, y - radius))
+        last_column, last_row = self.cell_of((x + radius, y + radius))
+        radius_squared = radius * radius
+        found = []
+        # Check only units in the neighbouring cells
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                for index in cells.get((column, row), ()):
+                    unit_x, unit_y = self.units[index].coords
+                    if (unit_x - x)**2 + (unit_y - y)**2 <= radius_squared:
+                        found.append(index)
+        found.sort()
+        return found
+
+    def units_within(self, point, radius, active_only=False):
+        """Return units within radius (inclusive) from the point in order of insertion"""
+        return [self.units[index] for index in self.indexes_within(point, radius, active_only)]
+
+
+class PlacementError(Exception):
+    """Raised when units cannot be placed apart from each other in their zone"""
+
+
+class PoissonDiskSampler:
+    """A class to place points at least min distance apart (Poisson-disk sampling) with a background grid"""
+
+    def __init__(self, min_distance, rng, attempts=None):
+        self.min_distance = min_distance
+        self.rng = rng
+        self.attempts = attempts or Settings.placement_attempts
+        # Cell size is the min distance, conflicting points are in the neighbouring cells only
+        self.cells = {}  # (column, row) -> list of points
+
+    def cell_of(self, point):
+        return (math.floor(point[0] / self.min_distance), math.floor(point[1] / self.min_distance))
+
+    def add(self, point):
+        """Add point which keeps others away, e.g. ammo unit placed without check"""
+        column, row = self.cell_of(point)
+        self.cells.setdefault((column, row), []).append(point)
+
+    def is_free(self, point):
+        """Return True if there is no point closer than min distance"""
+
+        column, row = self.cell_of(point)
+        min_distance_squared = self.min_distance * self.min_distance
+        for neighbour_column in (column - 1, column, column + 1):
+            for neighbour_row in (row - 1, row, row + 1):
+                for x, y in self.cells.get((neighbour_column, neighbour_row), ()):
+                    if (x - point[0])**2 + (y - point[1])**2 < min_distance_squared:
+                        return False
+        return True
+
+    def points_within(self, x_range, y_range):
+        """Return points in the zone"""
+
+        first_column, first_row = self.cell_of((x_range[0], y_range[0]))
+        last_column, last_row = self.cell_of((x_range[1], y_range[1]))
+        return [(x, y) for column in range(first_column, last_column + 1) for row in range(first_row, last_row + 1)
+                for x, y in self.cells.get((column, row), ())
+                if x_range[0] <= x <= x_range[1] and y_range[0] <= y <= y_range[1]]
+
+    def sample(self, x_range, y_range):
+        """Return free point (integer coordinates) in the zone and add it, raises PlacementError if the zone is full"""
+
+        # Random candidates in the zone, enough while the zone is sparse
+        for _ in range(self.attempts):
+            point = (self.rng.randint(*x_range), self.rng.randint(*y_range))
+            if self.is_free(point):
+                self.add(point)
+                return point
+
+        # Dense zone: candidates in the ring of min distance to twice of it around the points of the zone (Bridson)
+        centers = self.points_within(x_range, y_range)
+        self.rng.shuffle(centers)
+        for center_x, center_y in centers:
+            for _ in range(self.attempts):
+                angle = self.rng.uniform(0, 2 * math.pi)
+                radius = self.rng.uniform(self.min_distance, 2 * self.min_distance)
+                point = (round(center_x + radius * math.cos(angle)), round(center_y + radius * math.sin(angle)))
+                if x_range[0] <= point[0] <= x_range[1] and y_range[0] <= point[1] <= y_range[1] and self.is_free(point):
+                    self.add(point)
+                    return point
+
+        raise PlacementError(f"No place for a unit {self.min_distance} px apart from others in zone x {x_range}, y {y_range}")
@@ -0,0 +1,101 @@
+import sys
+import json
+import time
+import threading
+import traceback
+
+from settings import Settings
+from metrics import metrics
+
+###############################################
+##### Tk event loop stall detector module #####
+###############################################
+
+# A heartbeat callback is scheduled with after() every Settings.watchdog_interval_ms, the delay of each
+# heartbeat (how late it runs) is added to histogram 'heartbeat.<phase>' of metrics.py.
+# A sampling thread checks the heartbeat every Settings.watchdog_sample_ms, when it is overdue by more than
+# Settings.stall_threshold_ms it captures the Python stack of the main thread (the code blocking the event loop).
+# Every stall is appended as a JSON line to Settings.stall_log_path: phase, delay and the captured stack.
+# The game sets the phase, e.g. main.Game.watchdog.set_phase('battle').
+
+
+class StallWatchdog:
+    """A class to measure delays of the Tk event loop and catch stacks of the stalls"""
+
+    def __init__(self, root, interval_ms=None, threshold_ms=None, sample_ms=None, log_path=None):
+        self.root = root
+        self.interval = (interval_ms or Settings.watchdog_interval_ms) / 1000
+        self.threshold = (threshold_ms or Settings.stall_threshold_ms) / 1000
+        self.sample_interval = (sample_ms or Settings.watchdog_sample_ms) / 1000
+        self.log_path = log_path if log_path is not None else Settings.stall_log_path
+        self.main_thread_id = threading.main_thread().ident
+
+        self.phase = 'start'
+        self.stalls = []
+        self.heartbeat_job = None
+        # Due time of the next heartbeat, read by the sampling thread
+        self.due = None
+        # Stall seen by the sampling thread: (due time of the late heartbeat, phase, stack)
+        self.sampled_stall = None
+        self.running = threading.Event()
+        self.sampler = None
+
+    def set_phase(self, phase):
+        self.phase = phase
+
+    def start(self):
+        if self.heartbeat_job is not None:
+            return
+        self.due = time.perf_counter() + self.interval
+        self.heartbeat_job = self.root.after(round(self.interval * 1000), self.heartbeat)
+        self.running.set()
+        self.sampler = threading.Thread(target=self.run_sampler, name="StallWatchdog", daemon=True)
+        self.sampler.start()
+
+    def stop(self):
+        self.running.clear()
+        if self.heartbeat_job is not None:
+            self.root.after_cancel(self.heartbeat_job)
+            self.heartbeat_job = None
+
+    def heartbeat(self):
+        now = time.perf_counter()
+        delay = max(now - self.due, 0)
+        sampled_stall = self.sampled_stall
+        self.sampled_stall = None
+        # Phase of the stall is the phase when it was sampled, the blocking code may have changed it since
+        phase = sampled_stall[1] if sampled_stall is not None and sampled_stall[0] == self.due else self.phase
+        metrics.observe(f"heartbeat.{phase}", delay * 1000)
+        if delay > self.threshold:
+            stack = sampled_stall[2] if sampled_stall is not None and sampled_stall[0] == self.due else None
+            self.record_stall(phase, delay, stack)
+
+        self.due = now + self.interval
+        self.heartbeat_job = self.root.after(round(self.interval * 1000), self.heartbeat)
+
+    def record_stall(self, phase, delay, stack):
+        stall = {'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'phase': phase, 'delay_ms': round(delay * 1000, 1), 'stack': stack}
+        self.stalls.append(stall)
+        metrics.count('stalls')
+        if self.log_path:
+            try:
+                with open(self.log_path, 'a') as file:
+                    file.write(json.dumps(stall) + '\n')
+            except OSError:
+                pass
+
+    def run_sampler(self):
+        """Capture stack of the main thread once per stall, while the heartbeat is overdue"""
+
+        while self.running.is_set():
+            time.sleep(self.sample_interval)
+            due = self.due
+            if due is None or time.perf_counter() - due < self.threshold:
+                continue
+            if self.sampled_stall is not None and self.sampled_stall[0] == due:
+                continue
+            frame = sys._current_frames().get(self.main_thread_id)
+            if frame is None:
+                continue
+            stack = [f"{entry.filename}:{entry.lineno} {entry.name}: {entry.line}" for entry in traceback.extract_stack(frame)]
+            self.sampled_stall = (due, self.phase, stack)
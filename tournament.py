@@ -0,0 +1,213 @@
+import os
+import sys
+import math
+import json
+import time
+import argparse
+import itertools
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor
+
+from settings import Settings
+from setup import GameSetup
+from battle import Battle
+from fire_control import FireControl
+from rng import RandomStreams
+from replay import BattleRecorder
+from event_log import EventLogWriter
+
+#############################
+##### Tournament runner #####
+#############################
+
+# Plays complete wars without GUI to evaluate game balance (Settings.total_amounts, round_amounts):
+#   <war>: GameSetup -> <battle>: round_setup -> turns until the battle is over -> remainder add </battle>
+#          until game_should_end -> front line breach
+# The player is played by the fire-control computer aiming at enemy guns seen on radar, with aim error.
+# Wars of seeds x difficulty x role x deployment run in parallel processes, results are JSON lines.
+#
+# Usage: python tournament.py --seeds 1000 --workers 8 --output results.jsonl
+
+DIFFICULTIES = ('easy', 'medium', 'hard', 'brigade')
+ROLES = ('Defender', 'Intruder')
+DEPLOYMENTS = ('inline', 'random')
+
+
+def aim_player_guns(battle, fire_control, aim_error):
+    """Set shot parameters of player guns: each active gun aims at one of active enemy guns"""
+
+    guns = [unit for unit in battle.player_units if unit.is_active and unit.unit_type == 'artillery']
+    targets = [unit for unit in battle.computer_units if unit.is_active and unit.unit_type == 'artillery']
+    if not guns or not targets:
+        return
+
+    for index, gun in enumerate(guns):
+        target = targets[index % len(targets)]
+        # Target is marked on radar by hand
+        target_coords = (target.coords[0] + battle.rng.player.randint(-aim_error, aim_error), target.coords[1] + battle.rng.player.randint(-aim_error, aim_error))
+        solutions = fire_control.solve(gun.coords, target_coords)
+        if solutions:
+            gun.azimuth, gun.elevation, gun.charge = solutions[0].azimuth, solutions[0].elevation, solutions[0].charge
+        else:
+            # Target out of range, fire at max range in its direction
+            true_azimuth = math.degrees(math.atan2(target_coords[0] - gun.coords[0], gun.coords[1] - target_coords[1]))
+            gun.azimuth, gun.elevation, gun.charge = round((true_azimuth - fire_control.map_direction) % 360, 1), 45, 5
+
+
+def get_event_log(events_dir):
+    """Return event log writer of this worker process, each process writes its own file"""
+
+    global event_log
+    if event_log is None:
+        os.makedirs(events_dir, exist_ok=True)
+        event_log = EventLogWriter(os.path.join(events_dir, f"events_{os.getpid()}.awev"), chunk_size=65536)
+        # Worker processes do not run atexit handlers, write the rest when the process exits
+        multiprocessing.util.Finalize(event_log, event_log.close, exitpriority=10)
+    return event_log
+
+
+event_log = None
+
+
+def play_battle(setup, aim_error, max_turns, record_path=None, event_log=None, war_id=0):
+    """Play one battle (round) until it is over or turns limit, returns the battle"""
+
+    weather_conditions, units, _, _, map_direction = setup.round_setup()
+    battle = Battle(units, weather_conditions, map_direction, unit_grid=setup.unit_grid, rng=setup.battle_rng)
+    fire_control = FireControl(battle.shot, weather_conditions, map_direction)
+    recorder = BattleRecorder(battle, record_path) if record_path else None
+    unit_indexes = {unit: index for index, unit in enumerate(battle.all_units_list)}
+    for _ in range(max_turns):
+        aim_player_guns(battle, fire_control, aim_error)
+        if recorder is not None:
+            recorder.before_turn()
+        report = battle.resolve_turn()
+        if recorder is not None:
+            recorder.after_turn(report)
+        if event_log is not None:
+            event_log.log_report(war_id, Settings.battle_index, report, unit_indexes)
+        if report.battle_over:
+            break
+    if recorder is not None:
+        recorder.close()
+    return battle
+
+
+def play_war(seed, difficulty, role, deployment, aim_error=150, max_turns=100, record_dir=None, events_dir=None, war_id=0, max_battles=100):
+    """Play complete war in this process, returns its results"""
+
+    Settings.level = difficulty
+    Settings.player_role = role
+    Settings.deployment = deployment
+
+    start_time = time.perf_counter()
+    war_event_log = get_event_log(events_dir) if events_dir else None
+    setup = GameSetup(None, prefetch=False, rng=RandomStreams(f"{seed}-{difficulty}-{role}-{deployment}"))
+    results = {'won': 0, 'lost': 0, 'tied': 0, 'ongoing': 0}
+    turns = 0
+    while not setup.game_should_end() and Settings.battle_index < max_battles:
+        Settings.battle_index += 1
+        record_path = os.path.join(record_dir, f"{seed}_{difficulty}_{role}_{deployment}_battle{Settings.battle_index}.jsonl") if record_dir else None
+        battle = play_battle(setup, aim_error, max_turns, record_path, war_event_log, war_id)
+        turns += battle.turn_index
+        outcome = battle.outcome()
+        setup.record_battle_result(outcome)
+        results[outcome or 'ongoing'] += 1
+        setup.calculate_remainder_add()
+    front_line_change = setup.calculate_front_line_breach()
+
+    # War result for the player: territory taken or lost
+    territory_change = Settings.territory_occupied - 20
+    if role == 'Defender':
+        territory_change = -territory_change
+    war_result = 'won' if territory_change > 0 else 'lost' if territory_change < 0 else 'tied'
+
+    return {
+        'war': war_id, 'seed': seed, 'difficulty': difficulty, 'role': role, 'deployment': deployment,
+        'result': war_result, 'territory_occupied': Settings.territory_occupied, 'front_line_change': front_line_change,
+        'battles': Settings.battle_index, 'battles_won': results['won'], 'battles_lost': results['lost'],
+        'battles_tied': results['tied'], 'battles_ongoing': results['ongoing'], 'turns': turns,
+        'defender_total_damage': setup.defender_total_damage, 'intruder_total_damage': setup.intruder_total_damage,
+        'seconds': round(time.perf_counter() - start_time, 4),
+    }
+
+
+def play_war_job(job):
+    return play_war(*job)
+
+
+def aggregate(results):
+    """Return statistics per difficulty, role and deployment"""
+
+    groups = {}
+    for result in results:
+        groups.setdefault((result['difficulty'], result['role'], result['deployment']), []).append(result)
+    statistics = []
+    for (difficulty, role, deployment), group in sorted(groups.items()):
+        wars = len(group)
+        battles = sum(result['battles'] for result in group)
+        statistics.append({
+            'difficulty': difficulty, 'role': role, 'deployment': deployment, 'wars': wars,
+            'wars_won': sum(result['result'] == 'won' for result in group) / wars,
+            'wars_tied': sum(result['result'] == 'tied' for result in group) / wars,
+            'wars_lost': sum(result['result'] == 'lost' for result in group) / wars,
+            'battles_won': sum(result['battles_won'] for result in group) / max(battles, 1),
+            'battles_tied': sum(result['battles_tied'] for result in group) / max(battles, 1),
+            'mean_territory': sum(result['territory_occupied'] for result in group) / wars,
+            'mean_battles': battles / wars,
+        })
+    return statistics
+
+
+def print_statistics(statistics, elapsed, file):
+    print(f"{'difficulty':<10} {'role':<9} {'deploy':<7} {'wars':>6} {'won':>6} {'tied':>6} {'lost':>6} {'b.won':>6} {'b.tied':>6} {'territory':>9} {'battles':>7}", file=file)
+    for row in statistics:
+        print(f"{row['difficulty']:<10} {row['role']:<9} {row['deployment']:<7} {row['wars']:>6} {row['wars_won']:>6.1%} {row['wars_tied']:>6.1%} {row['wars_lost']:>6.1%} "
+              f"{row['battles_won']:>6.1%} {row['battles_tied']:>6.1%} {row['mean_territory']:>8.1f}% {row['mean_battles']:>7.1f}", file=file)
+    wars = sum(row['wars'] for row in statistics)
+    print(f"{wars} wars in {elapsed:.1f} s, {wars / max(elapsed, 1e-9) * 60:.0f} wars per minute", file=file)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Play wars without GUI in parallel and collect balance statistics.")
+    parser.add_argument('--seeds', type=int, default=100, help="number of seeds (wars) per difficulty, role and deployment")
+    parser.add_argument('--first-seed', type=int, default=0)
+    parser.add_argument('--difficulty', nargs='+', choices=DIFFICULTIES, default=list(DIFFICULTIES))
+    parser.add_argument('--role', nargs='+', choices=ROLES, default=list(ROLES))
+    parser.add_argument('--deployment', nargs='+', choices=DEPLOYMENTS, default=list(DEPLOYMENTS))
+    parser.add_argument('--aim-error', type=int, default=150, help="max error (px) of the target marked on radar by the player")
+    parser.add_argument('--max-turns', type=int, default=100, help="turns limit of one battle")
+    parser.add_argument('--record', default=None, help="directory to record all battles for replay (replay.py)")
+    parser.add_argument('--events', default=None, help="directory for battle event logs (event_log.py), one file per process")
+    parser.add_argument('--workers', type=int, default=None, help="number of processes, default is number of CPUs")
+    parser.add_argument('--output', default=None, help="file for JSON lines of war results, default is standard output")
+    parser.add_argument('--chunk-size', type=int, default=8)
+    options = parser.parse_args(arguments)
+
+    record_dir = os.path.abspath(options.record) if options.record else None
+    events_dir = os.path.abspath(options.events) if options.events else None
+    # Images and manifest are found relative to the game folder
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    jobs = [(seed, difficulty, role, deployment, options.aim_error, options.max_turns, record_dir, events_dir, war_id)
+            for war_id, (difficulty, role, deployment, seed) in enumerate(itertools.product(
+                options.difficulty, options.role, options.deployment, range(options.first_seed, options.first_seed + options.seeds)))]
+
+    output = open(options.output, 'w') if options.output else sys.stdout
+    results = []
+    start_time = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=options.workers) as executor:
+            for result in executor.map(play_war_job, jobs, chunksize=options.chunk_size):
+                results.append(result)
+                output.write(json.dumps(result) + '\n')
+                output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print_statistics(aggregate(results), time.perf_counter() - start_time, sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
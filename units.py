@@ -1,27 +1,28 @@
-import tkinter as tk
-import math
 import random
 
 from settings import Settings
+from rng import RandomStreams
+from spatial import PoissonDiskSampler
 
 class Unit:
-    """Class for unit creation"""
-    
-    def __init__(self, unit_number, unit_type, coords, image_direction, player_role, unit_orientation, azimuth=None, elevation=None, charge=None):
+    """Class for unit creation, plain model used by the battle engine (console binds tkinter variables to it)"""
+
+    def __init__(self, unit_number, unit_type, coords, image_direction, player_role, unit_orientation, azimuth=None, elevation=None, charge=None, rng=None):
         self.unit_number = unit_number
         self.unit_type = unit_type  # 'artillery' or 'ammo'
         self.player_role = player_role # 'Defender' or 'Intruder'
         self.coords = coords  # a tuple (x, y)
         self.unit_orientation = unit_orientation # use to orient ammo unit to artillery unit
         self.image_direction = image_direction  # a string indicating the direction
+        self.related_unit = None  # artillery unit <-> its ammo unit of the battery
 
         # Define unit-specific attributes
         if self.unit_type == 'artillery':
             self.name = 'M777' if self.player_role == 'Defender' else '2A65'
-            self.damage = tk.IntVar(value=0)  # damage is initially 0
-            self.elevation = tk.StringVar(value=elevation)
-            self.azimuth = tk.StringVar(value=azimuth)
-            self.charge = tk.StringVar(value=charge)
+            self.damage = 0  # damage is initially 0
+            self.elevation = elevation  # shot parameters as entered on console: numbers or numeric strings
+            self.azimuth = azimuth
+            self.charge = charge
             self.is_active = True
         elif self.unit_type == 'ammo':
             # Define truck names lists for defender and intruder
@@ -29,16 +30,23 @@ class Unit:
             intruder_names = ['KAMAZ', 'URAL', 'GAZ', 'ZIL']
 
             # Select a random name based on player role
-            self.name = random.choice(defender_names) if self.player_role == 'Defender' else random.choice(intruder_names)
-            self.ammo = tk.IntVar(value=10)  # ammo is initially 10
+            rng = rng if rng is not None else random
+            self.name = rng.choice(defender_names) if self.player_role == 'Defender' else rng.choice(intruder_names)
+            self.ammo = 10  # ammo is initially 10
             self.is_active = True
 
-def dist(p1, p2):
-    # Calculate Euclidean distance between two points
-    return math.sqrt((p2[0] - p1[0])**2 + (p2[1] - p1[1])**2)
+def link_battery(artillery_unit, ammo_unit):
+    """Link artillery unit and its ammo unit to one battery"""
+    artillery_unit.related_unit = ammo_unit
+    ammo_unit.related_unit = artillery_unit
+
+def generate_units(player_role, map_size, units_to_generate_defender, units_to_generate_intruder, rng=None):
+    """Generate units for the round of the game, positions and names come from the random streams of the battle.
+
+    Units are placed apart from each other by Poisson-disk sampling, raises spatial.PlacementError if they do not fit in their zone.
+    """
 
-def generate_units(player_role, map_size, units_to_generate_defender, units_to_generate_intruder):
-    """Generate units for the round of the game"""
+    rng = rng if rng is not None else RandomStreams()
 
     # Create dict for all units
     units = { 'Defender': [], 'Intruder': []}
@@ -52,79 +60,73 @@ def generate_units(player_role, map_size, units_to_generate_defender, units_to_g
     defenders_unit_direction = 'north' if player_role == 'Defender' else 'south'
     intruders_unit_direction = 'south' if player_role == 'Defender' else 'north'
 
-    # Generate defender units with unit positions and directions
-    defender_unit_positions = []
+    # Generate defender units with unit positions and directions, guns are 300 px apart from other units
+    defender_unit_positions = PoissonDiskSampler(300, rng.deployment)
 
     for i in range(units_to_generate_defender):
-        while True:
-            x = random.randint(250, half_map_size[0] - 250)
-            y = random.randint(*defenders_part_of_map)
-            if not any(dist((x, y), pos) < 300 for pos in defender_unit_positions):
-                defender_unit_positions.append((x, y))
-                # Create artillery unit and add to dictionary
-                units['Defender'].append(Unit(i + 1, 'artillery', (x, y), defenders_unit_direction,'Defender', 1))
-                break
+        x, y = defender_unit_positions.sample((250, half_map_size[0] - 250), defenders_part_of_map)
+        # Create artillery unit and add to dictionary
+        artillery_unit = Unit(i + 1, 'artillery', (x, y), defenders_unit_direction,'Defender', 1)
+        units['Defender'].append(artillery_unit)
 
         # Generate Ammo unit position behind the Artillery unit
-        ammo_x = x + random.randint(-200, 200)
-        ammo_y = y + random.randint(*defenders_ammo_position)
-        defender_unit_positions.append((ammo_x, ammo_y))
+        ammo_x = x + rng.deployment.randint(-200, 200)
+        ammo_y = y + rng.deployment.randint(*defenders_ammo_position)
+        defender_unit_positions.add((ammo_x, ammo_y))
         # Orient the ammo unit direction to artillery unit position
         unit_orientation = (x - ammo_x) / -3
         # Create ammo unit and add to dictionary
-        units['Defender'].append(Unit(i + 1, 'ammo', (ammo_x, ammo_y), defenders_unit_direction, 'Defender', unit_orientation))
+        ammo_unit = Unit(i + 1, 'ammo', (ammo_x, ammo_y), defenders_unit_direction, 'Defender', unit_orientation, rng=rng.names)
+        units['Defender'].append(ammo_unit)
+        link_battery(artillery_unit, ammo_unit)
 
     # Generate intruder units with unit positions an directions 
-    intruder_unit_positions = [] # If random unit deployment will be chosen
-    intruder_groups = [] # Intruders units are grouped of 3
+    intruder_unit_positions = PoissonDiskSampler(150, rng.deployment) # If random unit deployment will be chosen
+    intruder_groups = PoissonDiskSampler(500, rng.deployment) # Intruders units are grouped of 3, group centers are 500 px apart
 
     i = 0 # Index for intruder unit number
     for _ in range(units_to_generate_intruder // 3):
-        while True:
-            group_center = (random.randint(350, half_map_size[0] - 350), 
-                            random.randint(*intruders_part_of_map))
-            if not any(dist(group_center, center) < 500 for center in intruder_groups):
-                intruder_groups.append(group_center)
-                break
+        group_center = intruder_groups.sample((350, half_map_size[0] - 350), intruders_part_of_map)
         if Settings.deployment == 'inline':
             # Deploy the units inline as old doctrine requires
             position_in_line = [-1, 0, 1]
-            line_angle = random.randint(-50, 50)
-            line_lenght = random.randint(150, 200)
+            line_angle = rng.deployment.randint(-50, 50)
+            line_lenght = rng.deployment.randint(150, 200)
             for position in position_in_line:
                 x = group_center[0] + line_lenght * position
                 y = group_center[1] + line_angle * position
                 i += 1
                 # Create artillery unit and add to dictionary
-                units['Intruder'].append(Unit(i, 'artillery', (x, y), intruders_unit_direction, 'Intruder', 1))
+                artillery_unit = Unit(i, 'artillery', (x, y), intruders_unit_direction, 'Intruder', 1)
+                units['Intruder'].append(artillery_unit)
                 
                 # Generate Ammo unit position behind the Artillery unit
-                ammo_x = x + random.randint(-100, 100)
-                ammo_y = y + random.randint(*intruders_ammo_position)
+                ammo_x = x + rng.deployment.randint(-100, 100)
+                ammo_y = y + rng.deployment.randint(*intruders_ammo_position)
                 # Orient the ammo unit direction to artillery unit position
                 unit_orientation = (x - ammo_x) / 2
                 # Create ammo unit and add to dictionary
-                units['Intruder'].append(Unit(i, 'ammo', (ammo_x, ammo_y), intruders_unit_direction, 'Intruder', unit_orientation))
+                ammo_unit = Unit(i, 'ammo', (ammo_x, ammo_y), intruders_unit_direction, 'Intruder', unit_orientation, rng=rng.names)
+                units['Intruder'].append(ammo_unit)
+                link_battery(artillery_unit, ammo_unit)
         else:
             # Random unit deployment as new doctrine requires
             for _ in range(3):
-                while True:
-                    x = group_center[0] + random.randint(-300, 300)
-                    y = group_center[1] + random.randint(-300, 300)
-                    if not any(dist((x, y), pos) < 150 for pos in intruder_unit_positions):
-                        i += 1
-                        intruder_unit_positions.append((x, y))
-                        # Create artillery unit and add to dictionary
-                        units['Intruder'].append(Unit(i, 'artillery', (x, y), intruders_unit_direction, 'Intruder', 1))
-                        break
+                x, y = intruder_unit_positions.sample((group_center[0] - 300, group_center[0] + 300), (group_center[1] - 300, group_center[1] + 300))
+                i += 1
+                # Create artillery unit and add to dictionary
+                artillery_unit = Unit(i, 'artillery', (x, y), intruders_unit_direction, 'Intruder', 1)
+                units['Intruder'].append(artillery_unit)
 
                 # Generate Ammo unit position behind the Artillery unit
-                ammo_x = x + random.randint(-150, 150)
-                ammo_y = y + random.randint(*intruders_ammo_position)
-                intruder_unit_positions.append((ammo_x, ammo_y))
+                ammo_x = x + rng.deployment.randint(-150, 150)
+                ammo_y = y + rng.deployment.randint(*intruders_ammo_position)
+                intruder_unit_positions.add((ammo_x, ammo_y))
                 # Orient the ammo unit direction to artillery unit position
                 unit_orientation = (x - ammo_x) / 2
                 # Create ammo unit and add to dictionary
-                units['Intruder'].append(Unit(i, 'ammo', (ammo_x, ammo_y), intruders_unit_direction, 'Intruder', unit_orientation))
+                ammo_unit = Unit(i, 'ammo', (ammo_x, ammo_y), intruders_unit_direction, 'Intruder', unit_orientation, rng=rng.names)
+                units['Intruder'].append(ammo_unit)
+                link_battery(artillery_unit, ammo_unit)
 
     return units